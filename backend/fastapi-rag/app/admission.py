@@ -0,0 +1,316 @@
+import os
+import math
+import time
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from .logger import get_logger
+from .metrics import ADMISSION_ACTIVE, ADMISSION_QUEUED, ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS
+
+logger = get_logger(__name__)
+
+ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "8"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "16"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "20"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "5"))
+PREFETCH_RATE_PER_MINUTE = float(os.getenv("PREFETCH_RATE_PER_MINUTE", "120"))
+PREFETCH_RATE_BURST = float(os.getenv("PREFETCH_RATE_BURST", "20"))
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "memory")
+RATE_LIMIT_STORE_PATH = os.getenv("RATE_LIMIT_STORE_PATH", "./rate_limits.sqlite3")
+# Render (which sets RENDER=true) puts every service behind its proxy
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "1" if os.getenv("RENDER") else "0") == "1"
+# Proxies in front of the app that append to X-Forwarded-For; the client is that many entries from the right
+FORWARDED_TRUSTED_HOPS = int(os.getenv("FORWARDED_TRUSTED_HOPS", "1"))
+
+
+class Rejected(Exception):
+    """A request refused by admission control; ``retry_after`` is in seconds."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        """Retry-After value: whole seconds, at least 1."""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class RateLimitStore:
+    """Where the per-client token buckets live.
+
+    ``take`` must be atomic per key; implementations shared between
+    processes give every worker the same view of each client. Stores
+    that may block on I/O set ``blocking`` and are called from a thread.
+    """
+
+    blocking = False
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        """Take one token from ``key``'s bucket.
+
+        Returns 0 when the request is allowed, otherwise the seconds until
+        the bucket holds a token again. ``rate`` is in tokens per second.
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _refill(tokens: float, updated: float, now: float, rate: float, burst: float) -> Tuple[float, float]:
+        """New balance after one ``take`` and the wait (0 if allowed)."""
+        tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+        if tokens >= 1.0:
+            return tokens - 1.0, 0.0
+        return tokens, (1.0 - tokens) / rate
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Token buckets in a dict, private to this process.
+
+    The least recently seen clients are forgotten beyond ``max_keys``; a
+    forgotten client simply starts again with a full bucket.
+    """
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float, now: Optional[float] = None) -> float:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens, wait = self._refill(tokens, updated, now, rate, burst)
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class SQLiteRateLimitStore(RateLimitStore):
+    """Token buckets in a local SQLite file, shared by every worker on the host.
+
+    A stand-in for a networked store: each ``take`` is one short
+    ``BEGIN IMMEDIATE`` transaction, so concurrent workers never
+    double-spend a token. Uses wall-clock time, which all processes share.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str = RATE_LIMIT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " key TEXT PRIMARY KEY,"
+                " tokens REAL NOT NULL,"
+                " updated REAL NOT NULL)"
+            )
+        return self._conn
+
+    def take(self, key: str, rate: float, burst: float, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                tokens, updated = row if row else (burst, now)
+                tokens, wait = self._refill(tokens, updated, now, rate, burst)
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)", (key, tokens, now)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return wait
+
+
+def create_rate_limit_store(kind: str = RATE_LIMIT_STORE) -> RateLimitStore:
+    """The rate-limit store selected by RATE_LIMIT_STORE (memory or sqlite)."""
+    if kind == "sqlite":
+        return SQLiteRateLimitStore()
+    if kind != "memory":
+        logger.warning(f"⚠️  Unknown RATE_LIMIT_STORE={kind!r}, using memory")
+    return MemoryRateLimitStore()
+
+
+class Ticket:
+    """A held /ask slot; ``release`` is idempotent."""
+
+    def __init__(self, controller: "AdmissionController", waited: float):
+        self.controller = controller
+        self.waited = waited
+        self.acquired_at = time.monotonic()
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.controller._release(time.monotonic() - self.acquired_at)
+
+
+class AdmissionController:
+    """Admission control for /ask: per-client rate limits and a concurrency cap.
+
+    At most ``max_concurrent`` requests hold a slot; up to ``max_queue``
+    more wait for one in FIFO order, for at most ``queue_timeout`` seconds.
+    Anything beyond that is rejected at once, with a Retry-After estimated
+    from how long slots are typically held. Slots are per process; the rate
+    limit buckets live in the pluggable ``store``.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = ADMISSION_MAX_CONCURRENT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT,
+        rate_per_minute: float = RATE_LIMIT_PER_MINUTE,
+        burst: float = RATE_LIMIT_BURST,
+        store: Optional[RateLimitStore] = None,
+        prefetch_rate_per_minute: float = PREFETCH_RATE_PER_MINUTE,
+        prefetch_burst: float = PREFETCH_RATE_BURST,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.rate_per_minute = rate_per_minute
+        self.burst = max(1.0, burst)
+        self.prefetch_rate_per_minute = prefetch_rate_per_minute
+        self.prefetch_burst = max(1.0, prefetch_burst)
+        self.store = store or create_rate_limit_store()
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Moving average of how long a slot is held, for Retry-After
+        self._hold_seconds = 5.0
+        self._update_gauges()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def _update_gauges(self):
+        ADMISSION_ACTIVE.set(self.active)
+        ADMISSION_QUEUED.set(self.queued)
+
+    def _reject(self, reason: str, retry_after: float):
+        ADMISSION_REJECTED.inc(reason)
+        logger.debug("🚦 Rejected /ask (%s), retry after %.1fs", reason, retry_after)
+        raise Rejected(reason, retry_after)
+
+    def _queue_retry_after(self) -> float:
+        return self._hold_seconds * (self.queued + 1) / max(1, self.max_concurrent)
+
+    async def _take(self, key: str, rate_per_minute: float, burst: float, reason: str):
+        if rate_per_minute <= 0:
+            return
+        args = (key, rate_per_minute / 60, burst)
+        # A shared store can wait up to its busy timeout on a lock; keep that off the event loop
+        wait = await asyncio.to_thread(self.store.take, *args) if self.store.blocking else self.store.take(*args)
+        if wait > 0:
+            self._reject(reason, wait)
+
+    async def check_rate(self, client: str):
+        """Spend one of ``client``'s tokens or raise ``Rejected``."""
+        await self._take(client, self.rate_per_minute, self.burst, "rate_limited")
+
+    async def check_prefetch_rate(self, client: str):
+        """Like ``check_rate``, from a separate, larger bucket for /prefetch calls."""
+        await self._take(f"prefetch:{client}", self.prefetch_rate_per_minute, self.prefetch_burst, "prefetch_rate_limited")
+
+    async def acquire(self) -> Ticket:
+        """Wait for a slot, or raise ``Rejected`` if the queue is full or too slow."""
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self._update_gauges()
+            ADMISSION_WAIT_SECONDS.observe(0.0, "admitted")
+            return Ticket(self, 0.0)
+        if self.queued >= self.max_queue:
+            self._reject("queue_full", self._queue_retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._update_gauges()
+        start = time.perf_counter()
+        try:
+            # A released slot is handed straight to the waiter (``active`` is unchanged)
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Granted at the same moment we gave up: pass the slot on
+                self._release(None)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - start, "timeout")
+            self._reject("queue_timeout", self._queue_retry_after())
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self._update_gauges()
+        waited = time.perf_counter() - start
+        ADMISSION_WAIT_SECONDS.observe(waited, "admitted")
+        return Ticket(self, waited)
+
+    async def admit(self, client: str) -> Ticket:
+        """Rate-limit ``client``, then wait for a slot."""
+        await self.check_rate(client)
+        return await self.acquire()
+
+    def _release(self, held: Optional[float]):
+        if held is not None:
+            self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * held
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+        else:
+            self.active -= 1
+        self._update_gauges()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "avg_hold_seconds": round(self._hold_seconds, 3),
+            "rate_limit_per_minute": self.rate_per_minute,
+            "rate_limit_burst": self.burst,
+            "prefetch_rate_limit_per_minute": self.prefetch_rate_per_minute,
+            "prefetch_rate_limit_burst": self.prefetch_burst,
+            "store": type(self.store).__name__,
+        }
+
+
+def client_key(request: Any) -> str:
+    """Rate-limit key for a request: the client IP.
+
+    Behind a reverse proxy every request comes from the proxy, so with
+    TRUST_FORWARDED_FOR=1 (the default on Render) the X-Forwarded-For
+    address appended by the outermost of FORWARDED_TRUSTED_HOPS proxies is
+    used instead. Entries left of it were sent by the client and can be
+    forged, so they are ignored.
+    """
+    if TRUST_FORWARDED_FOR:
+        forwarded = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+        if forwarded:
+            return forwarded[-min(max(FORWARDED_TRUSTED_HOPS, 1), len(forwarded))]
+    return request.client.host if request.client else "unknown"
+
+
+# Global instance
+admission = AdmissionController()
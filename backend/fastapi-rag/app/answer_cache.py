@@ -0,0 +1,152 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "256"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.96"))
+
+
+class CachedAnswer:
+    """A stored /ask response: the context snippets and the streamed tokens."""
+
+    __slots__ = ("contexts", "tokens", "created_at")
+
+    def __init__(self, contexts: List[Tuple[str, float]], tokens: List[str]):
+        self.contexts = contexts
+        self.tokens = tokens
+        self.created_at = time.monotonic()
+
+    @property
+    def text(self) -> str:
+        return "".join(self.tokens)
+
+
+class AnswerCache:
+    """Semantic answer cache keyed on the question embedding.
+
+    Entries live in a fixed-size matrix of normalized embeddings, so a lookup
+    is a single matrix-vector product. Eviction is LRU bounded by ``max_entries``
+    plus a TTL, and the whole cache is dropped when the collection version
+    changes (i.e. after a re-ingest).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_SIZE,
+        ttl: float = ANSWER_CACHE_TTL,
+        threshold: float = ANSWER_CACHE_THRESHOLD,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._free: List[int] = list(range(max_entries - 1, -1, -1))
+        self._version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _normalize(self, qvec: List[float]) -> np.ndarray:
+        vec = np.asarray(qvec, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _check_version(self, version: int):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self.clear()
+            self._version = version
+
+    def _drop(self, slot: int):
+        del self._entries[slot]
+        self._matrix[slot] = 0.0
+        self._free.append(slot)
+
+    def clear(self):
+        """Remove every entry (counters are kept)."""
+        for slot in list(self._entries):
+            self._drop(slot)
+
+    def lookup(self, qvec: List[float], version: int) -> Optional[CachedAnswer]:
+        """Return the cached answer for a near-duplicate question, if any."""
+        if not self.enabled:
+            return None
+        self._check_version(version)
+        if not self._entries:
+            self.misses += 1
+            return None
+
+        sims = self._matrix @ self._normalize(qvec)
+        slot = int(np.argmax(sims))
+        entry = self._entries.get(slot)
+        if entry is None or sims[slot] < self.threshold:
+            self.misses += 1
+            return None
+        if time.monotonic() - entry.created_at > self.ttl:
+            self._drop(slot)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(slot)
+        self.hits += 1
+        return entry
+
+    def store(
+        self,
+        qvec: List[float],
+        version: int,
+        contexts: List[Tuple[str, float]],
+        tokens: List[str],
+    ):
+        """Store a completed answer for the given question embedding."""
+        if not self.enabled:
+            return
+        self._check_version(version)
+        vec = self._normalize(qvec)
+        if self._matrix is None:
+            self._matrix = np.zeros((self.max_entries, vec.shape[0]), dtype=np.float32)
+
+        if not self._free:
+            slot, _ = self._entries.popitem(last=False)
+            self._matrix[slot] = 0.0
+            self._free.append(slot)
+            self.evictions += 1
+
+        slot = self._free.pop()
+        self._matrix[slot] = vec
+        self._entries[slot] = CachedAnswer(contexts, tokens)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current occupancy."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "threshold": self.threshold,
+            "collection_version": self._version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+# Global instance
+answer_cache = AnswerCache()
@@ -0,0 +1,205 @@
+import os
+import re
+import json
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, Optional, Tuple
+
+AUDIO_CACHE_PATH = os.getenv("AUDIO_CACHE_PATH", "./audio_cache")
+AUDIO_CACHE_MAX_MB = float(os.getenv("AUDIO_CACHE_MAX_MB", "256"))
+AUDIO_CACHE_CHUNK_BYTES = int(os.getenv("AUDIO_CACHE_CHUNK_BYTES", "16384"))
+
+_space_re = re.compile(r"\s+")
+_range_re = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def normalize_answer(text: str) -> str:
+    """Answer text as spoken: whitespace collapsed, case and punctuation kept."""
+    return _space_re.sub(" ", text).strip()
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single ``bytes=`` Range header, or None for all.
+
+    Raises ValueError for unsatisfiable or multi-part ranges.
+    """
+    if not header:
+        return None
+    match = _range_re.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        raise ValueError(f"Unsupported range: {header}")
+    first, last = match.groups()
+    if first == "":
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError(f"Unsatisfiable range: {header}")
+    return start, end
+
+
+class AudioCache:
+    """Synthesized speech on disk, keyed by (voice, model, format, answer text).
+
+    Each entry is a raw audio file plus a small JSON sidecar with its
+    metadata, written atomically. Total size is bounded by ``max_bytes``
+    with LRU eviction; recency survives restarts through file mtimes.
+    Reads are streamed in chunks and may start at any byte offset, so
+    HTTP Range requests are served straight from the file.
+    """
+
+    def __init__(self, path: str = AUDIO_CACHE_PATH, max_bytes: int = int(AUDIO_CACHE_MAX_MB * 2**20),
+                 chunk_bytes: int = AUDIO_CACHE_CHUNK_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.chunk_bytes = chunk_bytes
+        self._lock = threading.Lock()
+        self._entries: Optional["OrderedDict[str, int]"] = None
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def key(text: str, voice_id: str, model_id: str, output_format: str) -> str:
+        raw = "\x00".join((voice_id or "", model_id, output_format, normalize_answer(text)))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.audio")
+
+    def _metadata_file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.json")
+
+    def _load(self) -> "OrderedDict[str, int]":
+        """Index the files on disk, least recently used first."""
+        if self._entries is None:
+            files = []
+            if os.path.isdir(self.path):
+                for name in os.listdir(self.path):
+                    if name.endswith(".audio"):
+                        stat = os.stat(os.path.join(self.path, name))
+                        files.append((stat.st_mtime_ns, name[:-6], stat.st_size))
+            self._entries = OrderedDict((key, size) for _, key, size in sorted(files))
+            self._total = sum(self._entries.values())
+        return self._entries
+
+    def _remove(self, key: str):
+        self._total -= self._entries.pop(key)
+        for path in (self._file(key), self._metadata_file(key)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def get(self, key: str) -> Optional[int]:
+        """Size in bytes of the cached audio for ``key``, or None on a miss."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entries = self._load()
+            size = entries.get(key)
+            if size is None or not os.path.exists(self._file(key)):
+                if size is not None:
+                    self._total -= entries.pop(key)
+                self.misses += 1
+                return None
+            entries.move_to_end(key)
+            self.hits += 1
+        try:
+            os.utime(self._file(key))
+        except OSError:
+            pass
+        return size
+
+    def metadata(self, key: str) -> Dict[str, Any]:
+        try:
+            with open(self._metadata_file(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def put(self, key: str, chunks: Iterable[bytes], metadata: Optional[Dict[str, Any]] = None) -> int:
+        """Store audio for ``key``, evicting least recently used entries; returns its size."""
+        if not self.enabled:
+            return 0
+        os.makedirs(self.path, exist_ok=True)
+        target = self._file(key)
+        tmp_path = f"{target}.tmp-{os.getpid()}-{threading.get_ident()}"
+        size = 0
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            if size > self.max_bytes:
+                return 0
+            if metadata is not None:
+                with open(self._metadata_file(key), "w", encoding="utf-8") as f:
+                    json.dump(metadata, f)
+            os.replace(tmp_path, target)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        with self._lock:
+            entries = self._load()
+            if key in entries:
+                self._total -= entries.pop(key)
+            entries[key] = size
+            self._total += size
+            while self._total > self.max_bytes and len(entries) > 1:
+                self._remove(next(iter(entries)))
+                self.evictions += 1
+        return size
+
+    def read_range(self, key: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """Chunks of the cached audio from byte ``start`` to ``end`` (inclusive)."""
+        with open(self._file(key), "rb") as f:
+            f.seek(start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                chunk = f.read(self.chunk_bytes if remaining is None else min(self.chunk_bytes, remaining))
+                if not chunk:
+                    return
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    async def stream(self, key: str, start: int = 0, end: Optional[int] = None) -> AsyncIterator[bytes]:
+        """``read_range`` without blocking the event loop."""
+        reader = self.read_range(key, start, end)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, reader, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            reader.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._load()
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(entries),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+# Global instance
+audio_cache = AudioCache()
@@ -0,0 +1,62 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "chroma")
+
+
+class RetrievalBackend:
+    """Interface of the vector stores that can serve ``retrieve()``.
+
+    Scores follow Chroma's convention: ``1 - squared L2 distance``, which for
+    unit-length embeddings is ``2 * cosine - 1``.
+    """
+
+    name = "base"
+
+    @property
+    def version(self) -> int:
+        """Version of the indexed contents; changes whenever they change."""
+        raise NotImplementedError
+
+    async def search_similar(
+        self, query_embedding: List[float], top_k: int = 6, query_text: Optional[str] = None
+    ) -> List[Tuple[str, float]]:
+        """Return the ``top_k`` most similar chunks as (content, score).
+
+        ``query_text`` is the question the embedding was made from, for
+        backends that cache results by query.
+        """
+        raise NotImplementedError
+
+    async def get_collection_info(self) -> Dict[str, Any]:
+        """Get information about the indexed collection."""
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        """Backend-specific runtime statistics."""
+        return {"backend": self.name}
+
+    async def warm_up(self):
+        """Load the index into memory ahead of the first query."""
+
+
+_backend: Optional[RetrievalBackend] = None
+
+
+def get_backend() -> RetrievalBackend:
+    """Return the configured retrieval backend (RETRIEVAL_BACKEND env var).
+
+    Backends are imported lazily so that, e.g., the NumPy backend never pays
+    for importing ChromaDB.
+    """
+    global _backend
+    if _backend is None:
+        if RETRIEVAL_BACKEND == "numpy":
+            from .vector_index import SnapshotBackend
+            _backend = SnapshotBackend()
+        elif RETRIEVAL_BACKEND == "chroma":
+            from .chroma_db import chroma_manager
+            _backend = chroma_manager
+        else:
+            raise ValueError(f"Unknown RETRIEVAL_BACKEND: {RETRIEVAL_BACKEND!r}")
+    return _backend
@@ -1,15 +1,53 @@
 import os
+import time
+import asyncio
+import threading
 import chromadb
+from concurrent.futures import ThreadPoolExecutor
 from chromadb.config import Settings
-from typing import List, Tuple, Dict, Any
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 from dotenv import load_dotenv
 
+from .backends import RetrievalBackend
+from .batching import MicroBatcher
+from .logger import get_logger
+from .retrieval_cache import RetrievalCache
+
+logger = get_logger(__name__)
+
 load_dotenv()
 
-class ChromaDBManager:
-    def __init__(self):
+CHROMA_PATH = os.getenv("CHROMA_PATH", "./chroma_db")
+CHROMA_THREADS = int(os.getenv("CHROMA_THREADS", "4"))
+CHROMA_COALESCE_MS = float(os.getenv("CHROMA_COALESCE_MS", "2"))
+CHROMA_MAX_BATCH = int(os.getenv("CHROMA_MAX_BATCH", "32"))
+CHROMA_VERSION_CHECK_SECONDS = float(os.getenv("CHROMA_VERSION_CHECK_SECONDS", "1"))
+
+
+def chunk_id(doc_id: str, index: int) -> str:
+    """ChromaDB id of a document chunk."""
+    return f"{doc_id}_{index}"
+
+
+def chunk_metadata(doc_id: str, index: int, metadata: Dict[str, Any], content_hash: str = "") -> Dict[str, Any]:
+    """ChromaDB metadata stored with every document chunk."""
+    return {
+        "doc_id": doc_id,
+        "chunk_id": index,
+        "filename": metadata.get("filename", ""),
+        "file_size": metadata.get("file_size", 0),
+        "chunk_count": metadata.get("chunk_count", 0),
+        "section": metadata.get("section", ""),
+        "content_hash": content_hash,
+    }
+
+
+class ChromaDBManager(RetrievalBackend):
+    name = "chroma"
+
+    def __init__(self, path: str = CHROMA_PATH, threads: int = CHROMA_THREADS):
         self.client = chromadb.PersistentClient(
-            path="./chroma_db",  # Local storage directory
+            path=path,  # Local storage directory
             settings=Settings(
                 anonymized_telemetry=False,  # Disable telemetry
                 allow_reset=True
@@ -20,67 +58,253 @@ class ChromaDBManager:
         try:
             # Try to get existing collection
             self.collection = self.client.get_collection(name="miguel_documents")
-            print(f"📚 Using existing collection: {self.collection.name}")
+            logger.info(f"📚 Using existing collection: {self.collection.name}")
         except:
             # Create new collection with explicit dimensions
-            print("🆕 Creating new collection...")
+            logger.info("🆕 Creating new collection...")
             self.collection = self.client.create_collection(
                 name="miguel_documents",
                 metadata={"description": "Miguel's RAG document collection"}
             )
-            print(f"✅ Created new collection: {self.collection.name}")
+            logger.info(f"✅ Created new collection: {self.collection.name}")
+
+        # Collection version, shared with the ingest scripts through a small file
+        # so that a running server notices re-ingests done by another process.
+        self._version_path = os.path.join(path, "collection_version")
+        self._version = 0
+        self._version_mtime = None
+        self._version_checked = float("-inf")
+
+        # Chroma calls are synchronous; run them on a dedicated bounded pool so
+        # they never block the event loop, and coalesce concurrent searches.
+        self._threads = threads
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="chroma")
+        self._pool_lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._max_queued = 0
+        self._completed = 0
+        self._search_batchers: Dict[int, MicroBatcher] = {}
+        self.retrieval_cache = RetrievalCache()
+
+    async def _run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run a blocking Chroma call on the dedicated thread pool."""
+        def job():
+            with self._pool_lock:
+                self._queued -= 1
+                self._active += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._pool_lock:
+                    self._active -= 1
+                    self._completed += 1
+
+        with self._pool_lock:
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, job)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Thread pool queue depth and search coalescing counters."""
+        with self._pool_lock:
+            stats = {
+                "threads": self._threads,
+                "queued": self._queued,
+                "active": self._active,
+                "max_queued": self._max_queued,
+                "completed": self._completed,
+            }
+        stats["search_batches"] = {k: b.stats() for k, b in self._search_batchers.items()}
+        return stats
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, **self.pool_stats(), "retrieval_cache": self.retrieval_cache.stats()}
+
+    @property
+    def version(self) -> int:
+        """Monotonic version of the collection contents, bumped on every write.
+
+        Writes by this process are seen at once; the version file is checked
+        for other processes' writes at most every CHROMA_VERSION_CHECK_SECONDS.
+        """
+        now = time.monotonic()
+        if now - self._version_checked < CHROMA_VERSION_CHECK_SECONDS:
+            return self._version
+        self._version_checked = now
+        try:
+            mtime = os.stat(self._version_path).st_mtime_ns
+        except FileNotFoundError:
+            return self._version
+        if mtime != self._version_mtime:
+            with open(self._version_path, "r", encoding="utf-8") as f:
+                self._version = int(f.read().strip() or 0)
+            self._version_mtime = mtime
+        return self._version
+
+    def _bump_version(self):
+        """Increment the collection version and persist it atomically."""
+        new_version = self.version + 1
+        tmp_path = f"{self._version_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(new_version))
+        os.replace(tmp_path, self._version_path)
+        self._version = new_version
     
-    async def upsert_documents(self, doc_id: str, chunks: List[str], metadata: Dict[str, Any]):
-        """Upsert document chunks into ChromaDB."""
+    @property
+    def collection_id(self) -> str:
+        """Identifier of the live collection (changes when it is recreated)."""
+        return str(self.collection.id)
+
+    async def upsert_documents(
+        self,
+        doc_id: str,
+        chunks: List[str],
+        metadata: Dict[str, Any],
+        indices: Optional[Iterable[int]] = None,
+        chunk_hashes: Optional[List[str]] = None,
+    ):
+        """Upsert document chunks into ChromaDB.
+
+        When ``indices`` is given only those chunks are (re-)embedded; the rest
+        keep their vectors and just get refreshed metadata. Chunks left over
+        from a previous, longer version of the document are deleted.
+        """
         if not chunks:
+            await self.delete_document(doc_id)
             return
-        
-        # Generate embeddings for the chunks
-        from .rag import embed
-        embeddings = await embed(chunks)
-        
-        # Prepare data for ChromaDB
-        ids = [f"{doc_id}_{i}" for i in range(len(chunks))]
+
+        ids = [chunk_id(doc_id, i) for i in range(len(chunks))]
         metadatas = [
-            {
-                "doc_id": doc_id,
-                "chunk_id": i,
-                "filename": metadata.get("filename", ""),
-                "file_size": metadata.get("file_size", 0),
-                "chunk_count": metadata.get("chunk_count", 0)
-            }
+            chunk_metadata(doc_id, i, metadata, chunk_hashes[i] if chunk_hashes else "")
             for i in range(len(chunks))
         ]
+        changed = sorted(set(range(len(chunks)) if indices is None else indices))
+        unchanged = sorted(set(range(len(chunks))) - set(changed))
+
+        if changed:
+            # Generate embeddings for the changed chunks
+            from .rag import embed
+            embeddings = await embed([chunks[i] for i in changed])
+
+            await self.upsert_chunks(
+                [ids[i] for i in changed],
+                [chunks[i] for i in changed],
+                embeddings,
+                [metadatas[i] for i in changed],
+            )
+        await self.finalize_document(
+            doc_id,
+            len(chunks),
+            [ids[i] for i in unchanged],
+            [metadatas[i] for i in unchanged],
+        )
         
-        # Upsert to ChromaDB with embeddings
-        self.collection.upsert(
+        logger.info(f"✅ Upserted {len(changed)} of {len(chunks)} chunks for {doc_id}")
+
+    async def upsert_chunks(
+        self,
+        ids: List[str],
+        documents: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]],
+    ):
+        """Upsert pre-embedded chunks into ChromaDB."""
+        await self._run(
+            self.collection.upsert,
             ids=ids,
-            documents=chunks,
+            documents=documents,
             embeddings=embeddings,
             metadatas=metadatas
         )
-        
-        print(f"✅ Upserted {len(chunks)} chunks for {doc_id}")
+        self._bump_version()
+
+    async def finalize_document(
+        self,
+        doc_id: str,
+        chunk_count: int,
+        unchanged_ids: List[str],
+        unchanged_metadatas: List[Dict[str, Any]],
+    ):
+        """Refresh the metadata of a document's chunks and drop orphans.
+
+        ``unchanged_ids`` may list every chunk of the document, e.g. when
+        ``chunk_count`` was only known after its new chunks were upserted.
+        """
+        if unchanged_ids:
+            await self._run(self.collection.update, ids=unchanged_ids, metadatas=unchanged_metadatas)
+
+        # Drop orphaned chunks from a previous, longer version of the document
+        await self._run(
+            self.collection.delete,
+            where={"$and": [{"doc_id": doc_id}, {"chunk_id": {"$gte": chunk_count}}]}
+        )
+        self._bump_version()
+
+    async def delete_document(self, doc_id: str):
+        """Delete every chunk of a document."""
+        await self._run(self.collection.delete, where={"doc_id": doc_id})
+        self._bump_version()
+        logger.info(f"🗑️  Deleted chunks for {doc_id}")
     
-    async def search_similar(self, query_embedding: List[float], top_k: int = 6) -> List[Tuple[str, float]]:
-        """Search for similar documents using vector similarity."""
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
+    async def search_similar(
+        self, query_embedding: List[float], top_k: int = 6, query_text: Optional[str] = None
+    ) -> List[Tuple[str, float]]:
+        """Search for similar documents using vector similarity.
+
+        Repeated and near-identical queries are answered from the retrieval
+        cache until the collection version changes. Other searches with the
+        same ``top_k`` arriving within CHROMA_COALESCE_MS of each other are
+        sent to Chroma as a single multi-query call.
+        """
+        version = self.version
+        cached = self.retrieval_cache.lookup(query_embedding, top_k, version, query_text)
+        if cached is not None:
+            return cached
+
+        batcher = self._search_batchers.get(top_k)
+        if batcher is None:
+            batcher = MicroBatcher(
+                lambda queries: self._search_many(queries, top_k),
+                max_wait=CHROMA_COALESCE_MS / 1000,
+                max_batch=CHROMA_MAX_BATCH,
+            )
+            self._search_batchers[top_k] = batcher
+        results = await batcher.submit(query_embedding)
+        self.retrieval_cache.store(query_embedding, top_k, version, results, query_text)
+        return results
+
+    async def _search_many(self, query_embeddings: List[List[float]], top_k: int) -> List[List[Tuple[str, float]]]:
+        """Run several similarity searches in one Chroma query."""
+        results = await self._run(
+            self.collection.query,
+            query_embeddings=query_embeddings,
             n_results=top_k,
             include=["documents", "metadatas", "distances"]
         )
         
         # Format results: (content, similarity_score)
-        documents = results["documents"][0]
-        distances = results["distances"][0]
-        
         # Convert distance to similarity score (1 - distance)
-        similarities = [(doc, 1 - dist) for doc, dist in zip(documents, distances)]
-        return similarities
+        return [
+            [(doc, 1 - dist) for doc, dist in zip(documents, distances)]
+            for documents, distances in zip(results["documents"], results["distances"])
+        ]
     
+    async def warm_up(self):
+        """Load the HNSW index by querying with one stored embedding."""
+        sample = await self._run(self.collection.get, limit=1, include=["embeddings"])
+        if len(sample["ids"]):
+            await self._search_many([list(sample["embeddings"][0])], 1)
+
+    async def get_all_chunks(self) -> Dict[str, Any]:
+        """Every chunk in the collection, with embeddings and metadata."""
+        return await self._run(
+            self.collection.get, include=["embeddings", "documents", "metadatas"]
+        )
+
     async def get_collection_info(self) -> Dict[str, Any]:
         """Get information about the collection."""
-        count = self.collection.count()
+        count = await self._run(self.collection.count)
         return {
             "total_documents": count,
             "collection_name": self.collection.name
@@ -89,17 +313,19 @@ class ChromaDBManager:
     async def reset_collection(self):
         """Reset the collection (useful for testing)."""
         try:
-            self.client.delete_collection("miguel_documents")
-            print("🗑️  Deleted existing collection")
+            await self._run(self.client.delete_collection, "miguel_documents")
+            logger.info("🗑️  Deleted existing collection")
         except:
-            print("ℹ️  No existing collection to delete")
+            logger.info("ℹ️  No existing collection to delete")
         
         # Create new collection
-        self.collection = self.client.create_collection(
+        self.collection = await self._run(
+            self.client.create_collection,
             name="miguel_documents",
             metadata={"description": "Miguel's RAG document collection"}
         )
-        print("✅ Created new collection")
+        self._bump_version()
+        logger.info("✅ Created new collection")
 
 # Global instance
 chroma_manager = ChromaDBManager()
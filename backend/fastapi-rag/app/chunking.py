@@ -0,0 +1,289 @@
+import io
+import os
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple, Union
+
+from .tokens import count_tokens
+
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "250"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "30"))
+
+_sentence_splitter = re.compile(r"(?<=[.!?])\s+")
+_heading_re = re.compile(r"^(#{1,6})\s+(.*?)(?:\s+#+)?\s*$")
+_fence_re = re.compile(r"^\s*(`{3,}|~{3,})")
+_list_item_re = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+")
+_rule_re = re.compile(r"^\s*([-*_])(?:\s*\1){2,}\s*$")
+_table_sep_re = re.compile(r"^\s*\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)*\|?\s*$")
+
+# (text, size) of the smallest piece of a block that may start or end a chunk
+Unit = Tuple[str, int]
+
+
+class Block:
+    """A paragraph, list, code block or table of a markdown document.
+
+    ``units`` are the pieces a block may be split into across chunks:
+    sentences, list items, code lines or table rows, joined by ``joiner``.
+    ``prefix``/``suffix`` (code fences, a table header) are repeated around
+    every part of a split block. A ``heading`` block has no units and marks
+    the start of a new section.
+    """
+
+    def __init__(self, kind: str, units: List[str], headings: List[str], joiner: str = " ",
+                 prefix: str = "", suffix: str = ""):
+        self.kind = kind
+        self.units = units
+        self.headings = headings
+        self.joiner = joiner
+        self.prefix = prefix
+        self.suffix = suffix
+
+
+class Chunk:
+    """A chunk of a markdown document and its position in the heading tree."""
+
+    def __init__(self, text: str, headings: List[str], tokens: int, index: int):
+        self.text = text
+        self.headings = headings
+        self.tokens = tokens
+        self.index = index
+
+    @property
+    def section(self) -> str:
+        """Heading path of the chunk, e.g. ``"Experience > Acme"``."""
+        return " > ".join(self.headings)
+
+
+def _make_block(kind: str, lines: List[str], headings: List[str]) -> Block:
+    if kind == "list":
+        items: List[str] = []
+        for line in lines:
+            if _list_item_re.match(line) or not items:
+                items.append(line.rstrip())
+            else:
+                items[-1] += " " + line.strip()
+        return Block(kind, items, headings, "\n")
+    if kind == "table":
+        if len(lines) > 2 and _table_sep_re.match(lines[1]):
+            return Block(kind, lines[2:], headings, "\n", prefix=f"{lines[0]}\n{lines[1]}")
+        return Block(kind, list(lines), headings, "\n")
+    text = " ".join(line.strip() for line in lines)
+    return Block(kind, [s for s in _sentence_splitter.split(text) if s], headings)
+
+
+def iter_blocks(lines: Iterable[str]) -> Iterator[Block]:
+    """Parse markdown, one line at a time, into blocks.
+
+    Recognises ATX headings, fenced code, lists, tables and paragraphs;
+    horizontal rules and blank lines only separate blocks. Memory is
+    bounded by the largest block, not the document.
+    """
+    stack: List[Tuple[int, str]] = []
+    headings: List[str] = []
+    kind = ""
+    current: List[str] = []
+    fence = opening = ""
+
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+        stripped = line.strip()
+        if fence:
+            if stripped.startswith(fence) and not stripped.strip(fence[0]):
+                if current:
+                    yield Block("code", current, headings, "\n", prefix=opening, suffix=fence)
+                fence, current = "", []
+            else:
+                current.append(line)
+            continue
+
+        # Cheap first-character checks keep the regexes off ordinary text lines
+        first = stripped[:1]
+        fence_match = _fence_re.match(line) if first in ("`", "~") else None
+        heading = _heading_re.match(line) if first == "#" else None
+        rule = first in ("-", "*", "_") and _rule_re.match(line)
+        if first == "|":
+            line_kind = "table"
+        elif (first in ("-", "*", "+") or first.isdigit()) and not rule and _list_item_re.match(line):
+            line_kind = "list"
+        elif kind == "list" and stripped:
+            line_kind = "list"  # continuation of the last item
+        else:
+            line_kind = "paragraph"
+
+        if fence_match or heading or rule or not stripped or line_kind != kind:
+            if current:
+                yield _make_block(kind, current, headings)
+            kind, current = "", []
+
+        if fence_match:
+            fence, opening = fence_match.group(1), stripped
+        elif heading:
+            level = len(heading.group(1))
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, heading.group(2)))
+            headings = [title for _, title in stack]
+            yield Block("heading", [], headings)
+        elif stripped and not rule:
+            kind = line_kind
+            current.append(line)
+
+    if fence and current:
+        yield Block("code", current, headings, "\n", prefix=opening, suffix=fence)
+    elif current:
+        yield _make_block(kind, current, headings)
+
+
+class _Packer:
+    """Packs block units greedily into chunks of at most ``max_size``."""
+
+    def __init__(self, max_size: int, overlap: int, length: Callable[[str], int]):
+        self.max_size = max_size
+        self.overlap = overlap
+        self.length = length
+        self._sep_costs: Dict[str, int] = {}
+        self.headings: List[str] = []
+        self.header = ""
+        self.header_cost = 0
+        self.pieces: List[Tuple[Block, List[Unit]]] = []
+        self.size = 0
+        self.index = 0
+
+    def _sep(self, sep: str) -> int:
+        if sep not in self._sep_costs:
+            self._sep_costs[sep] = self.length(sep) if sep else 0
+        return self._sep_costs[sep]
+
+    def _overhead(self, block: Block) -> int:
+        """Size of the block's fences/header and the gap before it."""
+        cost = self._sep("\n\n")
+        if block.prefix:
+            cost += self.length(block.prefix) + self._sep("\n")
+        if block.suffix:
+            cost += self.length(block.suffix) + self._sep("\n")
+        return cost
+
+    def _cost(self, block: Block, size: int) -> int:
+        """Added size of appending a unit of ``block`` to the current chunk."""
+        if self.pieces and self.pieces[-1][0] is block:
+            return size + self._sep(block.joiner)
+        first = self.header_cost if not self.pieces else 0
+        return size + self._overhead(block) + first
+
+    def _total(self) -> int:
+        total = self.header_cost
+        for block, units in self.pieces:
+            total += self._overhead(block) + sum(s for _, s in units) + self._sep(block.joiner) * (len(units) - 1)
+        return total
+
+    def _fit(self, text: str, limit: int) -> Iterator[Unit]:
+        """Split a unit larger than ``limit`` at word, then character, boundaries."""
+        size = self.length(text)
+        if size <= limit:
+            yield text, size
+            return
+        words: List[str] = []
+        total = 0
+        space = self._sep(" ")
+        for word in text.split():
+            cost = self.length(word)
+            if cost > limit:
+                if words:
+                    yield " ".join(words), total
+                    words, total = [], 0
+                step = max(1, len(word) * limit // cost)
+                for i in range(0, len(word), step):
+                    yield word[i:i + step], self.length(word[i:i + step])
+                continue
+            if words and total + space + cost > limit:
+                yield " ".join(words), total
+                words, total = [], 0
+            total += cost + (space if words else 0)
+            words.append(word)
+        if words:
+            yield " ".join(words), total
+
+    def _emit(self) -> Chunk:
+        parts = []
+        for block, units in self.pieces:
+            body = block.joiner.join(text for text, _ in units)
+            parts.append("\n".join(p for p in (block.prefix, body, block.suffix) if p))
+        text = "\n\n".join(([self.header] if self.header else []) + parts)
+        chunk = Chunk(text, list(self.headings), self.size, self.index)
+        self.index += 1
+        return chunk
+
+    def _carry(self) -> List[Tuple[Block, List[Unit]]]:
+        """Trailing units of the current chunk that fit in the overlap."""
+        carried: List[Tuple[Block, List[Unit]]] = []
+        budget = self.overlap
+        for block, units in reversed(self.pieces):
+            kept: List[Unit] = []
+            for unit in reversed(units):
+                if unit[1] > budget:
+                    break
+                budget -= unit[1]
+                kept.insert(0, unit)
+            if kept:
+                carried.insert(0, (block, kept))
+            if len(kept) < len(units):
+                break
+        return carried
+
+    def add(self, block: Block) -> Iterator[Chunk]:
+        if block.kind == "heading":
+            yield from self.flush()
+            self.headings = block.headings
+            self.header = " > ".join(block.headings)
+            self.header_cost = self.length(self.header) + self._sep("\n\n") if self.header else 0
+            if self.header_cost >= self.max_size // 2:
+                self.header, self.header_cost = "", 0
+            return
+        limit = max(1, self.max_size - self.header_cost - self._overhead(block))
+        for text in block.units:
+            for unit in self._fit(text, limit):
+                if self.pieces and self.size + self._cost(block, unit[1]) > self.max_size:
+                    carried = self._carry() if self.overlap > 0 else []
+                    yield self._emit()
+                    self.pieces = carried
+                    self.size = self._total() if carried else 0
+                    while self.pieces and self.size + self._cost(block, unit[1]) > self.max_size:
+                        first_block, units = self.pieces[0]
+                        self.pieces[0] = (first_block, units[1:])
+                        if not units[1:]:
+                            self.pieces.pop(0)
+                        self.size = self._total() if self.pieces else 0
+                self.size += self._cost(block, unit[1])
+                if self.pieces and self.pieces[-1][0] is block:
+                    self.pieces[-1][1].append(unit)
+                else:
+                    self.pieces.append((block, [unit]))
+
+    def flush(self) -> Iterator[Chunk]:
+        if self.pieces:
+            yield self._emit()
+        self.pieces, self.size = [], 0
+
+
+def chunk_markdown_stream(
+    source: Union[str, Iterable[str]],
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    length: Callable[[str], int] = count_tokens,
+) -> Iterator[Chunk]:
+    """Chunk markdown into section-aware chunks of at most ``max_tokens``.
+
+    ``source`` is a string or any iterable of lines (e.g. an open file),
+    consumed lazily. Chunks never span two sections; each one starts with
+    its heading path, and blocks are only split between sentences, items,
+    lines or rows. Consecutive chunks of a section share up to
+    ``overlap_tokens`` of trailing units. ``length`` measures size (e.g.
+    ``len`` for characters); every unit is measured once, so the whole
+    pass is linear in the input.
+    """
+    if isinstance(source, str):
+        source = io.StringIO(source)
+    packer = _Packer(max_tokens, overlap_tokens, length)
+    for block in iter_blocks(source):
+        yield from packer.add(block)
+    yield from packer.flush()
@@ -0,0 +1,96 @@
+import os
+import re
+import hashlib
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .tokens import count_tokens
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+CONTEXT_MIN_SCORE = float(os.getenv("CONTEXT_MIN_SCORE", "0.2"))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+MINHASH_PERMUTATIONS = 64
+SHINGLE_SIZE = 3
+
+_word_re = re.compile(r"\w+")
+
+# Fixed random (odd) multipliers and offsets: h_i(x) = a_i * x + b_i mod 2^64
+_rng = np.random.default_rng(0x5EED)
+_minhash_a = _rng.integers(1, 2**63, size=MINHASH_PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_minhash_b = _rng.integers(0, 2**63, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> List[str]:
+    """Overlapping word n-grams of ``text`` (the whole text if shorter)."""
+    words = _word_re.findall(text.lower())
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def minhash(text: str) -> np.ndarray:
+    """MinHash signature of the word shingles of ``text``."""
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in set(shingles(text))),
+        dtype=np.uint64,
+    )
+    if len(hashes) == 0:
+        return np.full(MINHASH_PERMUTATIONS, np.iinfo(np.uint64).max, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        return (hashes[:, None] * _minhash_a + _minhash_b).min(axis=0)
+
+
+def estimated_jaccard(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return float(np.mean(a == b))
+
+
+def pack_contexts(
+    contexts: Sequence[Tuple[str, float]],
+    budget: int = CONTEXT_TOKEN_BUDGET,
+    min_score: float = CONTEXT_MIN_SCORE,
+    dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD,
+) -> Tuple[List[Tuple[str, float]], Dict[str, int]]:
+    """Select the retrieved chunks that go into the prompt.
+
+    Chunks scoring below ``min_score`` are dropped, as are near-duplicates
+    (MinHash Jaccard >= ``dedup_threshold``) of a better-scoring chunk. The
+    rest are picked greedily by score per token until ``budget`` tokens are
+    used, and returned most relevant first with packing stats.
+    """
+    stats = {
+        "chunks_in": len(contexts),
+        "tokens_in": 0,
+        "dropped_low_score": 0,
+        "dropped_duplicate": 0,
+        "dropped_budget": 0,
+    }
+    candidates: List[Tuple[str, float, int]] = []
+    signatures: List[np.ndarray] = []
+    for text, score in sorted(contexts, key=lambda c: c[1], reverse=True):
+        tokens = count_tokens(text)
+        stats["tokens_in"] += tokens
+        if score < min_score:
+            stats["dropped_low_score"] += 1
+            continue
+        signature = minhash(text)
+        if any(estimated_jaccard(signature, s) >= dedup_threshold for s in signatures):
+            stats["dropped_duplicate"] += 1
+            continue
+        signatures.append(signature)
+        candidates.append((text, score, tokens))
+
+    selected = []
+    used = 0
+    for text, score, tokens in sorted(candidates, key=lambda c: max(c[1], 1e-6) / max(c[2], 1), reverse=True):
+        if used + tokens > budget:
+            stats["dropped_budget"] += 1
+            continue
+        selected.append((text, score))
+        used += tokens
+
+    selected.sort(key=lambda c: c[1], reverse=True)
+    stats["chunks_out"] = len(selected)
+    stats["tokens_out"] = used
+    return selected, stats
@@ -0,0 +1,204 @@
+import os
+import time
+import random
+import asyncio
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Union
+
+import openai
+
+from .metrics import OPENAI_RETRIES
+from .openai_client import create_openai_client, retry_budget
+from .tokens import estimate_tokens
+
+EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", "8000"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "6"))
+EMBED_BACKOFF_BASE = float(os.getenv("EMBED_BACKOFF_BASE", "0.5"))
+EMBED_BACKOFF_MAX = float(os.getenv("EMBED_BACKOFF_MAX", "30"))
+
+
+class ChunkJob:
+    """A chunk waiting to be embedded, with everything needed to upsert it."""
+
+    __slots__ = ("id", "text", "metadata", "tokens")
+
+    def __init__(self, id: str, text: str, metadata: Dict[str, Any]):
+        self.id = id
+        self.text = text
+        self.metadata = metadata
+        self.tokens = estimate_tokens(text)
+
+
+class PipelineStats:
+    """Throughput report of an embedding pipeline run."""
+
+    def __init__(self):
+        self.chunks = 0
+        self.tokens = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed_chunks = 0
+        self.elapsed = 0.0
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.chunks / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def tokens_per_sec(self) -> float:
+        return self.tokens / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.chunks} chunks / {self.tokens} tokens in {self.batches} batches, "
+            f"{self.elapsed:.2f}s ({self.chunks_per_sec:.1f} chunks/s, "
+            f"{self.tokens_per_sec:.0f} tokens/s), {self.retries} retries, "
+            f"{self.failed_chunks} chunks failed"
+        )
+
+
+class BatchPacker:
+    """Incremental packing of chunks into batches under a token and item budget."""
+
+    def __init__(self, max_tokens: int = EMBED_BATCH_TOKENS, max_items: int = EMBED_BATCH_SIZE):
+        self.max_tokens = max_tokens
+        self.max_items = max_items
+        self.batch: List[ChunkJob] = []
+        self.tokens = 0
+
+    def add(self, job: ChunkJob) -> Optional[List[ChunkJob]]:
+        """Add a chunk; returns the previous batch if this one didn't fit in it."""
+        full = None
+        if self.batch and (self.tokens + job.tokens > self.max_tokens or len(self.batch) >= self.max_items):
+            full = self.flush()
+        self.batch.append(job)
+        self.tokens += job.tokens
+        return full
+
+    def flush(self) -> Optional[List[ChunkJob]]:
+        batch, self.batch, self.tokens = self.batch, [], 0
+        return batch or None
+
+
+def pack_batches(
+    jobs: List[ChunkJob],
+    max_tokens: int = EMBED_BATCH_TOKENS,
+    max_items: int = EMBED_BATCH_SIZE,
+) -> List[List[ChunkJob]]:
+    """Pack chunks, across files, into batches under a token and item budget.
+
+    A chunk larger than the budget gets a batch of its own.
+    """
+    packer = BatchPacker(max_tokens, max_items)
+    batches = [batch for batch in map(packer.add, jobs) if batch]
+    last = packer.flush()
+    return batches + [last] if last else batches
+
+
+def _retry_delay(attempt: int, error: Exception) -> float:
+    """Exponential backoff with full jitter, never shorter than Retry-After."""
+    delay = random.uniform(0, min(EMBED_BACKOFF_MAX, EMBED_BACKOFF_BASE * 2 ** attempt))
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(delay, float(retry_after)) if retry_after else delay
+    except ValueError:
+        return delay
+
+
+async def run_embedding_pipeline(
+    jobs: Union[Iterable[ChunkJob], AsyncIterable[ChunkJob]],
+    sink: Callable[[List[ChunkJob], List[List[float]]], Awaitable[None]],
+    openai_client: Optional[openai.AsyncOpenAI] = None,
+    concurrency: int = EMBED_CONCURRENCY,
+    max_tokens: int = EMBED_BATCH_TOKENS,
+    max_items: int = EMBED_BATCH_SIZE,
+    max_retries: int = EMBED_MAX_RETRIES,
+    on_error: Optional[Callable[[List[ChunkJob], Exception], None]] = None,
+) -> PipelineStats:
+    """Embed ``jobs`` in concurrent, token-budgeted batches.
+
+    ``jobs`` may be a list or a (async) generator; batches are sent as soon
+    as they fill up, while later chunks are still being produced, and the
+    producer is paused once ``2 * concurrency`` batches are pending. At most
+    ``concurrency`` embedding requests are in flight; 429 responses are
+    retried with jittered exponential backoff, drawn from the shared retry
+    budget and without holding a concurrency slot while waiting. Each batch
+    is handed to ``sink`` (e.g. a Chroma upsert) as soon as it is embedded.
+
+    The pipeline owns the retries, so ``openai_client`` should not retry on
+    its own; by default one is created whose transport does not.
+
+    A batch that still fails (embedding or ``sink``) is passed to
+    ``on_error`` and the run goes on; without ``on_error`` the error is
+    raised once the batches still in flight have been cancelled.
+    """
+    from .rag import embed
+
+    own_client = openai_client is None
+    if own_client:
+        openai_client = create_openai_client(max_retries=0)
+    stats = PipelineStats()
+    semaphore = asyncio.Semaphore(concurrency)
+    packer = BatchPacker(max_tokens, max_items)
+    pending: Dict[asyncio.Future, List[ChunkJob]] = {}
+    start = time.perf_counter()
+
+    async def embed_batch(batch: List[ChunkJob]):
+        texts = [job.text for job in batch]
+        for attempt in range(max_retries + 1):
+            try:
+                async with semaphore:
+                    return await embed(texts, openai_client)
+            except openai.RateLimitError as e:
+                if attempt == max_retries:
+                    raise
+                if not retry_budget.try_retry():
+                    OPENAI_RETRIES.inc("budget_exhausted")
+                    raise
+                stats.retries += 1
+                await asyncio.sleep(_retry_delay(attempt, e))
+
+    async def drain(limit: int):
+        """Sink finished batches until at most ``limit`` are pending."""
+        while len(pending) > limit:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                batch = pending.pop(task)
+                try:
+                    await sink(batch, task.result())
+                except Exception as e:
+                    if on_error is None:
+                        raise
+                    stats.failed_chunks += len(batch)
+                    on_error(batch, e)
+                    continue
+                stats.batches += 1
+                stats.chunks += len(batch)
+                stats.tokens += sum(job.tokens for job in batch)
+
+    async def submit(batch: Optional[List[ChunkJob]]):
+        if batch:
+            await drain(2 * concurrency - 1)
+            pending[asyncio.ensure_future(embed_batch(batch))] = batch
+
+    try:
+        if hasattr(jobs, "__aiter__"):
+            async for job in jobs:
+                await submit(packer.add(job))
+        else:
+            for job in jobs:
+                await submit(packer.add(job))
+        await submit(packer.flush())
+        await drain(0)
+    finally:
+        for task in pending:
+            task.cancel()
+        # Let cancelled batches unwind before the client they use is closed
+        await asyncio.gather(*pending, return_exceptions=True)
+        if own_client and openai_client is not None:
+            await openai_client.close()
+
+    stats.elapsed = time.perf_counter() - start
+    return stats
@@ -0,0 +1,113 @@
+import os
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.sqlite3")
+EMBEDDING_LRU_SIZE = int(os.getenv("EMBEDDING_LRU_SIZE", "2048"))
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of the UTF-8 encoded text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Disk-backed embedding cache keyed by (model, sha256(text)).
+
+    Vectors are stored as float32 blobs in SQLite, with an in-process LRU in
+    front so hot queries never touch the disk.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, lru_size: int = EMBEDDING_LRU_SIZE):
+        self.path = path
+        self.lru_size = lru_size
+        self._lru: "OrderedDict[Tuple[str, str], List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " hash TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " PRIMARY KEY (model, hash))"
+            )
+        return self._conn
+
+    def _remember(self, key: Tuple[str, str], vector: List[float]):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def get_many(self, model: str, texts: Sequence[str]) -> Dict[str, List[float]]:
+        """Return the cached vectors for ``texts``, keyed by content hash."""
+        found: Dict[str, List[float]] = {}
+        pending: List[str] = []
+        with self._lock:
+            for h in {content_hash(t) for t in texts}:
+                vector = self._lru.get((model, h))
+                if vector is not None:
+                    self._lru.move_to_end((model, h))
+                    found[h] = vector
+                    self.memory_hits += 1
+                else:
+                    pending.append(h)
+
+            # SQLite caps the number of bound parameters, so query in slices
+            for start in range(0, len(pending), 500):
+                batch = pending[start:start + 500]
+                rows = self._connection().execute(
+                    "SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN "
+                    f"({','.join('?' * len(batch))})",
+                    [model, *batch],
+                ).fetchall()
+                for h, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                    self._remember((model, h), vector)
+                    found[h] = vector
+                    self.disk_hits += 1
+                self.misses += len(batch) - len(rows)
+        return found
+
+    def put_many(self, model: str, texts: Sequence[str], vectors: Sequence[List[float]]):
+        """Persist freshly computed vectors."""
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                h = content_hash(text)
+                self._remember((model, h), list(vector))
+                rows.append((model, h, np.asarray(vector, dtype=np.float32).tobytes()))
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "lru_size": len(self._lru),
+        }
+
+
+# Global instance
+embedding_store = EmbeddingStore()
@@ -0,0 +1,233 @@
+import os
+import json
+import asyncio
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple
+
+from .chroma_db import CHROMA_PATH, chroma_manager, chunk_id, chunk_metadata
+from .chunking import chunk_markdown_stream
+from .embedding_pipeline import ChunkJob, PipelineStats, run_embedding_pipeline
+from .embedding_store import content_hash
+from .loaders import file_sha256, get_loader, supported_files
+from .logger import get_logger
+from .rag import EMBEDDING_MODEL
+
+logger = get_logger(__name__)
+
+DOCS_PATH = Path(__file__).parent.parent / "docs"
+MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", os.path.join(CHROMA_PATH, "ingest_manifest.json"))
+
+
+class IngestReport:
+    """Diff summary of an ingestion run."""
+
+    def __init__(self):
+        self.files_added: List[str] = []
+        self.files_changed: List[str] = []
+        self.files_unchanged: List[str] = []
+        self.files_removed: List[str] = []
+        self.files_failed: List[str] = []
+        self.chunks_embedded = 0
+        self.chunks_unchanged = 0
+        self.chunks_deleted = 0
+        self.pipeline: Optional[PipelineStats] = None
+
+    @property
+    def total_chunks(self) -> int:
+        return self.chunks_embedded + self.chunks_unchanged
+
+    def summary(self) -> str:
+        return (
+            f"files +{len(self.files_added)} ~{len(self.files_changed)} "
+            f"-{len(self.files_removed)} ={len(self.files_unchanged)} !{len(self.files_failed)} | "
+            f"chunks embedded {self.chunks_embedded}, unchanged {self.chunks_unchanged}, "
+            f"deleted {self.chunks_deleted}"
+        )
+
+
+def load_manifest(path: str = MANIFEST_PATH) -> Dict[str, Any]:
+    """Load the ingest manifest, or an empty one if it doesn't exist."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"files": {}}
+
+
+def save_manifest(manifest: Dict[str, Any], path: str = MANIFEST_PATH):
+    """Write the manifest atomically."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+async def _in_thread(iterator: Iterator[Any]) -> AsyncIterator[Any]:
+    """Iterate a blocking iterator (file reads, PDF parsing) off the event loop."""
+    done = object()
+    while True:
+        item = await asyncio.to_thread(next, iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+async def ingest_documents(
+    docs_path: Path = DOCS_PATH,
+    incremental: bool = True,
+    manager=chroma_manager,
+    manifest_path: str = MANIFEST_PATH,
+    openai_client=None,
+) -> IngestReport:
+    """Chunk, embed and upsert the documents in ``docs_path``.
+
+    Every file type with a registered loader (markdown, text, PDF) is
+    ingested. In incremental mode files whose mtime/size or content hash
+    match the manifest are skipped, and only chunks whose content hash
+    changed are re-embedded. Chunks and documents that no longer exist are
+    deleted in both modes. The manifest is only trusted if it was written
+    for the live collection and the current embedding model.
+
+    Documents are streamed: chunks are produced as each file is read (a PDF
+    page by page) and fed straight into the batched embedding pipeline,
+    which upserts each batch as soon as it is ready. A document with a
+    batch that could not be embedded or upserted keeps its previous
+    manifest entry, so the next run retries it, and the others go on.
+    """
+    report = IngestReport()
+    previous = load_manifest(manifest_path)
+    if (
+        previous.get("collection_id") != manager.collection_id
+        or previous.get("embedding_model") != EMBEDDING_MODEL
+    ):
+        previous = {"files": {}}
+    old_files: Dict[str, Any] = previous["files"]
+    new_files: Dict[str, Any] = {}
+    # (file name, doc_id, chunk count, ids and final metadata of every chunk, chunks embedded)
+    finalize: List[Tuple[str, str, int, List[str], List[Dict[str, Any]], int]] = []
+    failed_docs: Set[str] = set()
+
+    async def changed_chunks() -> AsyncIterator[ChunkJob]:
+        for file_path in supported_files(docs_path):
+            name = file_path.name
+            old = old_files.get(name) if incremental else None
+            stat = file_path.stat()
+            if old and old["mtime_ns"] == stat.st_mtime_ns and old["size"] == stat.st_size:
+                new_files[name] = old
+                report.files_unchanged.append(name)
+                report.chunks_unchanged += len(old["chunks"])
+                continue
+
+            try:
+                file_hash = await asyncio.to_thread(file_sha256, file_path)
+            except Exception as e:
+                logger.error(f"❌ Error processing {file_path}: {e}")
+                if name in old_files:
+                    new_files[name] = old_files[name]
+                continue
+            if old and old["sha256"] == file_hash:
+                new_files[name] = {**old, "mtime_ns": stat.st_mtime_ns}
+                report.files_unchanged.append(name)
+                report.chunks_unchanged += len(old["chunks"])
+                continue
+
+            # Chunk the document as it is read and diff it against the manifest
+            # Markdown keeps its historical ids; other types keep their extension
+            doc_id = file_path.stem if file_path.suffix == ".md" else file_path.name
+            old_hashes = old["chunks"] if old else []
+            meta = {"filename": name, "file_size": stat.st_size}
+            chunk_hashes: List[str] = []
+            sections: List[str] = []
+            unchanged = 0
+            lines = get_loader(file_path).lines(file_path, file_hash)
+            try:
+                async for chunk in _in_thread(chunk_markdown_stream(lines)):
+                    i, h = len(chunk_hashes), content_hash(chunk.text)
+                    chunk_hashes.append(h)
+                    sections.append(chunk.section)
+                    if i < len(old_hashes) and old_hashes[i] == h:
+                        unchanged += 1
+                    else:
+                        metadata = chunk_metadata(doc_id, i, {**meta, "section": chunk.section}, h)
+                        yield ChunkJob(chunk_id(doc_id, i), chunk.text, metadata)
+            except Exception as e:
+                logger.error(f"❌ Error processing {file_path}: {e}")
+                if name in old_files:
+                    new_files[name] = old_files[name]
+                continue
+
+            # chunk_count is only known now, so every chunk's metadata is refreshed
+            count = len(chunk_hashes)
+            file_meta = {**meta, "chunk_count": count}
+            finalize.append((
+                name,
+                doc_id,
+                count,
+                [chunk_id(doc_id, i) for i in range(count)],
+                [chunk_metadata(doc_id, i, {**file_meta, "section": sections[i]}, chunk_hashes[i]) for i in range(count)],
+                count - unchanged,
+            ))
+            new_files[name] = {
+                "doc_id": doc_id,
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha256": file_hash,
+                "chunks": chunk_hashes,
+            }
+            known = old_files.get(name)
+            (report.files_changed if known else report.files_added).append(name)
+            report.chunks_embedded += count - unchanged
+            report.chunks_unchanged += unchanged
+            report.chunks_deleted += max(len(known["chunks"]) - count, 0) if known else 0
+
+    async def upsert_batch(batch: List[ChunkJob], vectors: List[List[float]]):
+        await manager.upsert_chunks(
+            [job.id for job in batch],
+            [job.text for job in batch],
+            vectors,
+            [job.metadata for job in batch],
+        )
+
+    def batch_failed(batch: List[ChunkJob], error: Exception):
+        docs = {job.metadata["doc_id"] for job in batch}
+        logger.error(f"❌ Could not embed {len(batch)} chunks of {', '.join(sorted(docs))}: {error}")
+        failed_docs.update(docs)
+
+    report.pipeline = await run_embedding_pipeline(
+        changed_chunks(), upsert_batch, openai_client, on_error=batch_failed
+    )
+
+    for name, doc_id, count, ids, metadatas, embedded in finalize:
+        if doc_id not in failed_docs:
+            await manager.finalize_document(doc_id, count, ids, metadatas)
+            continue
+        # Keep the previous manifest entry so that the next run embeds the document again
+        known = old_files.get(name)
+        (report.files_changed if name in report.files_changed else report.files_added).remove(name)
+        report.files_failed.append(name)
+        report.chunks_embedded -= embedded
+        report.chunks_unchanged -= count - embedded
+        if known:
+            new_files[name] = known
+            report.chunks_unchanged += len(known["chunks"])
+            report.chunks_deleted -= max(len(known["chunks"]) - count, 0)
+        else:
+            del new_files[name]
+            await manager.delete_document(doc_id)
+
+    for name, old in old_files.items():
+        if name not in new_files:
+            await manager.delete_document(old["doc_id"])
+            report.files_removed.append(name)
+            report.chunks_deleted += len(old["chunks"])
+
+    save_manifest(
+        {
+            "collection_id": manager.collection_id,
+            "embedding_model": EMBEDDING_MODEL,
+            "files": new_files,
+        },
+        manifest_path,
+    )
+    return report
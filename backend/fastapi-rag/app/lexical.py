@@ -0,0 +1,186 @@
+import os
+import re
+import math
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", "./lexical_index.npz")
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+_token_re = re.compile(r"\w+(?:[.,'-]\w+)*[+#]*")
+_stopwords = frozenset(
+    "a an and are as at be but by do does for from had has have how i in is it its "
+    "me my of on or so that the their there they this to was what when where which "
+    "who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens; thousands separators are dropped from numbers."""
+    tokens = []
+    for token in _token_re.findall(text.lower()):
+        if any(c.isdigit() for c in token):
+            token = token.replace(",", "")
+        if token.endswith("'s"):
+            token = token[:-2]
+        if token and token not in _stopwords:
+            tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """Inverted index with BM25 scoring, stored as flat NumPy arrays.
+
+    Postings are kept in CSR form: the documents and term frequencies of term
+    ``t`` are ``post_docs[term_ptr[t]:term_ptr[t + 1]]`` and ``post_tf[...]``.
+    """
+
+    def __init__(
+        self,
+        vocab: Dict[str, int],
+        term_ptr: np.ndarray,
+        post_docs: np.ndarray,
+        post_tf: np.ndarray,
+        doc_len: np.ndarray,
+        text_offsets: np.ndarray,
+        text_blob: np.ndarray,
+    ):
+        self.vocab = vocab
+        self.term_ptr = term_ptr
+        self.post_docs = post_docs
+        self.post_tf = post_tf
+        self.doc_len = doc_len
+        self.text_offsets = text_offsets
+        self.text_blob = text_blob
+        self.avgdl = float(doc_len.mean()) if len(doc_len) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    @classmethod
+    def build(cls, texts: Sequence[str]) -> "BM25Index":
+        """Build the index for a list of chunk texts."""
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        doc_len = np.zeros(len(texts), dtype=np.int32)
+        for doc, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_len[doc] = sum(counts.values())
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc, tf))
+
+        terms = sorted(postings)
+        term_ptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        term_ptr[1:] = np.cumsum([len(postings[t]) for t in terms])
+        post_docs = np.fromiter((d for t in terms for d, _ in postings[t]), dtype=np.int32, count=int(term_ptr[-1]))
+        post_tf = np.fromiter((min(tf, 65535) for t in terms for _, tf in postings[t]), dtype=np.uint16, count=int(term_ptr[-1]))
+
+        encoded = [t.encode("utf-8") for t in texts]
+        text_offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        text_offsets[1:] = np.cumsum([len(e) for e in encoded])
+        text_blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls({t: i for i, t in enumerate(terms)}, term_ptr, post_docs, post_tf, doc_len, text_offsets, text_blob)
+
+    def save(self, path: str = LEXICAL_INDEX_PATH):
+        """Write the index as a single uncompressed .npz file (atomically)."""
+        vocab_blob = np.frombuffer("\n".join(sorted(self.vocab, key=self.vocab.get)).encode("utf-8"), dtype=np.uint8)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            vocab=vocab_blob,
+            term_ptr=self.term_ptr,
+            post_docs=self.post_docs,
+            post_tf=self.post_tf,
+            doc_len=self.doc_len,
+            text_offsets=self.text_offsets,
+            text_blob=self.text_blob,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = LEXICAL_INDEX_PATH) -> "BM25Index":
+        with np.load(path) as data:
+            vocab_text = data["vocab"].tobytes().decode("utf-8")
+            vocab = {t: i for i, t in enumerate(vocab_text.split("\n"))} if vocab_text else {}
+            return cls(
+                vocab,
+                data["term_ptr"],
+                data["post_docs"],
+                data["post_tf"],
+                data["doc_len"],
+                data["text_offsets"],
+                data["text_blob"],
+            )
+
+    def text(self, doc: int) -> str:
+        return self.text_blob[self.text_offsets[doc]:self.text_offsets[doc + 1]].tobytes().decode("utf-8")
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every document for ``query``."""
+        n = len(self)
+        scores = np.zeros(n, dtype=np.float32)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len / (self.avgdl or 1.0))
+        for term in set(tokenize(query)):
+            t = self.vocab.get(term)
+            if t is None:
+                continue
+            start, end = self.term_ptr[t], self.term_ptr[t + 1]
+            docs = self.post_docs[start:end]
+            tf = self.post_tf[start:end].astype(np.float32)
+            idf = math.log(1 + (n - (end - start) + 0.5) / ((end - start) + 0.5))
+            scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + norm[docs])
+        return scores
+
+    def search(self, query: str, top_k: int = 6) -> List[Tuple[str, float]]:
+        """Top-k chunks by BM25 score, as (content, score); zero scores are skipped."""
+        scores = self.scores(query)
+        k = min(top_k, int(np.count_nonzero(scores)))
+        if k <= 0:
+            return []
+        idx = np.argpartition(-scores, k - 1)[:k]
+        idx = idx[np.argsort(-scores[idx])]
+        return [(self.text(int(i)), float(scores[i])) for i in idx]
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[List[Tuple[str, float]]], top_k: int, k: int = 60
+) -> List[Tuple[str, float]]:
+    """Fuse ranked (content, score) lists with reciprocal rank fusion.
+
+    Fused scores are normalized so that a chunk ranked first in every list
+    scores 1.0.
+    """
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, (doc, _) in enumerate(ranking, start=1):
+            fused[doc] = fused.get(doc, 0.0) + 1.0 / (k + rank)
+    best = len(rankings) / (k + 1)
+    ordered = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]
+    return [(doc, score / best) for doc, score in ordered]
+
+
+_index: Optional[BM25Index] = None
+_index_key: Optional[Tuple[str, int]] = None
+
+
+def get_lexical_index(path: str = LEXICAL_INDEX_PATH) -> Optional[BM25Index]:
+    """Lazily load the on-disk index, reloading it when the file changes."""
+    global _index, _index_key
+    try:
+        key = (path, os.stat(path).st_mtime_ns)
+    except FileNotFoundError:
+        return None
+    if key != _index_key:
+        _index = BM25Index.load(path)
+        _index_key = key
+    return _index
+
+
+async def export_lexical_index(manager, path: str = LEXICAL_INDEX_PATH) -> int:
+    """Build the BM25 index from every chunk in the Chroma collection."""
+    data = await manager.get_all_chunks()
+    index = BM25Index.build(data["documents"])
+    index.save(path)
+    return len(index)
@@ -0,0 +1,138 @@
+import os
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from .logger import get_logger
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # PDF ingestion is skipped without pypdf
+    PdfReader = None
+
+logger = get_logger(__name__)
+
+EXTRACT_CACHE_PATH = os.getenv("EXTRACT_CACHE_PATH", "./extract_cache")
+
+
+def file_sha256(path: Path, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DocumentLoader:
+    """Turns a file in docs/ into markdown lines for the chunker.
+
+    ``lines`` is a generator, so the chunker and the embedding pipeline
+    consume a document while it is still being read.
+    """
+
+    extensions: tuple = ()
+
+    def available(self) -> bool:
+        """Whether the loader's dependencies are installed."""
+        return True
+
+    def lines(self, path: Path, file_hash: str) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class MarkdownLoader(DocumentLoader):
+    extensions = (".md", ".markdown")
+
+    def lines(self, path: Path, file_hash: str) -> Iterator[str]:
+        with open(path, "r", encoding="utf-8") as f:
+            yield from f
+
+
+class TextLoader(MarkdownLoader):
+    """Plain text, chunked as markdown paragraphs (blank lines separate them)."""
+
+    extensions = (".txt",)
+
+
+class PdfLoader(DocumentLoader):
+    """PDF text extracted one page at a time with pypdf (pure Python, offline).
+
+    Each page becomes a ``## Page N`` section under the document title.
+    The extracted markdown is cached under ``cache_path`` by file hash, so
+    an unchanged PDF is never parsed twice, even after a full re-ingest.
+    """
+
+    extensions = (".pdf",)
+
+    def __init__(self, cache_path: str = EXTRACT_CACHE_PATH):
+        self.cache_path = cache_path
+
+    def available(self) -> bool:
+        return PdfReader is not None
+
+    def _cache_file(self, file_hash: str) -> str:
+        return os.path.join(self.cache_path, f"{file_hash}.md")
+
+    def lines(self, path: Path, file_hash: str) -> Iterator[str]:
+        cached = self._cache_file(file_hash)
+        if os.path.exists(cached):
+            with open(cached, "r", encoding="utf-8") as f:
+                yield from f
+            return
+
+        os.makedirs(self.cache_path, exist_ok=True)
+        tmp_path = f"{cached}.tmp-{os.getpid()}"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as out:
+                for line in self._extract(path):
+                    out.write(line)
+                    yield line
+            os.replace(tmp_path, cached)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _extract(self, path: Path) -> Iterator[str]:
+        reader = PdfReader(str(path))
+        yield f"# {path.stem}\n\n"
+        for number, page in enumerate(reader.pages, start=1):
+            text = page.extract_text() or ""
+            yield f"## Page {number}\n\n"
+            for line in text.splitlines():
+                yield line.strip() + "\n"
+            yield "\n"
+
+
+# Registered loaders by file extension
+_loaders: Dict[str, DocumentLoader] = {}
+
+
+def register_loader(loader: DocumentLoader):
+    """Register ``loader`` for its extensions (replacing earlier ones)."""
+    for extension in loader.extensions:
+        _loaders[extension.lower()] = loader
+
+
+def get_loader(path: Path) -> Optional[DocumentLoader]:
+    """The loader for ``path``, or None if its type is unsupported."""
+    loader = _loaders.get(Path(path).suffix.lower())
+    return loader if loader is not None and loader.available() else None
+
+
+def supported_files(directory: Path) -> List[Path]:
+    """Files in ``directory`` that a registered loader can read, sorted by name."""
+    files = []
+    for path in sorted(Path(directory).iterdir()):
+        if not path.is_file():
+            continue
+        if get_loader(path):
+            files.append(path)
+        elif path.suffix.lower() in _loaders:
+            logger.warning(f"⚠️  Skipping {path.name}: loader dependencies are not installed")
+    return files
+
+
+register_loader(MarkdownLoader())
+register_loader(TextLoader())
+register_loader(PdfLoader())
@@ -0,0 +1,22 @@
+import os
+import sys
+import logging
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+_root = logging.getLogger("app")
+if not _root.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s"))
+    _root.addHandler(_handler)
+    _root.setLevel(LOG_LEVEL)
+    _root.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the ``app`` hierarchy, leveled by LOG_LEVEL.
+
+    Per-request messages are logged at DEBUG with %-style arguments, so they
+    cost a level check (and no string formatting) at the default INFO level.
+    """
+    return logging.getLogger(name if name.startswith("app") else f"app.{name}")
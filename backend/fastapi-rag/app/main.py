@@ -1,25 +1,53 @@
 import os
-import json
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+import time
+import uuid
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
+from starlette.background import BackgroundTask
 
 # Load environment variables first
 load_dotenv()
 
-app = FastAPI(title="Miguel's RAG Assistant", version="1.0.0")
+from .admission import Rejected, admission, client_key
+from .audio_cache import audio_cache, parse_range
+from .answer_cache import answer_cache
+from .backends import get_backend
+from .logger import get_logger
+from .metrics import ASK_REQUESTS, LLM_TOKENS_PER_SECOND, RequestTrace, registry
+from .openai_client import shared_client
+from .prefetch import prefetch_cache
+from .sessions import conversations
+from .rag import GENERATION_MODEL, embed_query, prepare_messages
+from .sse import AnswerStream, replay_frames, sse_event
+from .tts import tts_pool
+from .voice import stream_voice_answer
+from .warmup import readiness, warm_up
 
-# Check if OpenAI API key is available
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    print("⚠️  Warning: OPENAI_API_KEY not found in environment variables")
-    print("   The /ask endpoint will not work without it")
-    oclient = None
-else:
-    from openai import AsyncOpenAI
-    oclient = AsyncOpenAI()
+logger = get_logger(__name__)
+
+# One OpenAI client (and connection pool) shared by embeddings and generation
+oclient = shared_client
+if oclient is None:
+    logger.warning("⚠️  OPENAI_API_KEY not found in environment variables; /ask will not work without it")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up in the background so the port opens (and /health answers) at once."""
+    warmup_task = asyncio.create_task(warm_up(oclient))
+    yield
+    warmup_task.cancel()
+    await tts_pool.close()
+    if oclient is not None:
+        await oclient.close()
+
+
+app = FastAPI(title="Miguel's RAG Assistant", version="1.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -39,7 +67,7 @@ app.add_middleware(
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
+    """Liveness check; ``ready`` reports whether the warm-up has finished."""
     status = "healthy" if oclient else "unhealthy"
     message = "Service is running" if oclient else "OpenAI API key not configured"
     
@@ -47,10 +75,18 @@ async def health_check():
         "status": status, 
         "service": "miguel-rag",
         "message": message,
-        "openai_configured": oclient is not None
+        "openai_configured": oclient is not None,
+        **readiness.to_dict(),
     }
 
 
+@app.get("/ready")
+async def ready_check():
+    """Readiness check: 503 until the startup warm-up has finished."""
+    ready = readiness.ready and oclient is not None
+    return JSONResponse(readiness.to_dict(), status_code=200 if ready else 503)
+
+
 @app.get("/", response_class=HTMLResponse)
 async def root():
     """Serve the portfolio chat interface HTML."""
@@ -68,19 +104,127 @@ async def api_info():
     return {
         "message": "Miguel's RAG Assistant API",
         "version": "1.0.0",
-        "vector_db": "ChromaDB (Local)",
+        "vector_db": "NumPy snapshot" if os.getenv("RETRIEVAL_BACKEND") == "numpy" else "ChromaDB (Local)",
         "openai_configured": oclient is not None,
         "endpoints": {
             "GET /": "Test chat interface",
             "POST /ask": "Streaming RAG question answering",
-            "GET /health": "Health check",
+            "GET /health": "Liveness check (with warm-up status)",
+            "GET /ready": "Readiness check (503 until warmed up)",
+            "GET /cache/stats": "Answer cache hit/miss counters",
+            "GET /db/stats": "Retrieval backend stats",
+            "GET /admission/stats": "/ask concurrency slots, queue and rate limits",
+            "POST /prefetch": "Speculative retrieval for a partial question",
+            "GET /prefetch/stats": "Prefetch hit rate and wasted work",
+            "GET /sessions/stats": "Conversation sessions and query rewrites",
+            "DELETE /sessions/{session_id}": "Forget a conversation",
+            "GET /metrics": "Prometheus metrics (per-stage /ask latency)",
             "GET /docs": "API documentation"
         }
     }
 
 
+@app.get("/cache/stats")
+async def cache_stats():
+    """Answer cache hit/miss counters."""
+    return answer_cache.stats()
+
+
+@app.get("/db/stats")
+async def db_stats():
+    """Retrieval backend stats (e.g. Chroma thread pool and search coalescing)."""
+    return get_backend().stats()
+
+
+@app.get("/admission/stats")
+async def admission_stats():
+    """Slots in use, queued /ask requests and the rate-limit settings."""
+    return admission.stats()
+
+
+@app.get("/prefetch/stats")
+async def prefetch_stats():
+    """Parked prefetches, their hit rate on final questions and the wasted work."""
+    return prefetch_cache.stats()
+
+
+@app.get("/sessions/stats")
+async def session_stats():
+    """Stored conversations, history budgets and query rewrite counters."""
+    return await conversations.stats()
+
+
+@app.delete("/sessions/{session_id}", status_code=204)
+async def delete_session(session_id: str):
+    """Forget a conversation; the next /ask with this id starts afresh."""
+    await conversations.delete(session_id)
+
+
+@app.get("/tts/stats")
+async def tts_stats():
+    """TTS connection pool settings and idle/connecting sockets."""
+    return tts_pool.stats()
+
+
+@app.get("/audio/stats")
+async def audio_stats():
+    """Audio cache size, hit/miss and eviction counters."""
+    return await asyncio.to_thread(audio_cache.stats)
+
+
+@app.get("/audio/{key}")
+async def cached_audio(key: str, request: Request):
+    """Stream cached speech by key, honouring a single-range ``Range`` header."""
+    if len(key) != 64 or any(c not in "0123456789abcdef" for c in key):
+        raise HTTPException(404, "Unknown audio")
+    # Index scans, stat and utime calls hit the disk
+    size = await asyncio.to_thread(audio_cache.get, key)
+    if size is None:
+        raise HTTPException(404, "Unknown audio")
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except ValueError:
+        raise HTTPException(416, "Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+
+    metadata = await asyncio.to_thread(audio_cache.metadata, key)
+    media_type = f"audio/L16;rate={metadata['sample_rate']};channels=1" if "sample_rate" in metadata else "application/octet-stream"
+    headers = {"Accept-Ranges": "bytes"}
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(audio_cache.stream(key), media_type=media_type, headers=headers)
+    start, end = byte_range
+    headers["Content-Length"] = str(end - start + 1)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(audio_cache.stream(key, start, end), status_code=206, media_type=media_type, headers=headers)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of the /ask metrics."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/prefetch", status_code=202)
+async def prefetch(payload: dict, request: Request):
+    """Start retrieval for a partial question; ``/ask`` with the same session reuses it."""
+    if not oclient:
+        raise HTTPException(500, "OpenAI API key not configured. Please set OPENAI_API_KEY environment variable.")
+    session_id = (payload or {}).get("session_id")
+    text = (payload or {}).get("text")
+    if not session_id or not text:
+        raise HTTPException(400, "Missing session_id or text")
+    # Every prefetch costs an embedding call, so it is rate-limited like /ask (in its own bucket)
+    try:
+        await admission.check_prefetch_rate(client_key(request))
+    except Rejected as e:
+        raise HTTPException(
+            429, f"Too many requests ({e.reason}), please retry later", headers={"Retry-After": e.retry_after_header}
+        )
+    return {"status": prefetch_cache.start(str(session_id), text)}
+
+
 @app.post("/ask")
-async def ask(payload: dict):
+async def ask(payload: dict, request: Request):
     """Streaming endpoint for RAG-based question answering."""
     if not oclient:
         raise HTTPException(500, "OpenAI API key not configured. Please set OPENAI_API_KEY environment variable.")
@@ -88,55 +232,23 @@ async def ask(payload: dict):
     question = (payload or {}).get("question")
     if not question:
         raise HTTPException(400, "Missing question")
+    session_id = payload.get("session_id")
+    if session_id is not None and (not isinstance(session_id, str) or not 0 < len(session_id) <= 128):
+        raise HTTPException(400, "session_id must be a string of at most 128 characters")
+    conversation = payload.get("conversation", False)
+    if not isinstance(conversation, bool) or (conversation and session_id is None):
+        raise HTTPException(400, "conversation must be a boolean and needs a session_id")
 
+    # Rate-limit the client and wait for a slot; the slot is held until the stream ends
     try:
-        print(f"🔍 Processing question: {question}")
-        
-        # Import here to avoid startup errors
-        print("📦 Importing RAG modules...")
-        from .rag import retrieve, build_user_prompt, SYSTEM_PROMPT, GENERATION_MODEL
-        print("✅ RAG modules imported successfully")
-        
-        # Get contexts from RAG system
-        print("🔍 Retrieving contexts...")
-        contexts = await retrieve(question)
-        print(f"✅ Retrieved {len(contexts)} contexts")
-        
-        context_texts = [c for c, _ in contexts]
+        ticket = await admission.admit(client_key(request))
+    except Rejected as e:
+        raise HTTPException(
+            429, f"Too many requests ({e.reason}), please retry later", headers={"Retry-After": e.retry_after_header}
+        )
 
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": build_user_prompt(question, context_texts)},
-        ]
-
-        print("🤖 Generating response...")
-        
-        async def sse_stream():
-            # Send context information
-            yield "event: context\n".encode()
-            yield f"data: {json.dumps({'snippets': contexts})}\n\n".encode()
-
-            # Stream the response
-            stream = await oclient.chat.completions.create(
-                model=GENERATION_MODEL,
-                messages=messages,
-                temperature=0.4,
-                stream=True,
-                max_tokens=int(os.getenv("MAX_TOKENS", "600")),
-            )
-
-            full = ""
-            async for part in stream:
-                token = part.choices[0].delta.content or ""
-                if token:
-                    full += token
-                    yield b"event: token\n"
-                    yield f"data: {{\"token\": {json.dumps(token)}}}\n\n".encode()
-            
-            print(f"🤖 Generated response: {full}")
-            # Send completion event
-            yield b"event: done\n"
-            yield f"data: {{\"text\": {json.dumps(full)}}}\n\n".encode()
+    try:
+        logger.debug("🔍 Processing question: %s", question)
 
         headers = {
             "Content-Type": "text/event-stream; charset=utf-8",
@@ -145,18 +257,172 @@ async def ask(payload: dict):
             # Let the CORS middleware handle this
             # "Access-Control-Allow-Origin": os.getenv("CORS_ORIGIN", "*")
         }
-        return StreamingResponse(sse_stream(), headers=headers)
+        trace = RequestTrace("ask")
+
+        # Follow-ups in a conversation are retrieved with a standalone rewrite of the question.
+        # Only clients that ask for one pay for it; a bare session_id is just the prefetch key.
+        session = await conversations.load(session_id) if conversation else None
+        follow_up = session is not None and bool(session.turns)
+        query = question
+        if follow_up:
+            with trace.stage("rewrite"):
+                query = await conversations.rewrite_query(question, session, oclient)
+
+        # Replay a cached answer for near-duplicate questions; reuse a prefetch for the session
+        with trace.stage("embed"):
+            if session_id:
+                qvec, prefetched = await prefetch_cache.claim(session_id, query)
+            else:
+                qvec, prefetched = await embed_query(question), None
+        version = get_backend().version
+        # Answers to follow-ups depend on the conversation, so they are neither replayed nor cached
+        cached = None if follow_up else answer_cache.lookup(qvec, version)
+        if cached:
+            logger.debug("⚡ Answer cache hit")
+
+            async def sse_replay():
+                try:
+                    yield sse_event("context", {"snippets": cached.contexts})
+                    async for frame in replay_frames(cached.tokens):
+                        yield frame
+                    yield sse_event("done", {"text": cached.text})
+                    if session is not None:
+                        await conversations.record_turn(session, question, cached.text, oclient, trace.start)
+                    trace.finish("cache_hit")
+                finally:
+                    ticket.release()
+
+            return StreamingResponse(sse_replay(), headers=headers, background=BackgroundTask(ticket.release))
+
+        # Get contexts from RAG system and fit them into the prompt budget
+        history = conversations.history_messages(session) if session is not None else None
+        contexts, messages = await prepare_messages(
+            question, qvec, trace, contexts=prefetched, query=query, history=history
+        )
+        if session is not None:
+            conversations.observe_prompt(session, messages)
+
+        async def sse_stream():
+            # Send context information
+            yield sse_event("context", {"snippets": contexts})
+
+            answer = None
+            try:
+                # Stream the response
+                llm_start = time.perf_counter()
+                stream = await oclient.chat.completions.create(
+                    model=GENERATION_MODEL,
+                    messages=messages,
+                    temperature=0.4,
+                    stream=True,
+                    max_tokens=int(os.getenv("MAX_TOKENS", "600")),
+                )
+                answer = AnswerStream(stream, is_disconnected=request.is_disconnected)
+                async for frame in answer.frames():
+                    yield frame
+                if answer.aborted:
+                    logger.info("🔌 Client disconnected after %d tokens, closed the LLM stream", len(answer.tokens))
+                    trace.finish("aborted")
+                    return
+
+                trace.record("llm_stream", time.perf_counter() - llm_start)
+                if answer.first_token_at is not None:
+                    trace.record("llm_ttft", answer.first_token_at - llm_start)
+                    if answer.last_token_at > answer.first_token_at:
+                        LLM_TOKENS_PER_SECOND.observe(
+                            len(answer.tokens) / (answer.last_token_at - answer.first_token_at)
+                        )
+                logger.debug("🤖 Generated response: %s", answer.text)
+                if not follow_up:
+                    answer_cache.store(qvec, version, contexts, answer.tokens)
+                if session is not None:
+                    await conversations.record_turn(session, question, answer.text, oclient, trace.start)
+                # Send completion event
+                yield sse_event("done", {"text": answer.text})
+                trace.finish("answered")
+            except (asyncio.CancelledError, GeneratorExit):
+                # The server cancelled or closed the stream (client went away)
+                trace.finish("aborted")
+                raise
+            except Exception:
+                trace.finish("error")
+                raise
+            finally:
+                ticket.release()
+                if answer is not None:
+                    await answer.aclose()
+
+        # The background task also frees the slot if the stream never started
+        return StreamingResponse(sse_stream(), headers=headers, background=BackgroundTask(ticket.release))
         
-    except ImportError as e:
-        print(f"❌ Import error: {e}")
-        raise HTTPException(500, f"RAG system not ready: {e}")
     except Exception as e:
-        print(f"❌ General error: {e}")
-        import traceback
-        traceback.print_exc()
+        ticket.release()
+        logger.exception("❌ Error processing question: %s", e)
+        ASK_REQUESTS.inc("error")
         raise HTTPException(500, f"Error processing question: {e}")
 
 
+@app.websocket("/ws/voice")
+async def voice(websocket: WebSocket):
+    """Spoken answers: send ``{"question": ...}``, receive JSON events and PCM frames.
+
+    Events per question: ``context``, ``audio_start`` (PCM format), one
+    ``token`` per LLM token interleaved with binary audio frames, then
+    ``done`` with the answer text and its latency metrics, or ``error``.
+    The socket stays open for further questions. Interim speech recognition
+    results can be sent as ``{"partial": ...}`` to prefetch retrieval.
+    """
+    await websocket.accept()
+    session_id = f"voice-{uuid.uuid4().hex}"
+    try:
+        while True:
+            payload = await websocket.receive_json()
+            question = (payload or {}).get("question")
+            partial = (payload or {}).get("partial")
+            if partial and not question:
+                if oclient:
+                    try:
+                        await admission.check_prefetch_rate(client_key(websocket))
+                    except Rejected:
+                        continue  # Prefetching is best effort; skip it when over the limit
+                    prefetch_cache.start(session_id, partial)
+                continue
+            if not question:
+                await websocket.send_json({"type": "error", "status": 400, "detail": "Missing question"})
+                continue
+            if not oclient or not tts_pool.configured:
+                await websocket.send_json({"type": "error", "status": 500, "detail": "OpenAI or ElevenLabs is not configured"})
+                continue
+
+            try:
+                ticket = await admission.admit(client_key(websocket))
+            except Rejected as e:
+                await websocket.send_json(
+                    {"type": "error", "status": 429, "detail": e.reason, "retry_after": e.retry_after_header}
+                )
+                continue
+            try:
+                await stream_voice_answer(
+                    question, websocket.send_json, websocket.send_bytes, oclient, session_id=session_id
+                )
+            except WebSocketDisconnect:
+                raise
+            except Exception as e:
+                logger.exception("❌ Error answering voice question: %s", e)
+                await websocket.send_json({"type": "error", "status": 500, "detail": f"Error processing question: {e}"})
+            finally:
+                ticket.release()
+    except WebSocketDisconnect:
+        logger.debug("🔌 Voice client disconnected")
+
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    workers = int(os.getenv("WORKERS", "1"))
+    if workers > 1:
+        # Workers share the vector snapshot's pages; each would open its own ChromaDB
+        if os.getenv("RETRIEVAL_BACKEND", "chroma") != "numpy":
+            logger.warning("⚠️  WORKERS > 1 with ChromaDB loads the index once per worker; use RETRIEVAL_BACKEND=numpy")
+        uvicorn.run("app.main:app", host="0.0.0.0", port=8001, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
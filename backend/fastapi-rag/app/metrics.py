@@ -0,0 +1,257 @@
+import time
+import bisect
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .logger import get_logger
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # OpenTelemetry is optional
+    otel_trace = None
+
+logger = get_logger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RATE_BUCKETS = (5, 10, 20, 40, 60, 80, 100, 150, 200, 400)
+TOKEN_BUCKETS = (100, 250, 500, 750, 1000, 1500, 2000, 3000, 4000, 8000)
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter, optionally split by label values."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in sorted(self._values.items())
+        ]
+
+
+class Gauge:
+    """Value that can go up and down (e.g. requests in flight)."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = float(value)
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+            for labels, value in sorted(self._values.items())
+        ]
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [count per bucket (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def count(self, *labels: str) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                le_label = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total[0]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together by GET /metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# Global instance
+registry = Registry()
+
+ASK_REQUESTS = registry.register(
+    Counter("rag_ask_requests_total", "Answered /ask requests by outcome", ["outcome"])
+)
+ASK_STAGE_SECONDS = registry.register(
+    Histogram("rag_ask_stage_seconds", "Latency of each /ask pipeline stage", ["stage"])
+)
+PROMPT_TOKENS = registry.register(
+    Histogram("rag_prompt_tokens", "User prompt tokens before and after context packing", ["stage"], TOKEN_BUCKETS)
+)
+LLM_TOKENS_PER_SECOND = registry.register(
+    Histogram("rag_llm_tokens_per_second", "Streamed completion tokens per second", buckets=RATE_BUCKETS)
+)
+OPENAI_REQUESTS = registry.register(
+    Counter("rag_openai_requests_total", "Requests to the OpenAI API by endpoint", ["endpoint"])
+)
+OPENAI_RETRIES = registry.register(
+    Counter("rag_openai_retries_total", "OpenAI retries by cause (budget_exhausted = retry refused)", ["reason"])
+)
+ADMISSION_WAIT_SECONDS = registry.register(
+    Histogram("rag_admission_wait_seconds", "Time /ask requests spent queued for a slot", ["outcome"])
+)
+ADMISSION_REJECTED = registry.register(
+    Counter("rag_admission_rejected_total", "/ask requests refused with 429 by reason", ["reason"])
+)
+ADMISSION_ACTIVE = registry.register(
+    Gauge("rag_admission_active", "/ask requests currently holding a slot")
+)
+ADMISSION_QUEUED = registry.register(
+    Gauge("rag_admission_queued", "/ask requests waiting for a slot")
+)
+RETRIEVAL_CACHE_LOOKUPS = registry.register(
+    Counter("rag_retrieval_cache_lookups_total", "Retrieval cache lookups by result (exact, similar, miss)", ["result"])
+)
+RETRIEVAL_CACHE_ENTRIES = registry.register(
+    Gauge("rag_retrieval_cache_entries", "Search results held in the retrieval cache")
+)
+VOICE_FIRST_AUDIO_SECONDS = registry.register(
+    Histogram("rag_voice_first_audio_seconds", "Time from a voice question to its first audio frame", ["source"])
+)
+TTS_CONNECTIONS = registry.register(
+    Counter("rag_tts_connections_total", "TTS WebSocket connections by how they were used (warm, cold, stale)", ["kind"])
+)
+PREFETCH_REQUESTS = registry.register(
+    Counter("rag_prefetch_requests_total", "/prefetch calls by what was done (started, duplicate, too_short, busy)", ["result"])
+)
+PREFETCH_LOOKUPS = registry.register(
+    Counter("rag_prefetch_lookups_total", "Final questions by prefetch reuse (exact, similar, miss, none)", ["result"])
+)
+PREFETCH_WASTED = registry.register(
+    Counter("rag_prefetch_wasted_total", "Prefetches whose results were never used, by reason", ["reason"])
+)
+PREFETCH_WASTED_SECONDS = registry.register(
+    Counter("rag_prefetch_wasted_seconds_total", "Embedding and retrieval time spent on unused prefetches", ["reason"])
+)
+SESSION_TURN_SECONDS = registry.register(
+    Histogram("rag_session_turn_seconds", "Latency of one conversation turn, from request to stored answer")
+)
+SESSION_PROMPT_TOKENS = registry.register(
+    Histogram("rag_session_prompt_tokens", "Prompt tokens of a conversation turn by part (summary, history, total)", ["part"], TOKEN_BUCKETS)
+)
+SESSION_SUMMARIES = registry.register(
+    Counter("rag_session_summaries_total", "Background history summarizations by outcome", ["outcome"])
+)
+
+
+class RequestTrace:
+    """Stage timings of one request.
+
+    Each stage is observed in ``rag_ask_stage_seconds`` and, when
+    OpenTelemetry is installed, recorded as a child span of the request span
+    (spans are no-ops unless an SDK/exporter is configured).
+    """
+
+    def __init__(self, name: str = "ask"):
+        self.name = name
+        self.start = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self._span = otel_trace.get_tracer("app").start_span(name) if otel_trace else None
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[Optional[object]]:
+        """Time the enclosed block as ``stage``."""
+        span = None
+        if self._span is not None:
+            span = otel_trace.get_tracer("app").start_span(
+                f"{self.name}.{stage}", context=otel_trace.set_span_in_context(self._span)
+            )
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            self.record(stage, time.perf_counter() - start)
+            if span is not None:
+                span.end()
+
+    def record(self, stage: str, seconds: float):
+        """Record a stage measured elsewhere (e.g. time to first token)."""
+        self.timings[stage] = seconds
+        ASK_STAGE_SECONDS.observe(seconds, stage)
+        if self._span is not None:
+            self._span.set_attribute(f"{stage}_ms", round(seconds * 1000, 2))
+
+    def finish(self, outcome: str):
+        """Record the total duration and the request outcome."""
+        self.record("total", time.perf_counter() - self.start)
+        ASK_REQUESTS.inc(outcome)
+        if self._span is not None:
+            self._span.set_attribute("outcome", outcome)
+            self._span.end()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "⏱️  %s %s: %s",
+                self.name,
+                outcome,
+                " ".join(f"{k}={v * 1000:.1f}ms" for k, v in self.timings.items()),
+            )
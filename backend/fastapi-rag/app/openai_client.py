@@ -0,0 +1,177 @@
+import os
+import time
+import random
+import asyncio
+import importlib.util
+from typing import Any, Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from .logger import get_logger
+from .metrics import OPENAI_REQUESTS, OPENAI_RETRIES
+
+logger = get_logger(__name__)
+
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "50"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "120"))
+OPENAI_HTTP2 = os.getenv("OPENAI_HTTP2", "0") == "1"
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+OPENAI_RETRY_BUDGET = float(os.getenv("OPENAI_RETRY_BUDGET", "0.2"))
+OPENAI_RETRY_MIN_PER_SEC = float(os.getenv("OPENAI_RETRY_MIN_PER_SEC", "1"))
+OPENAI_BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", "0.25"))
+OPENAI_BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", "8"))
+
+RETRY_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504})
+# Safe to send twice: a repeated embedding request returns the same vectors
+IDEMPOTENT_ENDPOINTS = frozenset({"embeddings"})
+
+
+class RetryBudget:
+    """Caps retries at a fraction of requests, so outages don't multiply load.
+
+    Every request deposits ``ratio`` tokens and every retry withdraws one.
+    ``min_per_sec`` tokens accrue over time so that low-traffic periods can
+    still retry; the balance is capped at ten seconds' worth of either.
+    """
+
+    def __init__(self, ratio: float = OPENAI_RETRY_BUDGET, min_per_sec: float = OPENAI_RETRY_MIN_PER_SEC):
+        self.ratio = ratio
+        self.min_per_sec = min_per_sec
+        self.capacity = max(1.0, 10 * min_per_sec)
+        self.tokens = self.capacity
+        self._last = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.min_per_sec)
+        self._last = now
+
+    def on_request(self):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def try_retry(self) -> bool:
+        self._refill()
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+def _backoff(attempt: int, response: Optional[httpx.Response]) -> float:
+    """Exponential backoff with full jitter, never shorter than Retry-After."""
+    delay = random.uniform(0, min(OPENAI_BACKOFF_MAX, OPENAI_BACKOFF_BASE * 2 ** attempt))
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return min(OPENAI_BACKOFF_MAX, max(delay, float(retry_after))) if retry_after else delay
+    except ValueError:
+        return delay
+
+
+class RetryingTransport(httpx.AsyncBaseTransport):
+    """HTTP transport that retries connection errors and retryable statuses.
+
+    Replaces the SDK's per-client retries (``max_retries=0``) so that every
+    retry, for embeddings and chat alike, is drawn from one shared budget.
+    Streamed responses are only retried before their body is read. A
+    connection that drops after the request was sent is only retried for
+    idempotent endpoints, since a completion may already have been billed.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, budget: RetryBudget, max_retries: int = OPENAI_MAX_RETRIES):
+        self.transport = transport
+        self.budget = budget
+        self.max_retries = max_retries
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.budget.on_request()
+        endpoint = request.url.path.rsplit("/", 1)[-1]
+        OPENAI_REQUESTS.inc(endpoint)
+        attempt = 0
+        while True:
+            try:
+                response = await self.transport.handle_async_request(request)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError) as e:
+                # Connect errors happen before anything was sent; a dropped connection may not have
+                sent = isinstance(e, httpx.RemoteProtocolError)
+                if (sent and endpoint not in IDEMPOTENT_ENDPOINTS) or not self._may_retry(attempt):
+                    raise
+                reason, response = type(e).__name__, None
+            else:
+                if response.status_code not in RETRY_STATUSES or not self._may_retry(attempt):
+                    return response
+                reason = str(response.status_code)
+                await response.aclose()
+            OPENAI_RETRIES.inc(reason)
+            await asyncio.sleep(_backoff(attempt, response))
+            attempt += 1
+
+    def _may_retry(self, attempt: int) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        if not self.budget.try_retry():
+            OPENAI_RETRIES.inc("budget_exhausted")
+            return False
+        return True
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+def create_http_client(
+    max_connections: int = OPENAI_MAX_CONNECTIONS,
+    max_keepalive: int = OPENAI_MAX_KEEPALIVE,
+    http2: bool = OPENAI_HTTP2,
+    max_retries: int = OPENAI_MAX_RETRIES,
+    budget: Optional[RetryBudget] = None,
+) -> httpx.AsyncClient:
+    """Pooled httpx client with keep-alive, optional HTTP/2 and budgeted retries."""
+    if http2 and not http2_available():
+        logger.warning("⚠️  OPENAI_HTTP2 is set but h2 is not installed; using HTTP/1.1")
+        http2 = False
+    transport = httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+        ),
+        http2=http2,
+    )
+    return httpx.AsyncClient(
+        transport=RetryingTransport(transport, budget or retry_budget, max_retries),
+        timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT),
+        follow_redirects=True,
+    )
+
+
+def create_openai_client(
+    api_key: Optional[str] = None, base_url: Optional[str] = None, **http_options: Any
+) -> Optional[AsyncOpenAI]:
+    """AsyncOpenAI on a pooled HTTP client; None when no API key is configured.
+
+    ``http_options`` are passed to ``create_http_client``.
+    """
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+    return AsyncOpenAI(
+        api_key=api_key,
+        base_url=base_url,
+        max_retries=0,
+        http_client=create_http_client(**http_options),
+    )
+
+
+# Global instance
+retry_budget = RetryBudget()
+
+# One client, and one connection pool, for every OpenAI call in the process
+shared_client = create_openai_client()
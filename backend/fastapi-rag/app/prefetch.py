@@ -0,0 +1,216 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .backends import get_backend
+from .logger import get_logger
+from .metrics import PREFETCH_LOOKUPS, PREFETCH_REQUESTS, PREFETCH_WASTED, PREFETCH_WASTED_SECONDS
+from .rag import embed_query, retrieve
+from .retrieval_cache import normalize_query
+
+logger = get_logger(__name__)
+
+PREFETCH_TTL = float(os.getenv("PREFETCH_TTL", "30"))
+PREFETCH_MAX_SESSIONS = int(os.getenv("PREFETCH_MAX_SESSIONS", "1024"))
+PREFETCH_MAX_INFLIGHT = int(os.getenv("PREFETCH_MAX_INFLIGHT", "16"))
+PREFETCH_MIN_CHARS = int(os.getenv("PREFETCH_MIN_CHARS", "12"))
+PREFETCH_THRESHOLD = float(os.getenv("PREFETCH_THRESHOLD", "0.92"))
+
+# (content, score) results of one search
+Contexts = List[Tuple[str, float]]
+
+
+class Prefetch:
+    """Speculative embedding + retrieval for a partial question of one session."""
+
+    __slots__ = ("text", "key", "version", "task", "created_at", "elapsed")
+
+    def __init__(self, text: str, version: int):
+        self.text = text
+        self.key = normalize_query(text)
+        self.version = version
+        self.task: Optional[asyncio.Task] = None
+        self.created_at = time.monotonic()
+        self.elapsed = 0.0
+
+
+class PrefetchCache:
+    """Short-lived per-session results of speculative retrieval.
+
+    Clients send partial questions (debounced keystrokes, interim speech
+    recognition) while the user is still typing or speaking; each one
+    starts embedding and retrieval in the background and replaces the
+    session's previous prefetch. The final question claims the parked
+    result: the same text reuses both the embedding and the contexts, a
+    question whose embedding is within ``threshold`` cosine similarity
+    reuses the contexts. Results older than ``ttl`` are dropped, at most
+    ``max_inflight`` prefetches run at once and every prefetch that is
+    never used is counted as wasted work.
+    """
+
+    def __init__(
+        self,
+        ttl: float = PREFETCH_TTL,
+        max_sessions: int = PREFETCH_MAX_SESSIONS,
+        max_inflight: int = PREFETCH_MAX_INFLIGHT,
+        min_chars: int = PREFETCH_MIN_CHARS,
+        threshold: float = PREFETCH_THRESHOLD,
+    ):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_inflight = max_inflight
+        self.min_chars = min_chars
+        self.threshold = threshold
+        self._sessions: "OrderedDict[str, Prefetch]" = OrderedDict()
+        self._inflight = 0
+        self.lookups = {"exact": 0, "similar": 0, "miss": 0, "none": 0}
+        self.wasted = {"superseded": 0, "expired": 0, "mismatch": 0, "stale": 0, "error": 0}
+        self.wasted_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_sessions > 0
+
+    async def _run(self, prefetch: Prefetch) -> Tuple[List[float], Contexts]:
+        start = time.perf_counter()
+        try:
+            qvec = await embed_query(prefetch.text)
+            contexts = await retrieve(prefetch.text, qvec=qvec)
+            return qvec, contexts
+        finally:
+            prefetch.elapsed = time.perf_counter() - start
+
+    def _finished(self, task: asyncio.Task):
+        self._inflight -= 1
+        # Retrieve the exception so a failed prefetch is not logged as unhandled
+        if not task.cancelled():
+            task.exception()
+
+    def _lookup(self, result: str):
+        self.lookups[result] += 1
+        PREFETCH_LOOKUPS.inc(result)
+
+    def _discard(self, prefetch: Prefetch, reason: str):
+        """Count a prefetch whose results will not be used."""
+
+        def count_time(_=None):
+            self.wasted_seconds += prefetch.elapsed
+            PREFETCH_WASTED_SECONDS.inc(reason, amount=prefetch.elapsed)
+
+        self.wasted[reason] += 1
+        PREFETCH_WASTED.inc(reason)
+        if prefetch.task is not None and not prefetch.task.done():
+            # Let it finish (it may share an embedding batch) and count its time when it does
+            prefetch.task.add_done_callback(count_time)
+        else:
+            count_time()
+
+    def _expire(self):
+        now = time.monotonic()
+        while self._sessions:
+            session_id, prefetch = next(iter(self._sessions.items()))
+            if now - prefetch.created_at <= self.ttl and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[session_id]
+            self._discard(prefetch, "expired")
+
+    def start(self, session_id: str, text: str) -> str:
+        """Begin prefetching ``text`` for the session; returns what was done.
+
+        ``started``, ``duplicate`` (already prefetching the same text),
+        ``too_short`` or ``busy`` (too many prefetches in flight).
+        """
+        self._expire()
+        if not self.enabled or len(text.strip()) < self.min_chars:
+            PREFETCH_REQUESTS.inc("too_short")
+            return "too_short"
+        previous = self._sessions.get(session_id)
+        if previous is not None and previous.key == normalize_query(text):
+            PREFETCH_REQUESTS.inc("duplicate")
+            return "duplicate"
+        if self._inflight >= self.max_inflight:
+            PREFETCH_REQUESTS.inc("busy")
+            return "busy"
+
+        prefetch = Prefetch(text, get_backend().version)
+        self._inflight += 1
+        prefetch.task = asyncio.create_task(self._run(prefetch))
+        prefetch.task.add_done_callback(self._finished)
+        if previous is not None:
+            self._discard(previous, "superseded")
+        self._sessions[session_id] = prefetch
+        self._sessions.move_to_end(session_id)
+        self._expire()
+        PREFETCH_REQUESTS.inc("started")
+        return "started"
+
+    def _similar(self, a: List[float], b: List[float]) -> bool:
+        a, b = np.asarray(a, dtype=np.float32), np.asarray(b, dtype=np.float32)
+        norm = np.linalg.norm(a) * np.linalg.norm(b)
+        return bool(norm) and float(a @ b) / norm >= self.threshold
+
+    async def claim(self, session_id: Optional[str], question: str) -> Tuple[List[float], Optional[Contexts]]:
+        """The final question's embedding, plus prefetched contexts when they can be reused.
+
+        Always returns the embedding (computed now unless the prefetch had
+        the same text); the contexts are None on a miss.
+        """
+        self._expire()
+        prefetch = self._sessions.pop(session_id, None) if session_id else None
+        if prefetch is None:
+            if session_id:
+                self._lookup("none")
+            return await embed_query(question), None
+
+        stale = prefetch.version != get_backend().version
+        if prefetch.key == normalize_query(question) and not stale:
+            try:
+                qvec, contexts = await prefetch.task
+            except Exception as e:
+                logger.warning(f"⚠️  Prefetch failed: {e}")
+            else:
+                self._lookup("exact")
+                return qvec, contexts
+            self._lookup("miss")
+            self._discard(prefetch, "error")
+            return await embed_query(question), None
+
+        # The final embedding is needed either way; wait for both together
+        qvec, prefetched = await asyncio.gather(embed_query(question), prefetch.task, return_exceptions=True)
+        if isinstance(qvec, BaseException):
+            self._discard(prefetch, "error")
+            raise qvec
+        if isinstance(prefetched, BaseException):
+            reason = "error"
+        elif stale:
+            reason = "stale"
+        elif not self._similar(prefetched[0], qvec):
+            reason = "mismatch"
+        else:
+            self._lookup("similar")
+            return qvec, prefetched[1]
+        self._lookup("miss")
+        self._discard(prefetch, reason)
+        return qvec, None
+
+    def stats(self) -> Dict[str, Any]:
+        """Parked sessions, hit rate of final questions and the work thrown away."""
+        claimed = sum(self.lookups.values())
+        hits = self.lookups["exact"] + self.lookups["similar"]
+        return {
+            "enabled": self.enabled,
+            "sessions": len(self._sessions),
+            "inflight": self._inflight,
+            "lookups": dict(self.lookups),
+            "hit_rate": round(hits / claimed, 4) if claimed else 0.0,
+            "wasted": dict(self.wasted),
+            "wasted_seconds": round(self.wasted_seconds, 3),
+        }
+
+
+# Global instance
+prefetch_cache = PrefetchCache()
@@ -1,49 +1,103 @@
-import re
-from typing import List, Tuple
+import asyncio
+from typing import Dict, List, Optional, Tuple
 import os
 from openai import AsyncOpenAI
 
-from .chroma_db import chroma_manager
+from .batching import MicroBatcher
+from .chunking import chunk_markdown_stream
+from .backends import get_backend
+from .context_packing import pack_contexts
+from .embedding_store import content_hash, embedding_store
+from .lexical import get_lexical_index, reciprocal_rank_fusion
+from .logger import get_logger
+from .metrics import PROMPT_TOKENS, RequestTrace
+from .openai_client import shared_client
+from .tokens import count_tokens
+
+logger = get_logger(__name__)
 
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
 GENERATION_MODEL = os.getenv("GENERATION_MODEL", "gpt-4o-mini")
 RAG_NAMESPACE = os.getenv("RAG_NAMESPACE", "miguel")
 TOP_K = int(os.getenv("TOP_K", "6"))
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector")
+RRF_K = int(os.getenv("RRF_K", "60"))
+RRF_CANDIDATES = int(os.getenv("RRF_CANDIDATES", "12"))
+EMBED_QUERY_MAX_WAIT_MS = float(os.getenv("EMBED_QUERY_MAX_WAIT_MS", "3"))
+EMBED_QUERY_MAX_BATCH = int(os.getenv("EMBED_QUERY_MAX_BATCH", "64"))
 
-client = AsyncOpenAI()
+# Shared by embeddings and the /ask chat completions
+client = shared_client
 
-_sentence_splitter = re.compile(r"(?<=[.!?])\s+")
+def chunk_markdown(text: str, max_len: int = 1000) -> List[str]:
+    """Split markdown text into chunks of at most ``max_len`` characters.
 
+    Character-sized, overlap-free wrapper around ``chunk_markdown_stream``.
+    """
+    return [chunk.text for chunk in chunk_markdown_stream(text, max_len, 0, length=len)]
 
-def chunk_markdown(text: str, max_len: int = 1000) -> List[str]:
-    """Split markdown text into chunks based on sentences."""
-    parts: List[str] = []
-    buf = ""
-    for s in _sentence_splitter.split(text.replace("\r", "")):
-        if len((buf + " " + s).strip()) > max_len:
-            if buf:
-                parts.append(buf.strip())
-            buf = s
-        else:
-            buf = (buf + " " + s).strip()
-    if buf:
-        parts.append(buf.strip())
-    return parts
-
-
-async def embed(texts: List[str]) -> List[List[float]]:
-    """Generate embeddings for a list of texts."""
-    resp = await client.embeddings.create(model=EMBEDDING_MODEL, input=texts)
-    return [d.embedding for d in resp.data]
-
-
-async def retrieve(query_text: str, top_k: int = TOP_K) -> List[Tuple[str, float]]:
-    """Retrieve relevant documents using vector similarity search."""
-    qvec = (await embed([query_text]))[0]
+
+async def embed(texts: List[str], openai_client: Optional[AsyncOpenAI] = None) -> List[List[float]]:
+    """Generate embeddings for a list of texts.
+
+    Vectors are served from the persistent embedding store when available;
+    only texts never embedded with EMBEDDING_MODEL hit the OpenAI API.
+    Store reads and writes (SQLite) run in a thread, off the event loop.
+    """
+    cached = await asyncio.to_thread(embedding_store.get_many, EMBEDDING_MODEL, texts)
+    hashes = [content_hash(t) for t in texts]
+
+    missing = list({h: t for h, t in zip(hashes, texts) if h not in cached}.values())
+    if missing:
+        resp = await (openai_client or client).embeddings.create(model=EMBEDDING_MODEL, input=missing)
+        vectors = [d.embedding for d in resp.data]
+        await asyncio.to_thread(embedding_store.put_many, EMBEDDING_MODEL, missing, vectors)
+        cached.update(zip((content_hash(t) for t in missing), vectors))
+
+    return [cached[h] for h in hashes]
+
+
+# Concurrent /ask requests share embedding round trips: queries arriving
+# within EMBED_QUERY_MAX_WAIT_MS are sent in a single embeddings.create call.
+query_batcher = MicroBatcher(
+    lambda texts: embed(texts),
+    max_wait=EMBED_QUERY_MAX_WAIT_MS / 1000,
+    max_batch=EMBED_QUERY_MAX_BATCH,
+)
+
+
+async def embed_query(query_text: str) -> List[float]:
+    """Generate the embedding for a single query (micro-batched)."""
+    return await query_batcher.submit(query_text)
+
+
+async def retrieve(
+    query_text: str, top_k: int = TOP_K, qvec: Optional[List[float]] = None
+) -> List[Tuple[str, float]]:
+    """Retrieve relevant documents using vector similarity search.
+
+    With RETRIEVAL_MODE=hybrid a BM25 search over the lexical index runs
+    concurrently and both rankings are merged with reciprocal rank fusion;
+    scores are then fused RRF scores (1.0 = ranked first by both).
+    Pass ``qvec`` when the query embedding has already been computed.
+    """
+    lexical_task = None
+    if RETRIEVAL_MODE == "hybrid":
+        lexical_index = get_lexical_index()
+        if lexical_index is not None:
+            lexical_task = asyncio.ensure_future(
+                asyncio.to_thread(lexical_index.search, query_text, max(top_k, RRF_CANDIDATES))
+            )
+
+    if qvec is None:
+        qvec = await embed_query(query_text)
     
-    # Use ChromaDB for vector similarity search
-    results = await chroma_manager.search_similar(qvec, top_k)
-    return results
+    # Vector similarity search on the configured backend (RETRIEVAL_BACKEND)
+    if lexical_task is None:
+        return await get_backend().search_similar(qvec, top_k, query_text=query_text)
+
+    vector_results = await get_backend().search_similar(qvec, max(top_k, RRF_CANDIDATES), query_text=query_text)
+    return reciprocal_rank_fusion([vector_results, await lexical_task], top_k, RRF_K)
 
 
 SYSTEM_PROMPT = (
@@ -58,4 +112,49 @@ SYSTEM_PROMPT = (
 def build_user_prompt(question: str, contexts: List[str]) -> str:
     """Build the user prompt with context for the LLM."""
     ctx = "\n\n".join(f"[[CTX {i+1}]]\n{c}" for i, c in enumerate(contexts))
-    return f"Context:\n{ctx}\n\nQuestion: {question}\n\nAnswer as Miguel."
\ No newline at end of file
+    return f"Context:\n{ctx}\n\nQuestion: {question}\n\nAnswer as Miguel."
+
+
+async def prepare_messages(
+    question: str,
+    qvec: List[float],
+    trace: RequestTrace,
+    contexts: Optional[List[Tuple[str, float]]] = None,
+    query: Optional[str] = None,
+    history: Optional[List[Dict[str, str]]] = None,
+) -> Tuple[List[Tuple[str, float]], List[Dict[str, str]]]:
+    """Retrieve and pack the contexts for a question; return them and the chat messages.
+
+    Pass ``contexts`` to skip retrieval (e.g. when they were prefetched),
+    ``query`` to retrieve with a rewritten query and ``history`` for the
+    conversation messages that go between the system prompt and the question.
+    """
+    if contexts is None:
+        with trace.stage("retrieve"):
+            contexts = await retrieve(query or question, qvec=qvec)
+
+    # Fit the contexts into the prompt token budget
+    with trace.stage("prompt_build"):
+        retrieved_prompt = build_user_prompt(question, [c for c, _ in contexts])
+        contexts, pack_stats = pack_contexts(contexts)
+        user_prompt = build_user_prompt(question, [c for c, _ in contexts])
+        prompt_tokens = (count_tokens(retrieved_prompt), count_tokens(user_prompt))
+    PROMPT_TOKENS.observe(prompt_tokens[0], "retrieved")
+    PROMPT_TOKENS.observe(prompt_tokens[1], "packed")
+    logger.debug(
+        "✂️  Packed contexts: %d → %d chunks (low score: %d, duplicates: %d, over budget: %d), "
+        "prompt tokens %d → %d",
+        pack_stats["chunks_in"],
+        pack_stats["chunks_out"],
+        pack_stats["dropped_low_score"],
+        pack_stats["dropped_duplicate"],
+        pack_stats["dropped_budget"],
+        *prompt_tokens,
+    )
+
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        *(history or []),
+        {"role": "user", "content": user_prompt},
+    ]
+    return contexts, messages
@@ -0,0 +1,189 @@
+import os
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .metrics import RETRIEVAL_CACHE_ENTRIES, RETRIEVAL_CACHE_LOOKUPS
+
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "512"))
+RETRIEVAL_CACHE_LSH_BITS = int(os.getenv("RETRIEVAL_CACHE_LSH_BITS", "8"))
+RETRIEVAL_CACHE_THRESHOLD = float(os.getenv("RETRIEVAL_CACHE_THRESHOLD", "0.98"))
+
+_word_re = re.compile(r"\w+")
+
+# (content, score) results of one search
+Results = List[Tuple[str, float]]
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase words only, so case, spacing and punctuation don't matter."""
+    return " ".join(_word_re.findall(text.lower()))
+
+
+class _Entry:
+    __slots__ = ("text_key", "bucket", "vector", "results")
+
+    def __init__(self, text_key: Optional[str], bucket: bytes, vector: np.ndarray, results: Results):
+        self.text_key = text_key
+        self.bucket = bucket
+        self.vector = vector
+        self.results = results
+
+
+class RetrievalCache:
+    """Cache of search results keyed by query text and query embedding.
+
+    A lookup first tries the normalized query string, then the query's
+    random-hyperplane LSH bucket (SimHash over ``lsh_bits`` planes), where
+    a stored embedding is only reused if its cosine similarity is at least
+    ``threshold``. Entries are LRU-evicted beyond ``max_entries`` and all of
+    them are dropped when the collection version changes.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = RETRIEVAL_CACHE_SIZE,
+        lsh_bits: int = RETRIEVAL_CACHE_LSH_BITS,
+        threshold: float = RETRIEVAL_CACHE_THRESHOLD,
+        seed: int = 0,
+    ):
+        self.max_entries = max_entries
+        self.lsh_bits = lsh_bits
+        self.threshold = threshold
+        self.seed = seed
+        self._planes: Optional[np.ndarray] = None
+        self._entries: "OrderedDict[Tuple[int, int], _Entry]" = OrderedDict()
+        self._by_text: Dict[Tuple[str, int], Tuple[int, int]] = {}
+        self._by_bucket: Dict[Tuple[bytes, int], List[Tuple[int, int]]] = {}
+        self._next_id = 0
+        self._version: Optional[int] = None
+        self.hits_exact = 0
+        self.hits_similar = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _vector(self, qvec: List[float]) -> np.ndarray:
+        vec = np.asarray(qvec, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _bucket(self, vec: np.ndarray) -> bytes:
+        """SimHash of the embedding: which side of each hyperplane it falls on."""
+        if self._planes is None or self._planes.shape[1] != vec.shape[0]:
+            rng = np.random.default_rng(self.seed)
+            self._planes = rng.standard_normal((self.lsh_bits, vec.shape[0])).astype(np.float32)
+        return np.packbits(self._planes @ vec > 0).tobytes()
+
+    def _check_version(self, version: int):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self.clear()
+            self._version = version
+
+    def _drop(self, key: Tuple[int, int]):
+        entry = self._entries.pop(key)
+        top_k = key[1]
+        if entry.text_key is not None and self._by_text.get((entry.text_key, top_k)) == key:
+            del self._by_text[(entry.text_key, top_k)]
+        bucket = self._by_bucket.get((entry.bucket, top_k))
+        if bucket is not None:
+            bucket.remove(key)
+            if not bucket:
+                del self._by_bucket[(entry.bucket, top_k)]
+
+    def clear(self):
+        """Remove every entry (counters are kept)."""
+        self._entries.clear()
+        self._by_text.clear()
+        self._by_bucket.clear()
+        RETRIEVAL_CACHE_ENTRIES.set(0)
+
+    def _hit(self, key: Tuple[int, int], kind: str) -> Results:
+        self._entries.move_to_end(key)
+        if kind == "exact":
+            self.hits_exact += 1
+        else:
+            self.hits_similar += 1
+        RETRIEVAL_CACHE_LOOKUPS.inc(kind)
+        return list(self._entries[key].results)
+
+    def lookup(
+        self, query_embedding: List[float], top_k: int, version: int, query_text: Optional[str] = None
+    ) -> Optional[Results]:
+        """Cached results for this query and ``top_k``, or None on a miss."""
+        if not self.enabled:
+            return None
+        self._check_version(version)
+        if query_text is not None:
+            key = self._by_text.get((normalize_query(query_text), top_k))
+            if key is not None:
+                return self._hit(key, "exact")
+
+        if self._entries:
+            vec = self._vector(query_embedding)
+            best, best_sim = None, self.threshold
+            for key in self._by_bucket.get((self._bucket(vec), top_k), ()):
+                sim = float(self._entries[key].vector @ vec)
+                if sim >= best_sim:
+                    best, best_sim = key, sim
+            if best is not None:
+                return self._hit(best, "similar")
+
+        self.misses += 1
+        RETRIEVAL_CACHE_LOOKUPS.inc("miss")
+        return None
+
+    def store(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        version: int,
+        results: Results,
+        query_text: Optional[str] = None,
+    ):
+        """Store the results of a search made at collection ``version``."""
+        if not self.enabled:
+            return
+        self._check_version(version)
+        vec = self._vector(query_embedding)
+        text_key = normalize_query(query_text) if query_text is not None else None
+        if text_key is not None and (text_key, top_k) in self._by_text:
+            self._drop(self._by_text[(text_key, top_k)])
+        while len(self._entries) >= self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+        key = (self._next_id, top_k)
+        self._next_id += 1
+        bucket = self._bucket(vec)
+        self._entries[key] = _Entry(text_key, bucket, vec, list(results))
+        if text_key is not None:
+            self._by_text[(text_key, top_k)] = key
+        self._by_bucket.setdefault((bucket, top_k), []).append(key)
+        RETRIEVAL_CACHE_ENTRIES.set(len(self._entries))
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current occupancy."""
+        lookups = self.hits_exact + self.hits_similar + self.misses
+        hits = self.hits_exact + self.hits_similar
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "lsh_bits": self.lsh_bits,
+            "threshold": self.threshold,
+            "hits_exact": self.hits_exact,
+            "hits_similar": self.hits_similar,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
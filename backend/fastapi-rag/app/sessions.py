@@ -0,0 +1,454 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .logger import get_logger
+from .metrics import SESSION_PROMPT_TOKENS, SESSION_SUMMARIES, SESSION_TURN_SECONDS
+from .tokens import count_tokens
+
+logger = get_logger(__name__)
+
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_STORE_PATH = os.getenv("SESSION_STORE_PATH", "./sessions.sqlite3")
+SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))
+SESSION_MAX = int(os.getenv("SESSION_MAX", "10000"))
+SESSION_HISTORY_TOKENS = int(os.getenv("SESSION_HISTORY_TOKENS", "800"))
+SESSION_SUMMARY_TOKENS = int(os.getenv("SESSION_SUMMARY_TOKENS", "250"))
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "20"))
+QUERY_REWRITE = os.getenv("QUERY_REWRITE", "llm")
+QUERY_REWRITE_TURNS = int(os.getenv("QUERY_REWRITE_TURNS", "2"))
+QUERY_REWRITE_TIMEOUT = float(os.getenv("QUERY_REWRITE_TIMEOUT", "2"))
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", os.getenv("GENERATION_MODEL", "gpt-4o-mini"))
+
+# Answers quoted to the query rewriter are cut to this many characters
+REWRITE_ANSWER_CHARS = 300
+
+REWRITE_PROMPT = (
+    "Rewrite the recruiter's last question as a standalone search query about Miguel, "
+    "resolving pronouns and references from the conversation. Reply with the query only."
+)
+SUMMARY_PROMPT = (
+    "Update the running summary of a conversation between a recruiter and Miguel with the new turns. "
+    "Keep names, companies, dates and open questions; drop pleasantries. Reply with the summary only."
+)
+
+
+class Session:
+    """One conversation: a running summary plus the turns not yet folded into it."""
+
+    __slots__ = ("id", "summary", "turns", "updated_at")
+
+    def __init__(self, session_id: str, summary: str = "", turns: Optional[List[Tuple[str, str]]] = None):
+        self.id = session_id
+        self.summary = summary
+        self.turns: List[Tuple[str, str]] = turns or []
+        self.updated_at = time.time()
+
+    def to_json(self) -> str:
+        return json.dumps({"s": self.summary, "t": self.turns}, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, session_id: str, data: str) -> "Session":
+        raw = json.loads(data)
+        return cls(session_id, raw["s"], [tuple(turn) for turn in raw["t"]])
+
+
+class SessionStore:
+    """Where conversations live between requests.
+
+    Sessions not written to for ``ttl`` seconds are gone; implementations
+    shared between processes let any worker continue a conversation.
+    ``blocking`` stores do I/O and are called from a worker thread.
+    """
+
+    blocking = False
+
+    def get(self, session_id: str) -> Optional[Session]:
+        raise NotImplementedError
+
+    def put(self, session: Session):
+        raise NotImplementedError
+
+    def update(
+        self, session_id: str, change: Callable[[Optional[Session]], Optional[Session]]
+    ) -> Optional[Session]:
+        """Atomically read a session, pass it to ``change`` and store what it returns.
+
+        Nothing is written when ``change`` returns None.
+        """
+        raise NotImplementedError
+
+    def delete(self, session_id: str):
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """Sessions as compact JSON in a dict, private to this process.
+
+    Expired sessions are dropped on access and the least recently
+    written ones beyond ``max_sessions`` are forgotten.
+    """
+
+    def __init__(self, ttl: float = SESSION_TTL, max_sessions: int = SESSION_MAX):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float):
+        while self._sessions:
+            _, updated = next(iter(self._sessions.values()))
+            if now - updated <= self.ttl and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+
+    def get(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            self._expire(time.time())
+            entry = self._sessions.get(session_id)
+        return Session.from_json(session_id, entry[0]) if entry else None
+
+    def put(self, session: Session):
+        session.updated_at = time.time()
+        with self._lock:
+            self._sessions.pop(session.id, None)
+            self._sessions[session.id] = (session.to_json(), session.updated_at)
+            self._expire(session.updated_at)
+
+    def update(
+        self, session_id: str, change: Callable[[Optional[Session]], Optional[Session]]
+    ) -> Optional[Session]:
+        with self._lock:
+            now = time.time()
+            self._expire(now)
+            entry = self._sessions.get(session_id)
+            session = change(Session.from_json(session_id, entry[0]) if entry else None)
+            if session is not None:
+                session.updated_at = now
+                self._sessions.pop(session_id, None)
+                self._sessions[session_id] = (session.to_json(), now)
+                self._expire(now)
+        return session
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a local SQLite file, shared by every worker on the host.
+
+    Updates run in one write transaction, so turns recorded by different
+    workers for the same session are never lost.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str = SESSION_STORE_PATH, ttl: float = SESSION_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " id TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " updated REAL NOT NULL)"
+            )
+        return self._conn
+
+    def get(self, session_id: str) -> Optional[Session]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT data FROM sessions WHERE id = ? AND updated > ?", (session_id, time.time() - self.ttl)
+            ).fetchone()
+        return Session.from_json(session_id, row[0]) if row else None
+
+    def put(self, session: Session):
+        session.updated_at = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, updated) VALUES (?, ?, ?)",
+                (session.id, session.to_json(), session.updated_at),
+            )
+            conn.execute("DELETE FROM sessions WHERE updated <= ?", (session.updated_at - self.ttl,))
+
+    def update(
+        self, session_id: str, change: Callable[[Optional[Session]], Optional[Session]]
+    ) -> Optional[Session]:
+        with self._lock:
+            conn = self._connection()
+            # Take the write lock before reading so no other worker writes in between
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = conn.execute(
+                    "SELECT data FROM sessions WHERE id = ? AND updated > ?", (session_id, now - self.ttl)
+                ).fetchone()
+                session = change(Session.from_json(session_id, row[0]) if row else None)
+                if session is not None:
+                    session.updated_at = now
+                    conn.execute(
+                        "INSERT OR REPLACE INTO sessions (id, data, updated) VALUES (?, ?, ?)",
+                        (session_id, session.to_json(), now),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return session
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._connection().execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute(
+                "SELECT COUNT(*) FROM sessions WHERE updated > ?", (time.time() - self.ttl,)
+            ).fetchone()[0]
+
+
+def create_session_store(kind: str = SESSION_STORE) -> SessionStore:
+    """The session store selected by SESSION_STORE (memory or sqlite)."""
+    if kind == "sqlite":
+        return SQLiteSessionStore()
+    if kind != "memory":
+        logger.warning(f"⚠️  Unknown SESSION_STORE={kind!r}, using memory")
+    return MemorySessionStore()
+
+
+def _turn_tokens(turn: Tuple[str, str]) -> int:
+    return count_tokens(turn[0]) + count_tokens(turn[1])
+
+
+def _transcript(turns: List[Tuple[str, str]], answer_chars: Optional[int] = None) -> str:
+    lines = []
+    for question, answer in turns:
+        if answer_chars is not None and len(answer) > answer_chars:
+            answer = answer[:answer_chars] + "…"
+        lines.append(f"Recruiter: {question}\nMiguel: {answer}")
+    return "\n".join(lines)
+
+
+class Conversations:
+    """Multi-turn state for /ask, with a bounded prompt however long a conversation gets.
+
+    The prompt carries the session's summary (at most ``summary_tokens``)
+    and the most recent turns that fit in ``history_tokens``. Once the
+    stored turns exceed that budget, the oldest are folded into the
+    summary by a background LLM call after the answer has been sent.
+    Follow-up questions are rewritten into a standalone retrieval query
+    from the summary and the last ``rewrite_turns`` turns.
+    """
+
+    def __init__(
+        self,
+        store: SessionStore,
+        history_tokens: int = SESSION_HISTORY_TOKENS,
+        summary_tokens: int = SESSION_SUMMARY_TOKENS,
+        max_turns: int = SESSION_MAX_TURNS,
+        rewrite: str = QUERY_REWRITE,
+        rewrite_turns: int = QUERY_REWRITE_TURNS,
+        rewrite_timeout: float = QUERY_REWRITE_TIMEOUT,
+    ):
+        self.store = store
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.max_turns = max_turns
+        self.rewrite = rewrite
+        self.rewrite_turns = rewrite_turns
+        self.rewrite_timeout = rewrite_timeout
+        self._summarizing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.rewrites = 0
+        self.rewrite_fallbacks = 0
+        self.rewrite_seconds = 0.0
+
+    async def _call(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a store call, off the event loop when the store blocks."""
+        if self.store.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def load(self, session_id: str) -> Session:
+        """The stored session, or a new empty one."""
+        return await self._call(self.store.get, session_id) or Session(session_id)
+
+    async def delete(self, session_id: str):
+        await self._call(self.store.delete, session_id)
+
+    def _recent(self, session: Session) -> List[Tuple[str, str]]:
+        """The most recent turns that fit in the history budget, oldest first."""
+        recent, used = [], 0
+        for turn in reversed(session.turns):
+            used += _turn_tokens(turn)
+            if used > self.history_tokens:
+                break
+            recent.append(turn)
+        return recent[::-1]
+
+    def history_messages(self, session: Session) -> List[Dict[str, str]]:
+        """Chat messages for the summary and recent turns, placed before the question."""
+        messages = []
+        if session.summary:
+            messages.append({"role": "system", "content": f"Conversation so far: {session.summary}"})
+        for question, answer in self._recent(session):
+            messages.append({"role": "user", "content": question})
+            messages.append({"role": "assistant", "content": answer})
+        return messages
+
+    async def rewrite_query(self, question: str, session: Session, openai_client: Any) -> str:
+        """A standalone retrieval query for a follow-up question.
+
+        QUERY_REWRITE=llm asks the model (falling back to ``concat`` on
+        error or after ``rewrite_timeout``), ``concat`` prepends the recent
+        questions, ``off`` keeps the question as asked.
+        """
+        if not session.turns or self.rewrite == "off":
+            return question
+        recent = session.turns[-self.rewrite_turns:] if self.rewrite_turns > 0 else []
+        concat = " ".join([q for q, _ in recent] + [question])
+        if self.rewrite != "llm":
+            return concat
+
+        start = time.perf_counter()
+        context = _transcript(recent, REWRITE_ANSWER_CHARS)
+        if session.summary:
+            context = f"Summary: {session.summary}\n{context}"
+        try:
+            response = await asyncio.wait_for(
+                openai_client.chat.completions.create(
+                    model=SUMMARY_MODEL,
+                    messages=[
+                        {"role": "system", "content": REWRITE_PROMPT},
+                        {"role": "user", "content": f"{context}\nRecruiter: {question}"},
+                    ],
+                    temperature=0,
+                    max_tokens=60,
+                ),
+                self.rewrite_timeout,
+            )
+            query = (response.choices[0].message.content or "").strip()
+        except Exception as e:
+            logger.warning(f"⚠️  Query rewrite failed ({type(e).__name__}), using recent questions")
+            query = ""
+        self.rewrite_seconds += time.perf_counter() - start
+        if not query:
+            self.rewrite_fallbacks += 1
+            return concat
+        self.rewrites += 1
+        logger.debug("✏️  Rewrote %r → %r", question, query)
+        return query
+
+    def observe_prompt(self, session: Session, messages: List[Dict[str, str]]):
+        """Record the prompt size of one turn: summary, history and the whole prompt."""
+        summary = count_tokens(session.summary) if session.summary else 0
+        history = sum(_turn_tokens(turn) for turn in self._recent(session))
+        SESSION_PROMPT_TOKENS.observe(summary, "summary")
+        SESSION_PROMPT_TOKENS.observe(history, "history")
+        SESSION_PROMPT_TOKENS.observe(sum(count_tokens(m["content"]) for m in messages), "total")
+
+    async def record_turn(self, session: Session, question: str, answer: str, openai_client: Any, started: float):
+        """Store an answered turn; summarize in the background once over budget.
+
+        The turn is appended to the latest stored state rather than to
+        ``session`` (loaded when the request started), in one store update,
+        so a summary or a turn written in the meantime is kept.
+        """
+
+        def append(latest: Optional[Session]) -> Session:
+            latest = latest or session
+            latest.turns.append((question, answer))
+            # Hard cap in case summarization keeps failing
+            del latest.turns[:-self.max_turns]
+            return latest
+
+        session = await self._call(self.store.update, session.id, append)
+        SESSION_TURN_SECONDS.observe(time.perf_counter() - started)
+
+        if sum(_turn_tokens(turn) for turn in session.turns) > self.history_tokens and session.id not in self._summarizing:
+            self._summarizing.add(session.id)
+            task = asyncio.create_task(self.summarize(session.id, openai_client))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def summarize(self, session_id: str, openai_client: Any):
+        """Fold the turns that no longer fit in the history budget into the summary."""
+        try:
+            session = await self._call(self.store.get, session_id)
+            if session is None:
+                return
+            keep = len(self._recent(session))
+            folded = session.turns[:len(session.turns) - keep]
+            if not folded:
+                return
+            existing = f"Current summary: {session.summary}\n\n" if session.summary else ""
+            response = await openai_client.chat.completions.create(
+                model=SUMMARY_MODEL,
+                messages=[
+                    {"role": "system", "content": SUMMARY_PROMPT},
+                    {"role": "user", "content": f"{existing}New turns:\n{_transcript(folded)}"},
+                ],
+                temperature=0.2,
+                max_tokens=self.summary_tokens,
+            )
+            summary = (response.choices[0].message.content or "").strip()
+            if not summary:
+                raise ValueError("empty summary")
+
+            # Turns may have been added meanwhile; only drop the ones that were folded
+            def fold(latest: Optional[Session]) -> Optional[Session]:
+                if latest is None or latest.turns[:len(folded)] != folded:
+                    return None
+                latest.summary = summary
+                latest.turns = latest.turns[len(folded):]
+                return latest
+
+            if await self._call(self.store.update, session_id, fold) is None:
+                SESSION_SUMMARIES.inc("conflict")
+                return
+            SESSION_SUMMARIES.inc("ok")
+            logger.debug("🧾 Summarized %d turns of session %s", len(folded), session_id)
+        except Exception as e:
+            SESSION_SUMMARIES.inc("error")
+            logger.warning(f"⚠️  Could not summarize session {session_id}: {e}")
+        finally:
+            self._summarizing.discard(session_id)
+
+    async def stats(self) -> Dict[str, Any]:
+        calls = self.rewrites + self.rewrite_fallbacks
+        return {
+            "store": type(self.store).__name__,
+            "sessions": await self._call(len, self.store),
+            "history_tokens": self.history_tokens,
+            "summary_tokens": self.summary_tokens,
+            "rewrite": self.rewrite,
+            "rewrites": self.rewrites,
+            "rewrite_fallbacks": self.rewrite_fallbacks,
+            "avg_rewrite_ms": round(self.rewrite_seconds * 1000 / calls, 1) if calls else 0.0,
+            "summarizing": len(self._summarizing),
+        }
+
+
+# Global instance
+conversations = Conversations(create_session_store())
@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import asyncio
+import inspect
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, List, Optional
+
+import anyio
+
+SSE_COALESCE_MS = float(os.getenv("SSE_COALESCE_MS", "0"))
+SSE_COALESCE_BYTES = int(os.getenv("SSE_COALESCE_BYTES", "0"))
+
+# Seconds to wait for the upstream LLM stream to close after a disconnect
+UPSTREAM_CLOSE_TIMEOUT = 5.0
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    """One complete SSE frame, so each event is a single write."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+async def _close(upstream: Any):
+    """Close an upstream stream (OpenAI ``AsyncStream`` or async generator)."""
+    close = getattr(upstream, "close", None) or getattr(upstream, "aclose", None)
+    if close is not None:
+        result = close()
+        if inspect.isawaitable(result):
+            await result
+
+
+async def coalesce(
+    tokens: AsyncIterator[str], max_wait: float = SSE_COALESCE_MS / 1000, max_bytes: int = SSE_COALESCE_BYTES
+) -> AsyncIterator[str]:
+    """Group tokens into chunks flushed every ``max_wait`` seconds or ``max_bytes``.
+
+    With both limits at 0 every token is passed through as soon as it
+    arrives. The upstream read is never cancelled by a flush deadline, so a
+    slow token simply lands in the next chunk.
+    """
+    if max_wait <= 0 and max_bytes <= 0:
+        async for token in tokens:
+            yield token
+        return
+
+    iterator = tokens.__aiter__()
+    pending: Optional[asyncio.Future] = None
+    buffer: List[str] = []
+    size = 0
+    deadline = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if done:
+                try:
+                    token = pending.result()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    pending = None
+                if not buffer and max_wait > 0:
+                    deadline = time.monotonic() + max_wait
+                buffer.append(token)
+                size += len(token.encode("utf-8"))
+                if not (max_bytes > 0 and size >= max_bytes) and not (deadline and time.monotonic() >= deadline):
+                    continue
+            if buffer:
+                yield "".join(buffer)
+            buffer, size, deadline = [], 0, None
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+class AnswerStream:
+    """Relays an LLM completion stream as SSE ``token`` frames.
+
+    Tokens are kept in a list (``text`` joins them once); timestamps of the
+    first and last token are recorded for metrics. Before each token is
+    sent, ``is_disconnected`` (e.g. ``Request.is_disconnected``) is checked;
+    when the client has gone, or the consumer stops early, the upstream
+    stream is closed so no further tokens are generated for nobody.
+    """
+
+    def __init__(
+        self,
+        upstream: Any,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        coalesce_ms: float = SSE_COALESCE_MS,
+        coalesce_bytes: int = SSE_COALESCE_BYTES,
+    ):
+        self.upstream = upstream
+        self.is_disconnected = is_disconnected
+        self.coalesce_ms = coalesce_ms
+        self.coalesce_bytes = coalesce_bytes
+        self.tokens: List[str] = []
+        self.first_token_at: Optional[float] = None
+        self.last_token_at: Optional[float] = None
+        self.completed = False
+        self.aborted = False
+        self._closed = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self.tokens)
+
+    async def _tokens(self) -> AsyncIterator[str]:
+        async for part in self.upstream:
+            token = part.choices[0].delta.content if part.choices else None
+            if token:
+                if self.is_disconnected is not None and await self.is_disconnected():
+                    self.aborted = True
+                    return
+                self.last_token_at = time.perf_counter()
+                if self.first_token_at is None:
+                    self.first_token_at = self.last_token_at
+                self.tokens.append(token)
+                yield token
+
+    async def frames(self) -> AsyncIterator[bytes]:
+        """SSE frames for the answer; closes the upstream stream when done."""
+        try:
+            async for chunk in coalesce(self._tokens(), self.coalesce_ms / 1000, self.coalesce_bytes):
+                yield sse_event("token", {"token": chunk})
+            self.completed = not self.aborted
+        finally:
+            await self.aclose()
+
+    async def text_tokens(self) -> AsyncIterator[str]:
+        """The answer's tokens as they arrive; closes the upstream stream when done."""
+        try:
+            async for token in self._tokens():
+                yield token
+            self.completed = not self.aborted
+        finally:
+            await self.aclose()
+
+    async def aclose(self):
+        """Close the upstream stream (idempotent).
+
+        Shielded: on a client disconnect Starlette cancels the response, and
+        without the shield the close would be cancelled at its first await,
+        leaving the LLM generating (and billing) tokens nobody reads.
+        """
+        if not self._closed:
+            self._closed = True
+            # Bounded, so a hung connection cannot hold the request open
+            with anyio.move_on_after(UPSTREAM_CLOSE_TIMEOUT, shield=True):
+                await _close(self.upstream)
+
+
+async def replay_frames(tokens: Iterable[str]) -> AsyncIterator[bytes]:
+    """SSE ``token`` frames for an already complete (cached) answer."""
+    for token in tokens:
+        yield sse_event("token", {"token": token})
@@ -0,0 +1,44 @@
+import os
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+TOKENIZER_MODEL = os.getenv("TOKENIZER_MODEL", os.getenv("GENERATION_MODEL", "gpt-4o-mini"))
+
+
+@lru_cache(maxsize=1)
+def _encoder() -> Optional[Callable[[str], List[int]]]:
+    """The tiktoken encoder for TOKENIZER_MODEL, or None if unavailable.
+
+    tiktoken downloads its BPE files on first use, so offline hosts (and
+    installs without tiktoken) fall back to a character-based estimate.
+    """
+    try:
+        import tiktoken
+        try:
+            encoding = tiktoken.encoding_for_model(TOKENIZER_MODEL)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+        return encoding.encode_ordinary
+    except Exception as e:
+        logger.warning(f"⚠️  tiktoken unavailable ({type(e).__name__}), estimating token counts")
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)."""
+    return max(1, len(text) // 4) if text else 0
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in ``text`` for the generation model."""
+    encode = _encoder()
+    return len(encode(text)) if encode else estimate_tokens(text)
+
+
+def tokenizer_name() -> str:
+    """Which tokenizer ``count_tokens`` uses ("estimate" without tiktoken)."""
+    return "tiktoken" if _encoder() else "estimate"
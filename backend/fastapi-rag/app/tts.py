@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import base64
+import asyncio
+import contextlib
+from typing import Any, AsyncIterator, Dict, List, Optional
+from urllib.parse import urlencode
+
+import websockets
+from websockets.protocol import State
+
+from .logger import get_logger
+from .metrics import TTS_CONNECTIONS
+
+logger = get_logger(__name__)
+
+ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
+ELEVENLABS_VOICE_ID = os.getenv("ELEVENLABS_VOICE_ID")
+ELEVENLABS_MODEL_ID = os.getenv("ELEVENLABS_MODEL_ID", "eleven_flash_v2_5")
+ELEVENLABS_WS_URL = os.getenv("ELEVENLABS_WS_URL", "wss://api.elevenlabs.io")
+TTS_OUTPUT_FORMAT = os.getenv("TTS_OUTPUT_FORMAT", "pcm_22050")
+TTS_POOL_SIZE = int(os.getenv("TTS_POOL_SIZE", "1"))
+TTS_INACTIVITY_TIMEOUT = int(os.getenv("TTS_INACTIVITY_TIMEOUT", "60"))
+TTS_CONNECT_TIMEOUT = float(os.getenv("TTS_CONNECT_TIMEOUT", "5"))
+
+VOICE_SETTINGS = {"stability": 0.45, "similarity_boost": 0.9, "use_speaker_boost": False}
+
+
+class TTSConnection:
+    """An open ``stream-input`` socket that has been sent its init message."""
+
+    def __init__(self, ws: Any):
+        self.ws = ws
+        self.opened_at = time.monotonic()
+
+    def usable(self, max_age: float) -> bool:
+        return self.ws.state is State.OPEN and time.monotonic() - self.opened_at < max_age
+
+
+class TTSPool:
+    """Pre-warmed ElevenLabs WebSocket connections for streaming synthesis.
+
+    A ``stream-input`` socket speaks one utterance and is closed by the
+    final empty message, so the pool keeps ``size`` sockets connected and
+    initialised ahead of time and opens a replacement in the background as
+    soon as one is taken. The TCP + TLS + WebSocket handshake is then off
+    the critical path of a voice answer. After ``warm_up`` a background
+    task replaces idle sockets before ElevenLabs' inactivity timeout
+    closes them.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = ELEVENLABS_API_KEY,
+        voice_id: Optional[str] = ELEVENLABS_VOICE_ID,
+        model_id: str = ELEVENLABS_MODEL_ID,
+        output_format: str = TTS_OUTPUT_FORMAT,
+        base_url: str = ELEVENLABS_WS_URL,
+        size: int = TTS_POOL_SIZE,
+        inactivity_timeout: int = TTS_INACTIVITY_TIMEOUT,
+        connect_timeout: float = TTS_CONNECT_TIMEOUT,
+    ):
+        self.api_key = api_key
+        self.voice_id = voice_id
+        self.model_id = model_id
+        self.output_format = output_format
+        self.base_url = base_url.rstrip("/")
+        self.size = size
+        self.inactivity_timeout = inactivity_timeout
+        self.connect_timeout = connect_timeout
+        self._idle: List[TTSConnection] = []
+        self._connecting: List[asyncio.Task] = []
+        self._keeper: Optional[asyncio.Task] = None
+        self._closed = False
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key and self.voice_id)
+
+    @property
+    def sample_rate(self) -> int:
+        """Sample rate of the 16-bit mono PCM output (``pcm_22050`` → 22050)."""
+        return int(self.output_format.split("_")[1])
+
+    @property
+    def url(self) -> str:
+        query = urlencode({
+            "model_id": self.model_id,
+            "output_format": self.output_format,
+            "inactivity_timeout": self.inactivity_timeout,
+        })
+        return f"{self.base_url}/v1/text-to-speech/{self.voice_id}/stream-input?{query}"
+
+    async def _connect(self) -> TTSConnection:
+        ws = await websockets.connect(
+            self.url,
+            additional_headers=[("xi-api-key", self.api_key)],
+            max_size=None,
+            open_timeout=self.connect_timeout,
+        )
+        # A single space opens the stream; generation is triggered by flushes
+        await ws.send(json.dumps({"text": " ", "voice_settings": VOICE_SETTINGS}))
+        return TTSConnection(ws)
+
+    async def _connect_idle(self):
+        try:
+            connection = await self._connect()
+        except Exception as e:
+            logger.warning(f"⚠️  Could not pre-connect to the TTS service: {e}")
+            return
+        if self._closed:
+            await connection.ws.close()
+        else:
+            self._idle.append(connection)
+
+    def _replenish(self):
+        """Open connections in the background until ``size`` are idle or connecting."""
+        self._connecting = [t for t in self._connecting if not t.done()]
+        for _ in range(self.size - len(self._idle) - len(self._connecting)):
+            self._connecting.append(asyncio.create_task(self._connect_idle()))
+
+    @property
+    def _max_age(self) -> float:
+        return self.inactivity_timeout * 0.8
+
+    async def _prune(self):
+        """Close idle connections that are closed or about to time out."""
+        for connection in [c for c in self._idle if not c.usable(self._max_age)]:
+            self._idle.remove(connection)
+            TTS_CONNECTIONS.inc("stale")
+            with contextlib.suppress(Exception):
+                await connection.ws.close()
+
+    async def _keep_warm(self):
+        while not self._closed:
+            await asyncio.sleep(self.inactivity_timeout * 0.2)
+            await self._prune()
+            self._replenish()
+
+    async def warm_up(self):
+        """Connect the pool ahead of the first voice answer and keep it connected."""
+        self._replenish()
+        if self._connecting:
+            await asyncio.gather(*self._connecting)
+        if self._keeper is None:
+            self._keeper = asyncio.create_task(self._keep_warm())
+
+    async def acquire(self) -> TTSConnection:
+        """A ready connection: a pre-warmed one if available, else a new one."""
+        await self._prune()
+        connection = self._idle.pop(0) if self._idle else None
+        if connection is not None:
+            TTS_CONNECTIONS.inc("warm")
+        else:
+            TTS_CONNECTIONS.inc("cold")
+            connection = await self._connect()
+        self._replenish()
+        return connection
+
+    async def synthesize(self, phrases: AsyncIterator[str]) -> AsyncIterator[bytes]:
+        """Stream PCM audio for ``phrases`` as they arrive.
+
+        Each phrase is flushed on its own, so speech for the first sentence
+        starts while the rest of the answer is still being generated.
+        """
+        connection = await self.acquire()
+        ws = connection.ws
+        failure: List[BaseException] = []
+
+        async def writer():
+            try:
+                async for phrase in phrases:
+                    await ws.send(json.dumps({"text": phrase + " ", "flush": True}))
+                await ws.send(json.dumps({"text": ""}))
+            except Exception as e:
+                failure.append(e)
+                await ws.close()
+
+        writer_task = asyncio.create_task(writer())
+        try:
+            async for message in ws:
+                data = json.loads(message)
+                if data.get("audio"):
+                    yield base64.b64decode(data["audio"])
+                if data.get("isFinal"):
+                    break
+            await writer_task
+            if failure:
+                raise failure[0]
+        finally:
+            writer_task.cancel()
+            with contextlib.suppress(Exception):
+                await ws.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "configured": self.configured,
+            "model_id": self.model_id,
+            "output_format": self.output_format,
+            "pool_size": self.size,
+            "idle": len(self._idle),
+            "connecting": len([t for t in self._connecting if not t.done()]),
+        }
+
+    async def close(self):
+        self._closed = True
+        if self._keeper is not None:
+            self._keeper.cancel()
+        for task in self._connecting:
+            task.cancel()
+        for connection in self._idle:
+            with contextlib.suppress(Exception):
+                await connection.ws.close()
+        self._idle.clear()
+
+
+# Global instance
+tts_pool = TTSPool()
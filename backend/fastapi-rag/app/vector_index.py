@@ -0,0 +1,298 @@
+import os
+import re
+import json
+import mmap
+import time
+import shutil
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .backends import RetrievalBackend
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+VECTOR_SNAPSHOT_PATH = os.getenv("VECTOR_SNAPSHOT_PATH", "./vector_snapshot")
+VECTOR_SNAPSHOT_KEEP = int(os.getenv("VECTOR_SNAPSHOT_KEEP", "2"))
+VECTOR_SNAPSHOT_POLL_SECONDS = float(os.getenv("VECTOR_SNAPSHOT_POLL_SECONDS", "2"))
+
+# ``VECTOR_SNAPSHOT_PATH`` holds immutable ``snapshot-NNNNNN`` directories and
+# a ``CURRENT`` file naming the live one, replaced atomically on publish.
+SNAPSHOT_POINTER = "CURRENT"
+_generation_re = re.compile(r"^snapshot-(\d+)$")
+
+
+def current_snapshot(path: str = VECTOR_SNAPSHOT_PATH) -> str:
+    """Directory of the snapshot that ``path`` currently points to."""
+    try:
+        with open(os.path.join(path, SNAPSHOT_POINTER), "r", encoding="utf-8") as f:
+            return os.path.join(path, f.read().strip())
+    except FileNotFoundError:
+        # Snapshots written before versioning were a single directory
+        return path
+
+
+def _map_file(path: str) -> Any:
+    """Read-only mapping of a file (``b""`` when empty, which mmap rejects)."""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+
+
+class MappedRecords(Sequence):
+    """Variable-length records in one memory-mapped blob, decoded on access."""
+
+    def __init__(self, offsets: np.ndarray, blob: Any, decode: Callable[[bytes], Any]):
+        self.offsets = offsets
+        self.blob = blob
+        self.decode = decode
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> Any:
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        i %= len(self)
+        return self.decode(bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]))
+
+
+class NumpyVectorIndex(RetrievalBackend):
+    """In-process vector index over a memory-mapped snapshot.
+
+    All chunk embeddings live in one contiguous float32 matrix with unit-length
+    rows, so top-k is a single matrix-vector product plus ``argpartition``.
+    Chunk texts (and metadata, as JSON) are stored as UTF-8 blobs with
+    offsets arrays and are only decoded for the hits. Nothing is copied onto
+    the heap, so processes mapping the same snapshot share its pages.
+    """
+
+    name = "numpy"
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        offsets: np.ndarray,
+        texts: Any,
+        metadatas: Sequence[Dict[str, Any]],
+        version: int = 0,
+        path: Optional[str] = None,
+        directory: Optional[str] = None,
+    ):
+        self.vectors = vectors
+        self.offsets = offsets
+        self.texts = texts
+        self.metadatas = metadatas
+        self._version = version
+        self.path = path
+        self.directory = directory or path
+
+    @classmethod
+    def load(cls, path: str = VECTOR_SNAPSHOT_PATH) -> "NumpyVectorIndex":
+        """Memory-map the current snapshot under ``path`` (see ``write_snapshot``)."""
+        directory = current_snapshot(path)
+        with open(os.path.join(directory, "metadata.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        offsets = np.load(os.path.join(directory, "offsets.npy"), mmap_mode="r")
+        texts = _map_file(os.path.join(directory, "texts.bin"))
+        if "metadatas" in meta:
+            metadatas = meta["metadatas"]
+        else:
+            metadatas = MappedRecords(
+                np.load(os.path.join(directory, "metadata_offsets.npy"), mmap_mode="r"),
+                _map_file(os.path.join(directory, "metadata.bin")),
+                json.loads,
+            )
+        logger.info(f"📚 Loaded vector snapshot: {len(offsets) - 1} chunks from {directory}")
+        return cls(vectors, offsets, texts, metadatas, meta.get("version", 0), path, directory)
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def text(self, i: int) -> str:
+        return bytes(self.texts[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def top_k(self, query_embedding: List[float], top_k: int = 6) -> List[Tuple[int, float]]:
+        """Indices and scores of the ``top_k`` nearest chunks."""
+        n = len(self)
+        k = min(top_k, n)
+        if k <= 0:
+            return []
+        q = np.asarray(query_embedding, dtype=np.float32)
+        dots = self.vectors @ q
+        idx = np.argpartition(-dots, k - 1)[:k] if k < n else np.arange(n)
+        idx = idx[np.argsort(-dots[idx])]
+        # Same scale as Chroma's L2 space: 1 - |q - x|^2 with |x| = 1
+        base = float(q @ q) + 1.0
+        return [(int(i), 1.0 - (base - 2.0 * float(dots[i]))) for i in idx]
+
+    async def search_similar(
+        self, query_embedding: List[float], top_k: int = 6, query_text: Optional[str] = None
+    ) -> List[Tuple[str, float]]:
+        """Search for similar documents using vector similarity."""
+        return [(self.text(i), score) for i, score in self.top_k(query_embedding, top_k)]
+
+    async def warm_up(self):
+        """Fault in the memory-mapped vectors and run one query."""
+        if len(self):
+            self.top_k(np.asarray(self.vectors[0]), 1)
+
+    async def get_collection_info(self) -> Dict[str, Any]:
+        return {
+            "total_documents": len(self),
+            "collection_name": f"snapshot:{self.directory}",
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "chunks": len(self),
+            "dimensions": int(self.vectors.shape[1]) if self.vectors.ndim == 2 else 0,
+            "version": self.version,
+            "snapshot": os.path.basename(self.directory or ""),
+        }
+
+
+class SnapshotBackend(RetrievalBackend):
+    """NumPy backend that follows the snapshot pointer across re-ingests.
+
+    Every worker maps the same immutable snapshot files, so vectors, texts
+    and metadata live once in the page cache however many workers there
+    are. At most every ``poll_seconds`` a request re-reads the pointer; when
+    ingestion has published a new snapshot, the index is swapped in one
+    assignment. Searches already running finish on the old mapping, which
+    stays valid until its last reference is dropped.
+    """
+
+    name = "numpy"
+
+    def __init__(self, path: str = VECTOR_SNAPSHOT_PATH, poll_seconds: float = VECTOR_SNAPSHOT_POLL_SECONDS):
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self.index = NumpyVectorIndex.load(path)
+        self.swaps = 0
+        self._checked_at = time.monotonic()
+
+    def refresh(self) -> bool:
+        """Swap to the current snapshot if it changed; True if it did."""
+        if current_snapshot(self.path) == self.index.directory:
+            return False
+        index = NumpyVectorIndex.load(self.path)
+        previous, self.index = self.index, index
+        self.swaps += 1
+        logger.info(f"🔄 Swapped vector snapshot {previous.directory} → {index.directory}")
+        return True
+
+    def _maybe_refresh(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.poll_seconds:
+            return
+        self._checked_at = now
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning(f"⚠️  Could not load the new vector snapshot, keeping {self.index.directory}: {e}")
+
+    @property
+    def version(self) -> int:
+        self._maybe_refresh()
+        return self.index.version
+
+    async def search_similar(
+        self, query_embedding: List[float], top_k: int = 6, query_text: Optional[str] = None
+    ) -> List[Tuple[str, float]]:
+        self._maybe_refresh()
+        return await self.index.search_similar(query_embedding, top_k)
+
+    async def warm_up(self):
+        await self.index.warm_up()
+
+    async def get_collection_info(self) -> Dict[str, Any]:
+        return await self.index.get_collection_info()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.index.stats(), "swaps": self.swaps, "pid": os.getpid()}
+
+
+def _write_records(directory: str, blob_name: str, offsets_name: str, records: List[bytes]):
+    offsets = np.zeros(len(records) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(r) for r in records])
+    np.save(os.path.join(directory, offsets_name), offsets)
+    with open(os.path.join(directory, blob_name), "wb") as f:
+        f.write(b"".join(records))
+
+
+def _generations(path: str) -> List[int]:
+    names = os.listdir(path) if os.path.isdir(path) else []
+    return sorted(int(m.group(1)) for m in map(_generation_re.match, names) if m)
+
+
+def write_snapshot(
+    path: str,
+    embeddings: List[List[float]],
+    documents: List[str],
+    metadatas: List[Dict[str, Any]],
+    version: int = 0,
+    keep: int = VECTOR_SNAPSHOT_KEEP,
+) -> str:
+    """Publish a new snapshot generation under ``path`` and return its directory.
+
+    The generation is written completely before ``CURRENT`` is atomically
+    replaced to point at it, so readers only ever see finished snapshots.
+    Older generations beyond ``keep`` are deleted; workers still mapping
+    them keep their pages until they swap.
+    """
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    if not documents:
+        vectors = np.zeros((0, 0), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1.0, norms)
+
+    os.makedirs(path, exist_ok=True)
+    generations = _generations(path)
+    name = f"snapshot-{(generations[-1] if generations else 0) + 1:06d}"
+    tmp_path = os.path.join(path, f".{name}.tmp-{os.getpid()}")
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "vectors.npy"), np.ascontiguousarray(vectors))
+    _write_records(tmp_path, "texts.bin", "offsets.npy", [d.encode("utf-8") for d in documents])
+    _write_records(
+        tmp_path, "metadata.bin", "metadata_offsets.npy", [json.dumps(m).encode("utf-8") for m in metadatas]
+    )
+    with open(os.path.join(tmp_path, "metadata.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": version, "chunks": len(documents)}, f)
+    os.rename(tmp_path, os.path.join(path, name))
+
+    pointer_tmp = os.path.join(path, f".{SNAPSHOT_POINTER}.tmp-{os.getpid()}")
+    with open(pointer_tmp, "w", encoding="utf-8") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(path, SNAPSHOT_POINTER))
+
+    # Files of the unversioned layout, now superseded by CURRENT
+    for legacy in ("vectors.npy", "offsets.npy", "texts.bin", "metadata.json"):
+        if os.path.exists(os.path.join(path, legacy)):
+            os.remove(os.path.join(path, legacy))
+    for generation in _generations(path)[:-max(1, keep)]:
+        shutil.rmtree(os.path.join(path, f"snapshot-{generation:06d}"), ignore_errors=True)
+    return os.path.join(path, name)
+
+
+async def export_snapshot(manager, path: str = VECTOR_SNAPSHOT_PATH) -> int:
+    """Export the Chroma collection as a new snapshot for the NumPy backend."""
+    data = await manager.get_all_chunks()
+    embeddings = data["embeddings"]
+    write_snapshot(
+        path,
+        [] if embeddings is None else embeddings,
+        data["documents"],
+        data["metadatas"],
+        manager.version,
+    )
+    return len(data["ids"])
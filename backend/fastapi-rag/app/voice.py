@@ -0,0 +1,362 @@
+import os
+import re
+import json
+import time
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+from starlette.websockets import WebSocketDisconnect
+
+from .answer_cache import ANSWER_CACHE_THRESHOLD, CachedAnswer, answer_cache
+from .audio_cache import AudioCache, audio_cache
+from .backends import get_backend
+from .logger import get_logger
+from .metrics import VOICE_FIRST_AUDIO_SECONDS, RequestTrace
+from .prefetch import prefetch_cache
+from .rag import GENERATION_MODEL, embed_query, prepare_messages
+from .sse import AnswerStream
+from .tts import TTSPool, tts_pool
+
+logger = get_logger(__name__)
+
+TTS_FIRST_PHRASE_CHARS = int(os.getenv("TTS_FIRST_PHRASE_CHARS", "20"))
+TTS_PHRASE_CHARS = int(os.getenv("TTS_PHRASE_CHARS", "60"))
+TTS_MAX_PHRASE_CHARS = int(os.getenv("TTS_MAX_PHRASE_CHARS", "200"))
+AUDIO_PRERENDER_LIMIT = int(os.getenv("AUDIO_PRERENDER_LIMIT", "20"))
+
+_token_re = re.compile(r"\s*\S+")
+
+# Sentence ends and clause breaks, only once the following whitespace has arrived
+_boundary_re = re.compile(r"(?:[.!?…]+[\"')\]]*|[,;:—])(?=\s)")
+
+
+class PhraseSplitter:
+    """Cuts a token stream into speakable phrases as tokens arrive.
+
+    A phrase ends at a sentence end once it has ``first_chars`` characters,
+    or at a clause break (comma, semicolon, colon, dash) once it has
+    ``phrase_chars``; the first phrase uses the lower limit for both, so
+    speech starts as early as possible. Text without any break is cut at a
+    space after ``max_chars``.
+    """
+
+    def __init__(
+        self,
+        first_chars: int = TTS_FIRST_PHRASE_CHARS,
+        phrase_chars: int = TTS_PHRASE_CHARS,
+        max_chars: int = TTS_MAX_PHRASE_CHARS,
+    ):
+        self.first_chars = first_chars
+        self.phrase_chars = phrase_chars
+        self.max_chars = max_chars
+        self.phrases = 0
+        self._buffer = ""
+        self._scan = 0
+
+    def _take(self, end: int) -> str:
+        phrase = self._buffer[:end].strip()
+        self._buffer = self._buffer[end:].lstrip()
+        self._scan = 0
+        self.phrases += 1
+        return phrase
+
+    def feed(self, token: str) -> List[str]:
+        """Add a token; return the phrases it completes."""
+        self._buffer += token
+        phrases = []
+        while True:
+            clause_chars = self.first_chars if not self.phrases else self.phrase_chars
+            end = None
+            for match in _boundary_re.finditer(self._buffer, self._scan):
+                sentence = match.group(0)[0] not in ",;:—"
+                if match.end() >= (self.first_chars if sentence else clause_chars):
+                    end = match.end()
+                    break
+            if end is None and len(self._buffer) > self.max_chars:
+                space = self._buffer.rfind(" ", 0, self.max_chars)
+                end = space if space > 0 else self.max_chars
+            if end is None:
+                # Rescan the last character: its boundary may need the next token
+                self._scan = max(0, len(self._buffer) - 1)
+                return phrases
+            phrase = self._take(end)
+            if phrase:
+                phrases.append(phrase)
+
+    def flush(self) -> Optional[str]:
+        """The remaining text once the answer is complete."""
+        phrase = self._take(len(self._buffer))
+        return phrase or None
+
+
+async def _replay(tokens: List[str]) -> AsyncIterator[str]:
+    for token in tokens:
+        yield token
+
+
+def audio_key(text: str, tts: TTSPool, audio: AudioCache) -> str:
+    """Audio cache key of an answer spoken with the pool's voice and format."""
+    return audio.key(text, tts.voice_id, tts.model_id, tts.output_format)
+
+
+def audio_metadata(text: str, tts: TTSPool) -> Dict[str, Any]:
+    return {
+        "text": text,
+        "voice_id": tts.voice_id,
+        "model_id": tts.model_id,
+        "output_format": tts.output_format,
+        "sample_rate": tts.sample_rate,
+    }
+
+
+async def stream_voice_answer(
+    question: str,
+    send_json: Callable[[Dict[str, Any]], Awaitable[None]],
+    send_bytes: Callable[[bytes], Awaitable[None]],
+    openai_client: Any,
+    tts: TTSPool = tts_pool,
+    audio: AudioCache = audio_cache,
+    session_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Answer ``question`` with text events and PCM audio on one socket.
+
+    Tokens are sent to the client as they arrive and cut into phrases,
+    which are spoken over a pre-warmed TTS connection while generation
+    continues. A cached answer whose speech is in the audio cache is
+    played straight from disk instead. Retrieval prefetched for
+    ``session_id`` from interim transcripts is reused. Returns the
+    answer's latency metrics, which are also sent in the final ``done``
+    event.
+    """
+    start = time.perf_counter()
+    trace = RequestTrace("voice")
+    metrics: Dict[str, Any] = {}
+
+    with trace.stage("embed"):
+        if session_id:
+            qvec, prefetched = await prefetch_cache.claim(session_id, question)
+        else:
+            qvec, prefetched = await embed_query(question), None
+    version = get_backend().version
+    cached = prerendered_answers.lookup(qvec, version) or answer_cache.lookup(qvec, version)
+    answer = None
+    cached_audio = None
+    if cached:
+        contexts = cached.contexts
+        tokens = _replay(cached.tokens)
+        key = audio_key(cached.text, tts, audio)
+        if await asyncio.to_thread(audio.get, key) is not None:
+            cached_audio = key
+    else:
+        contexts, messages = await prepare_messages(question, qvec, trace, contexts=prefetched)
+        stream = await openai_client.chat.completions.create(
+            model=GENERATION_MODEL,
+            messages=messages,
+            temperature=0.4,
+            stream=True,
+            max_tokens=int(os.getenv("MAX_TOKENS", "600")),
+        )
+        answer = AnswerStream(stream)
+        tokens = answer.text_tokens()
+
+    await send_json({"type": "context", "snippets": contexts})
+    source = "cache" if cached_audio else "tts"
+    metrics["audio_source"] = source
+    await send_json({
+        "type": "audio_start", "format": "pcm_s16le", "sample_rate": tts.sample_rate, "channels": 1, "source": source,
+    })
+
+    phrases: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+    text: List[str] = []
+
+    async def produce():
+        splitter = PhraseSplitter()
+        try:
+            async for token in tokens:
+                if not text:
+                    metrics["ttft_ms"] = round((time.perf_counter() - start) * 1000, 1)
+                text.append(token)
+                await send_json({"type": "token", "token": token})
+                for phrase in splitter.feed(token):
+                    phrases.put_nowait(phrase)
+            rest = splitter.flush()
+            if rest:
+                phrases.put_nowait(rest)
+        finally:
+            phrases.put_nowait(None)
+
+    async def phrase_stream() -> AsyncIterator[str]:
+        while (phrase := await phrases.get()) is not None:
+            yield phrase
+
+    producer = asyncio.create_task(produce())
+    spoken: List[bytes] = []
+    try:
+        first_audio = None
+        metrics["audio_bytes"] = 0
+        frames = audio.stream(cached_audio) if cached_audio else tts.synthesize(phrase_stream())
+        async for pcm in frames:
+            if first_audio is None:
+                first_audio = time.perf_counter() - start
+                trace.record("first_audio", first_audio)
+                VOICE_FIRST_AUDIO_SECONDS.observe(first_audio, source)
+                metrics["ttfa_ms"] = round(first_audio * 1000, 1)
+            if not cached_audio:
+                spoken.append(pcm)
+            metrics["audio_bytes"] += len(pcm)
+            await send_bytes(pcm)
+        await producer
+    except (asyncio.CancelledError, WebSocketDisconnect):
+        # The client went away; closing the LLM stream stops generation
+        trace.finish("aborted")
+        raise
+    except Exception:
+        trace.finish("error")
+        raise
+    finally:
+        producer.cancel()
+        if answer is not None:
+            await answer.aclose()
+
+    metrics["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    if answer is not None and answer.completed:
+        answer_cache.store(qvec, version, contexts, answer.tokens)
+    done: Dict[str, Any] = {"type": "done", "text": "".join(text), "metrics": metrics}
+    if cached_audio:
+        done["audio_key"] = cached_audio
+    elif spoken and (cached or answer.completed):
+        key = audio_key(done["text"], tts, audio)
+        if await asyncio.to_thread(audio.put, key, spoken, audio_metadata(done["text"], tts)):
+            done["audio_key"] = key
+    await send_json(done)
+    trace.finish("cache_hit" if cached else "answered")
+    logger.debug("🔊 Voice answer: %s", metrics)
+    return metrics
+
+
+class PrerenderedAnswers:
+    """Pre-rendered FAQ answers, matched by question embedding.
+
+    Unlike the answer cache these entries never expire and are never
+    evicted, so the FAQ keeps playing its pre-synthesized audio however
+    much other traffic goes through the answer cache. They only match for
+    the collection version they were rendered against.
+    """
+
+    def __init__(self, threshold: float = ANSWER_CACHE_THRESHOLD):
+        self.threshold = threshold
+        self.version: Optional[int] = None
+        self._answers: List[CachedAnswer] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._answers)
+
+    def load(self, qvecs: List[List[float]], answers: List[CachedAnswer], version: int):
+        self._answers = answers
+        self.version = version
+        if not answers:
+            self._matrix = None
+            return
+        matrix = np.asarray(qvecs, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self._matrix = matrix / np.where(norms == 0, 1, norms)
+
+    def lookup(self, qvec: List[float], version: int) -> Optional[CachedAnswer]:
+        if not self._answers or version != self.version:
+            return None
+        vec = np.asarray(qvec, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        sims = self._matrix @ (vec / norm if norm else vec)
+        best = int(np.argmax(sims))
+        return self._answers[best] if sims[best] >= self.threshold else None
+
+
+# Global instance
+prerendered_answers = PrerenderedAnswers()
+
+
+def prerendered_path(audio: AudioCache = audio_cache) -> str:
+    return os.path.join(audio.path, "prerendered_answers.json")
+
+
+async def prerender_answers(
+    questions: List[str],
+    openai_client: Any,
+    tts: TTSPool = tts_pool,
+    audio: AudioCache = audio_cache,
+) -> List[Dict[str, Any]]:
+    """Generate and synthesize answers to ``questions`` ahead of time.
+
+    Speech goes into the audio cache; the answers (with their contexts and
+    the collection version) are written next to it, so that a server can
+    seed its answer cache with them at startup and play the FAQ from disk.
+    """
+    version = get_backend().version
+    answers = []
+    for question in questions:
+        trace = RequestTrace("prerender")
+        qvec = await embed_query(question)
+        contexts, messages = await prepare_messages(question, qvec, trace)
+        response = await openai_client.chat.completions.create(
+            model=GENERATION_MODEL,
+            messages=messages,
+            temperature=0.4,
+            max_tokens=int(os.getenv("MAX_TOKENS", "600")),
+        )
+        text = response.choices[0].message.content or ""
+        key = audio_key(text, tts, audio)
+        if await asyncio.to_thread(audio.get, key) is None:
+            splitter = PhraseSplitter()
+
+            async def phrases() -> AsyncIterator[str]:
+                for phrase in splitter.feed(text):
+                    yield phrase
+                rest = splitter.flush()
+                if rest:
+                    yield rest
+
+            pcm = [chunk async for chunk in tts.synthesize(phrases())]
+            await asyncio.to_thread(audio.put, key, pcm, audio_metadata(text, tts))
+        answers.append({
+            "question": question,
+            "tokens": _token_re.findall(text),
+            "contexts": contexts,
+            "version": version,
+        })
+        trace.finish("prerendered")
+        logger.info(f"🔊 Pre-rendered: {question}")
+
+    os.makedirs(audio.path, exist_ok=True)
+    path = prerendered_path(audio)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(answers, f)
+    os.replace(f"{path}.tmp", path)
+    return answers
+
+
+async def load_prerendered_answers(audio: AudioCache = audio_cache) -> int:
+    """Load pre-rendered answers for the current collection version.
+
+    They are pinned in ``prerendered_answers`` for the voice path and also
+    seed the answer cache, so /ask replays them while they stay there.
+    """
+    path = prerendered_path(audio)
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8") as f:
+        answers = json.load(f)
+    version = get_backend().version
+    fresh = [a for a in answers if a["version"] == version]
+    if len(fresh) < len(answers):
+        logger.warning(f"⚠️  {len(answers) - len(fresh)} pre-rendered answers are from an older ingest; re-run prerender")
+    qvecs, answers = [], []
+    for entry in fresh:
+        qvec = await embed_query(entry["question"])
+        contexts = [tuple(c) for c in entry["contexts"]]
+        answer_cache.store(qvec, version, contexts, entry["tokens"])
+        qvecs.append(qvec)
+        answers.append(CachedAnswer(contexts, entry["tokens"]))
+    prerendered_answers.load(qvecs, answers, version)
+    return len(fresh)
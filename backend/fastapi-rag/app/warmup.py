@@ -0,0 +1,111 @@
+import os
+import time
+import asyncio
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .backends import get_backend
+from .lexical import LEXICAL_INDEX_PATH, get_lexical_index
+from .logger import get_logger
+from .rag import RETRIEVAL_MODE, embed
+from .tokens import count_tokens
+from .tts import tts_pool
+from .voice import load_prerendered_answers
+
+logger = get_logger(__name__)
+
+WARMUP_QUESTIONS_PATH = os.getenv(
+    "WARMUP_QUESTIONS_PATH", str(Path(__file__).parent.parent / "docs" / "faq.md")
+)
+
+
+def load_warmup_questions(path: str = WARMUP_QUESTIONS_PATH) -> List[str]:
+    """Canned questions to pre-embed at startup.
+
+    Markdown files contribute their ``### ...?`` headings (the FAQ format);
+    any other file is read as one question per line.
+    """
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+    if path.endswith(".md"):
+        return [line[4:].strip() for line in lines if line.startswith("### ") and line.endswith("?")]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+class Readiness:
+    """Progress of the startup warm-up, reported by /health and /ready."""
+
+    def __init__(self):
+        self.ready = False
+        self.started_at = time.monotonic()
+        self.steps: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+
+    async def step(self, name: str, fn: Callable[[], Awaitable[Any]]) -> bool:
+        """Run one warm-up step; failures are logged, not raised. Returns whether it succeeded."""
+        start = time.perf_counter()
+        ok = True
+        try:
+            await fn()
+        except Exception as e:
+            ok = False
+            self.errors[name] = str(e)
+            logger.warning(f"⚠️  Warm-up step {name} failed: {e}")
+        self.steps[name] = round((time.perf_counter() - start) * 1000, 1)
+        return ok
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "warmup_ms": self.steps,
+            "warmup_errors": self.errors,
+        }
+
+
+# Global instance
+readiness = Readiness()
+
+
+async def warm_up(openai_client=None, state: Optional[Readiness] = None):
+    """Open and warm everything the first /ask would otherwise pay for.
+
+    Opens the retrieval backend and runs a query against it, loads the
+    lexical index (hybrid mode) and the tokenizer, pre-embeds the canned
+    questions into the embedding cache, seeds the answer cache with the
+    pre-rendered FAQ answers and connects the TTS pool.
+    """
+    state = state or readiness
+    start = time.perf_counter()
+
+    async def open_backend():
+        backend = await asyncio.to_thread(get_backend)
+        await backend.warm_up()
+
+    async def load_lexical_index():
+        if await asyncio.to_thread(get_lexical_index) is None:
+            raise FileNotFoundError(f"No lexical index at {LEXICAL_INDEX_PATH}; run scripts/ingest.py")
+
+    async def load_tokenizer():
+        await asyncio.to_thread(count_tokens, "warm-up")
+
+    async def embed_questions():
+        questions = load_warmup_questions()
+        if questions and openai_client is not None:
+            await embed(questions, openai_client)
+
+    # Only retrieval is required for readiness; the other steps just warm caches
+    required = [await state.step("backend", open_backend)]
+    if RETRIEVAL_MODE == "hybrid":
+        required.append(await state.step("lexical_index", load_lexical_index))
+    await state.step("tokenizer", load_tokenizer)
+    await state.step("canned_questions", embed_questions)
+    if openai_client is not None:
+        await state.step("prerendered_answers", load_prerendered_answers)
+    if tts_pool.configured:
+        await state.step("tts_pool", tts_pool.warm_up)
+    state.ready = all(required)
+    if not state.ready:
+        logger.error(f"❌ Warm-up could not open retrieval, staying unready: {state.errors}")
+    logger.info(f"🔥 Warm-up finished in {(time.perf_counter() - start) * 1000:.0f} ms: {state.steps}")
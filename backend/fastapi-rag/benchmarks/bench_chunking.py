@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Compare the streaming markdown chunker with the previous sentence chunker.
+
+Builds a multi-MB markdown file by repeating the documents in docs/, then
+chunks it with the previous regex-and-concatenation chunker (which needs
+the whole text in memory) and with ``chunk_markdown_stream`` reading the
+file line by line, both by characters and by tokens. Reports throughput,
+peak traced memory and chunk counts. The new chunker does more work per
+line (it parses structure); what it buys is memory bounded by one block.
+
+Usage:
+    python benchmarks/bench_chunking.py [--size-mb 8]
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.chunking import chunk_markdown_stream
+
+DOCS_PATH = Path(__file__).parent.parent / "docs"
+
+_sentence_splitter = re.compile(r"(?<=[.!?])\s+")
+
+
+def legacy_chunk_markdown(text: str, max_len: int = 1000) -> List[str]:
+    """The sentence chunker ``chunk_markdown`` used before the streaming one."""
+    parts: List[str] = []
+    buf = ""
+    for s in _sentence_splitter.split(text.replace("\r", "")):
+        if len((buf + " " + s).strip()) > max_len:
+            if buf:
+                parts.append(buf.strip())
+            buf = s
+        else:
+            buf = (buf + " " + s).strip()
+    if buf:
+        parts.append(buf.strip())
+    return parts
+
+
+def measure(name: str, fn, size: int):
+    start = time.perf_counter()
+    chunks = fn()
+    elapsed = time.perf_counter() - start
+    # Memory is traced in a second run, as tracing slows allocation-heavy code
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<26} {size / 2**20 / elapsed:>8.1f} {peak / 2**10:>9.0f} {chunks:>8}")
+
+
+def main(size_mb: float):
+    corpus = "\n\n".join(p.read_text(encoding="utf-8") for p in sorted(DOCS_PATH.glob("*.md")))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "corpus.md")
+        with open(path, "w", encoding="utf-8") as f:
+            for _ in range(int(size_mb * 2**20 / len(corpus)) + 1):
+                f.write(corpus + "\n\n")
+        size = os.path.getsize(path)
+        print(f"📄 {size / 2**20:.1f} MB of markdown")
+        print(f"{'chunker':<26} {'MB/s':>8} {'peak KB':>9} {'chunks':>8}")
+
+        def legacy():
+            with open(path, "r", encoding="utf-8") as f:
+                return len(legacy_chunk_markdown(f.read()))
+
+        def streaming(**kwargs):
+            with open(path, "r", encoding="utf-8") as f:
+                return sum(1 for _ in chunk_markdown_stream(f, **kwargs))
+
+        measure("legacy (1000 chars)", legacy, size)
+        measure("streaming (1000 chars)", lambda: streaming(max_tokens=1000, overlap_tokens=0, length=len), size)
+        measure("streaming (250 tokens)", lambda: streaming(max_tokens=250, overlap_tokens=30), size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--size-mb", type=float, default=8, help="size of the generated markdown")
+    args = parser.parse_args()
+    main(args.size_mb)
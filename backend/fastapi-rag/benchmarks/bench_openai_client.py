@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark a shared, pooled OpenAI client against a new client per request.
+
+Requests go to the local fake OpenAI server through a TCP proxy that delays
+every new connection by --handshake-ms, standing in for the TCP + TLS setup
+paid on each fresh connection to api.openai.com. Reports p50/p99 latency and
+the number of connections opened.
+
+Usage:
+    python benchmarks/bench_openai_client.py [--requests 200] [--concurrency 10] [--handshake-ms 30]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from openai import AsyncOpenAI
+
+from app.openai_client import create_openai_client
+from benchmarks.bench_query_batching import percentile
+from benchmarks.fake_openai import FakeOpenAIServer
+
+
+class HandshakeProxy:
+    """TCP proxy that adds a fixed delay before each new connection is usable."""
+
+    def __init__(self, target_port: int, delay: float):
+        self.target_port = target_port
+        self.delay = delay
+        self.port = 0
+        self._server = None
+
+    async def _pipe(self, reader, writer):
+        try:
+            while data := await reader.read(65536):
+                writer.write(data)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def _handle(self, reader, writer):
+        await asyncio.sleep(self.delay)
+        upstream_reader, upstream_writer = await asyncio.open_connection("127.0.0.1", self.target_port)
+        await asyncio.gather(
+            self._pipe(reader, upstream_writer),
+            self._pipe(upstream_reader, writer),
+            return_exceptions=True,
+        )
+
+    async def start(self) -> str:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    async def stop(self):
+        self._server.close()
+
+
+async def run(embed_one, requests: int, concurrency: int):
+    latencies = []
+    queue = iter(range(requests))
+
+    async def worker():
+        for i in queue:
+            start = time.perf_counter()
+            await embed_one(f"question {i}")
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+async def main(requests: int, concurrency: int, handshake_ms: float, latency: float):
+    async with FakeOpenAIServer(latency=latency) as server:
+        proxy = HandshakeProxy(server.port, handshake_ms / 1000)
+        base_url = await proxy.start()
+
+        async def new_client_per_request(text):
+            client = AsyncOpenAI(api_key="benchmark", base_url=base_url, max_retries=0)
+            try:
+                await client.embeddings.create(model="text-embedding-ada-002", input=[text])
+            finally:
+                await client.close()
+
+        shared = create_openai_client(api_key="benchmark", base_url=base_url)
+
+        async def shared_client(text):
+            await shared.embeddings.create(model="text-embedding-ada-002", input=[text])
+
+        print(f"{'client':<12} {'p50 ms':>8} {'p99 ms':>8} {'connections':>11} {'requests':>8}")
+        for name, embed_one in (("per-request", new_client_per_request), ("shared", shared_client)):
+            server.connections.clear()
+            latencies = await run(embed_one, requests, concurrency)
+            print(
+                f"{name:<12} {percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 99) * 1000:>8.1f} "
+                f"{len(server.connections):>11} {len(latencies):>8}"
+            )
+
+        await shared.close()
+        await proxy.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=200, help="total embedding requests")
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent callers")
+    parser.add_argument("--handshake-ms", type=float, default=30, help="simulated connection setup cost")
+    parser.add_argument("--latency", type=float, default=0.01, help="fake upstream latency (s)")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.handshake_ms, args.latency))
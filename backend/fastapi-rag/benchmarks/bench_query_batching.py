@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark query embedding micro-batching against the local fake OpenAI server.
+
+Runs embed_query() from 1, 10 and 100 concurrent clients, with and without the
+request coalescer, and reports p50/p99 latency and upstream call count.
+
+Usage:
+    python benchmarks/bench_query_batching.py [--latency 0.02] [--rounds 20]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from app import rag
+from app.openai_client import create_openai_client
+from app.embedding_store import EmbeddingStore
+from benchmarks.fake_openai import FakeOpenAIServer
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+async def run_clients(embed_one, clients: int, rounds: int):
+    """Each client issues ``rounds`` sequential unique queries."""
+    latencies = []
+
+    async def client():
+        for _ in range(rounds):
+            start = time.perf_counter()
+            await embed_one(f"question {uuid.uuid4()}")
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies
+
+
+async def main(latency: float, rounds: int):
+    async with FakeOpenAIServer(latency=latency) as server:
+        rag.client = create_openai_client(api_key="benchmark", base_url=server.base_url)
+        with tempfile.TemporaryDirectory() as tmp:
+            rag.embedding_store = EmbeddingStore(os.path.join(tmp, "embeddings.sqlite3"))
+
+            modes = {
+                "unbatched": lambda q: rag.embed([q]),
+                "batched": rag.embed_query,
+            }
+            print(f"{'mode':<10} {'clients':>7} {'p50 ms':>8} {'p99 ms':>8} {'calls':>6} {'requests':>8}")
+            for clients in (1, 10, 100):
+                for mode, embed_one in modes.items():
+                    before = len(server.embedding_requests)
+                    latencies = await run_clients(embed_one, clients, rounds)
+                    calls = len(server.embedding_requests) - before
+                    print(
+                        f"{mode:<10} {clients:>7} {percentile(latencies, 50) * 1000:>8.1f} "
+                        f"{percentile(latencies, 99) * 1000:>8.1f} {calls:>6} {len(latencies):>8}"
+                    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--latency", type=float, default=0.02, help="fake upstream latency (s)")
+    parser.add_argument("--rounds", type=int, default=20, help="queries per client")
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.rounds))
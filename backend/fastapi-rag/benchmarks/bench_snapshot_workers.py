@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Measure per-worker memory when several processes serve one vector snapshot.
+
+Writes a synthetic snapshot, then starts 1, 2, 4, ... worker processes that
+each load it with the NumPy backend and run queries over the whole matrix.
+Reports, per worker, the private memory (USS) and the proportional share of
+shared pages (PSS) from /proc/<pid>/smaps_rollup. With a memory-mapped
+snapshot, private memory stays flat as workers are added and the shared
+index is split between them. Linux only.
+
+Usage:
+    python benchmarks/bench_snapshot_workers.py [--chunks 50000] [--dim 1024] [--workers 1,2,4,8]
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.vector_index import SnapshotBackend, write_snapshot
+
+
+def memory_kb(pid: int) -> dict:
+    """Rss, Pss and private (USS) memory of ``pid`` in kB."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "uss": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0),
+    }
+
+
+def worker(path: str, queries: int, ready, done):
+    backend = SnapshotBackend(path, poll_seconds=3600)
+    rng = np.random.default_rng(os.getpid())
+    for q in rng.normal(size=(queries, backend.index.vectors.shape[1])).astype(np.float32):
+        backend.index.top_k(q, 6)
+    ready.put(os.getpid())
+    done.wait()
+
+
+def measure(path: str, workers: int, queries: int) -> dict:
+    ctx = mp.get_context("spawn")
+    ready, done = ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=worker, args=(path, queries, ready, done)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    pids = [ready.get() for _ in procs]
+    usage = [memory_kb(pid) for pid in pids]
+    done.set()
+    for p in procs:
+        p.join()
+    return {k: sum(u[k] for u in usage) / len(usage) / 1024 for k in ("rss", "pss", "uss")}
+
+
+def main(chunks: int, dim: int, worker_counts, queries: int):
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "snapshot")
+        vectors = rng.normal(size=(chunks, dim)).astype(np.float32)
+        write_snapshot(path, vectors, [f"chunk {i} " * 20 for i in range(chunks)], [{"chunk_id": i} for i in range(chunks)])
+        print(f"📦 Snapshot: {chunks} chunks x {dim} dims = {vectors.nbytes / 2**20:.0f} MB of vectors")
+        del vectors
+
+        print(f"{'workers':>7} {'RSS MB':>8} {'PSS MB':>8} {'USS MB':>8}   (mean per worker)")
+        for n in worker_counts:
+            m = measure(path, n, queries)
+            print(f"{n:>7} {m['rss']:>8.1f} {m['pss']:>8.1f} {m['uss']:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--chunks", type=int, default=50000, help="chunks in the synthetic snapshot")
+    parser.add_argument("--dim", type=int, default=1024, help="embedding dimensions")
+    parser.add_argument("--workers", default="1,2,4,8", help="comma-separated worker counts")
+    parser.add_argument("--queries", type=int, default=20, help="queries each worker runs before measuring")
+    args = parser.parse_args()
+    main(args.chunks, args.dim, [int(n) for n in args.workers.split(",")], args.queries)
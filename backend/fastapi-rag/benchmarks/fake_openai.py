@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Local fake OpenAI server for tests and benchmarks.
+Serves deterministic embeddings on /v1/embeddings and streamed chat
+completions on /v1/chat/completions without network access.
+"""
+
+import asyncio
+import hashlib
+import json
+import struct
+import time
+from typing import List, Optional
+
+from aiohttp import web
+
+
+def fake_embedding(text: str, dim: int = 8) -> List[float]:
+    """Deterministic, unit-length pseudo-embedding derived from the text hash."""
+    digest = b""
+    counter = 0
+    while len(digest) < dim * 4:
+        digest += hashlib.sha256(f"{counter}:{text}".encode("utf-8")).digest()
+        counter += 1
+    values = [v / 2**32 - 0.5 for v in struct.unpack(f"<{dim}I", digest[:dim * 4])]
+    norm = sum(v * v for v in values) ** 0.5 or 1.0
+    return [v / norm for v in values]
+
+
+_WORDS = (
+    "Miguel has led data and ML platform teams, building pipelines, retrieval "
+    "systems and models in production across telecom, fintech and adtech."
+).split()
+
+
+def fake_completion(prompt: str, tokens: int) -> List[str]:
+    """Deterministic completion tokens (one word each) for a prompt."""
+    start = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16) % len(_WORDS)
+    return [(" " if i else "") + _WORDS[(start + i) % len(_WORDS)] for i in range(tokens)]
+
+
+class FakeOpenAIServer:
+    """aiohttp server mimicking the parts of the OpenAI API we use.
+
+    ``latency`` delays every embedding response, ``rate_limit_first`` makes
+    the first N embedding requests fail with 429 + Retry-After. Chat
+    completions stream ``completion_tokens`` tokens, the first after
+    ``ttft`` seconds and the rest at ``tokens_per_second`` (0 = no delay).
+    Requests, peak concurrency and the client TCP connections seen are
+    recorded for assertions.
+    """
+
+    def __init__(self, dim: int = 8, latency: float = 0.0, rate_limit_first: int = 0,
+                 ttft: float = 0.0, tokens_per_second: float = 0.0, completion_tokens: int = 50,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.dim = dim
+        self.latency = latency
+        self.rate_limit_first = rate_limit_first
+        self.ttft = ttft
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.chat_requests = 0
+        self.chat_aborted = 0
+        self.host = host
+        self.port = port
+        self.embedding_requests: List[List[str]] = []
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.connections = set()
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/v1/embeddings", self.handle_embeddings)
+        app.router.add_post("/v1/chat/completions", self.handle_chat)
+        return app
+
+    async def start(self) -> str:
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self.base_url
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    async def handle_embeddings(self, request: web.Request) -> web.Response:
+        self.connections.add(request.transport.get_extra_info("peername"))
+        body = await request.json()
+        inputs = body["input"]
+        if isinstance(inputs, str):
+            inputs = [inputs]
+
+        if self.rate_limited < self.rate_limit_first:
+            self.rate_limited += 1
+            return web.json_response(
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                status=429,
+                headers={"Retry-After": "0"},
+            )
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            self.embedding_requests.append(list(inputs))
+            tokens = sum(max(1, len(t) // 4) for t in inputs)
+            return web.json_response({
+                "object": "list",
+                "model": body.get("model", "fake-embedding"),
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": fake_embedding(t, self.dim)}
+                    for i, t in enumerate(inputs)
+                ],
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            })
+        finally:
+            self.in_flight -= 1
+
+
+    async def handle_chat(self, request: web.Request) -> web.StreamResponse:
+        self.connections.add(request.transport.get_extra_info("peername"))
+        body = await request.json()
+        self.chat_requests += 1
+        model = body.get("model", "fake-chat")
+        prompt = body["messages"][-1]["content"] if body.get("messages") else ""
+        tokens = fake_completion(prompt, min(self.completion_tokens, body.get("max_tokens") or self.completion_tokens))
+        created = int(time.time())
+
+        def chunk(delta, finish_reason=None):
+            return {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        if not body.get("stream"):
+            await asyncio.sleep(self.ttft + (len(tokens) / self.tokens_per_second if self.tokens_per_second else 0))
+            return web.json_response({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(tokens),
+                          "total_tokens": len(prompt) // 4 + len(tokens)},
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.ttft)
+            for i, token in enumerate(tokens):
+                if i and self.tokens_per_second:
+                    await asyncio.sleep(1 / self.tokens_per_second)
+                delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+                await response.write(f"data: {json.dumps(chunk(delta))}\n\n".encode())
+            await response.write(f"data: {json.dumps(chunk({}, 'stop'))}\n\ndata: [DONE]\n\n".encode())
+            await response.write_eof()
+        except (ConnectionResetError, asyncio.CancelledError):
+            self.chat_aborted += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        return response
+
+
+async def main():
+    async with FakeOpenAIServer(port=8011, ttft=0.3, tokens_per_second=50) as server:
+        print(f"🤖 Fake OpenAI server running at {server.base_url}")
+        await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+"""
+Local fake ElevenLabs ``stream-input`` WebSocket server for tests and benchmarks.
+Answers every flushed text message with deterministic PCM without network access.
+"""
+
+import asyncio
+import base64
+import json
+from typing import List, Optional
+
+import websockets
+
+
+def fake_pcm(text: str, bytes_per_char: int = 64) -> bytes:
+    """Deterministic 16-bit PCM "speech" for a piece of text."""
+    return (text.encode("utf-8") * bytes_per_char)[: len(text) * bytes_per_char]
+
+
+class FakeTTSServer:
+    """ElevenLabs-compatible ``/v1/text-to-speech/{voice}/stream-input`` socket.
+
+    Each non-blank text message is answered with one audio message after
+    ``latency`` seconds (the first after ``first_latency``, if given); the
+    final empty message gets ``isFinal`` and closes the socket. Connections,
+    API keys, paths and the texts received are recorded for assertions.
+    """
+
+    def __init__(self, latency: float = 0.0, first_latency: Optional[float] = None,
+                 bytes_per_char: int = 64, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.first_latency = latency if first_latency is None else first_latency
+        self.bytes_per_char = bytes_per_char
+        self.host = host
+        self.port = port
+        self.connections = 0
+        self.api_keys: List[str] = []
+        self.paths: List[str] = []
+        self.texts: List[str] = []
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handle(self, ws):
+        self.connections += 1
+        self.api_keys.append(ws.request.headers.get("xi-api-key"))
+        self.paths.append(ws.request.path)
+        first = True
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                text = message.get("text")
+                if text == "":
+                    await ws.send(json.dumps({"isFinal": True}))
+                    break
+                if not text or not text.strip():
+                    continue
+                self.texts.append(text)
+                await asyncio.sleep(self.first_latency if first else self.latency)
+                first = False
+                audio = base64.b64encode(fake_pcm(text, self.bytes_per_char)).decode()
+                await ws.send(json.dumps({"audio": audio, "isFinal": False}))
+        except websockets.ConnectionClosed:
+            pass
+
+    async def __aenter__(self):
+        self._server = await websockets.serve(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
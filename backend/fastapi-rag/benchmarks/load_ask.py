@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Load-test /ask over SSE and report latency percentiles.
+
+By default the whole stack runs offline: a fake OpenAI server (deterministic
+embeddings, chat tokens streamed with configurable TTFT and rate) is
+started, docs/ is ingested into a temporary ChromaDB with it, and the app
+is launched with uvicorn against that corpus. Pass --url to load an
+already running service instead.
+
+Each request records the time to the ``context`` event, time to first
+token, total time and tokens/sec; the report shows p50/p95/p99 and error
+counts. --json writes the results for regression tracking and --baseline
+compares them with an earlier run (exit code 1 on a regression).
+
+The local stack disables the per-IP rate limit and the answer cache
+(every request comes from one address and questions repeat); set
+RATE_LIMIT_PER_MINUTE / ANSWER_CACHE_SIZE to override.
+
+Usage:
+    python benchmarks/load_ask.py [--requests 200] [--concurrency 16]
+        [--ttft 0.3] [--tokens-per-second 60] [--completion-tokens 80]
+        [--url http://localhost:8001] [--questions questions.txt]
+        [--json results.json] [--baseline previous.json]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiohttp
+
+# Add parent directory to path to import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from app.warmup import load_warmup_questions
+from benchmarks.bench_query_batching import percentile
+from benchmarks.fake_openai import FakeOpenAIServer
+
+ROOT = Path(__file__).parent.parent
+FAQ_PATH = ROOT / "docs" / "faq.md"
+
+# Latency fields reported as percentiles, in seconds
+METRICS = ("context", "ttft", "total")
+
+
+class SSEParser:
+    """Incremental parser of ``event:``/``data:`` frames from a byte stream."""
+
+    def __init__(self):
+        self._buffer = b""
+
+    def feed(self, data: bytes) -> List[Tuple[str, str]]:
+        """Add bytes; return the (event, data) frames completed by them."""
+        self._buffer += data.replace(b"\r\n", b"\n")
+        events = []
+        while b"\n\n" in self._buffer:
+            frame, self._buffer = self._buffer.split(b"\n\n", 1)
+            event, lines = "message", []
+            for line in frame.decode("utf-8").split("\n"):
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    lines.append(line[5:].lstrip())
+            if lines:
+                events.append((event, "\n".join(lines)))
+        return events
+
+
+class AskResult:
+    """Timings of one /ask request, in seconds from when it was sent."""
+
+    def __init__(self):
+        self.status = 0
+        self.error: Optional[str] = None
+        self.context: Optional[float] = None
+        self.ttft: Optional[float] = None
+        self.total: Optional[float] = None
+        self.tokens = 0
+        self.last_token: Optional[float] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        if self.tokens < 2 or self.last_token is None or self.last_token <= self.ttft:
+            return None
+        return (self.tokens - 1) / (self.last_token - self.ttft)
+
+
+async def ask_once(session: aiohttp.ClientSession, url: str, question: str) -> AskResult:
+    """POST one question and time its SSE events."""
+    result = AskResult()
+    parser = SSEParser()
+    done = False
+    start = time.perf_counter()
+    try:
+        async with session.post(f"{url}/ask", json={"question": question}) as response:
+            result.status = response.status
+            if response.status != 200:
+                result.error = f"http_{response.status}"
+                await response.read()
+                return result
+            async for data in response.content.iter_any():
+                now = time.perf_counter() - start
+                for event, _ in parser.feed(data):
+                    if event == "context" and result.context is None:
+                        result.context = now
+                    elif event == "token":
+                        if result.ttft is None:
+                            result.ttft = now
+                        result.tokens += 1
+                        result.last_token = now
+                    elif event == "done":
+                        done = True
+        result.total = time.perf_counter() - start
+        if not done:
+            result.error = "incomplete"
+    except asyncio.TimeoutError:
+        result.error = "timeout"
+    except aiohttp.ClientError as e:
+        result.error = type(e).__name__
+    return result
+
+
+async def run_load(
+    url: str, questions: List[str], requests: int, concurrency: int, timeout: float = 60
+) -> Tuple[List[AskResult], float]:
+    """Send ``requests`` questions from ``concurrency`` clients over one pooled session."""
+    results: List[AskResult] = []
+    counter = iter(range(requests))
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=client_timeout) as session:
+
+        async def client():
+            for i in counter:
+                results.append(await ask_once(session, url, questions[i % len(questions)]))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+    return results, wall
+
+
+def summarize(results: List[AskResult], wall: float) -> Dict[str, Any]:
+    """Percentiles (ms), throughput and error counts of a run."""
+    ok = [r for r in results if r.ok]
+    errors: Dict[str, int] = {}
+    for r in results:
+        if not r.ok:
+            errors[r.error] = errors.get(r.error, 0) + 1
+
+    summary: Dict[str, Any] = {
+        "requests": len(results),
+        "ok": len(ok),
+        "errors": errors,
+        "wall_seconds": round(wall, 3),
+        "requests_per_second": round(len(ok) / wall, 2) if wall else 0.0,
+    }
+    for name in METRICS:
+        values = [getattr(r, name) * 1000 for r in ok if getattr(r, name) is not None]
+        summary[f"{name}_ms"] = {
+            f"p{p}": round(percentile(values, p), 1) if values else None for p in (50, 95, 99)
+        }
+    rates = [r.tokens_per_second for r in ok if r.tokens_per_second is not None]
+    summary["tokens_per_second"] = {
+        "p50": round(percentile(rates, 50), 1) if rates else None,
+        "p5": round(percentile(rates, 5), 1) if rates else None,
+    }
+    return summary
+
+
+def print_report(summary: Dict[str, Any]):
+    print(
+        f"📊 {summary['ok']}/{summary['requests']} ok in {summary['wall_seconds']:.1f}s "
+        f"({summary['requests_per_second']:.1f} req/s)"
+    )
+    print(f"{'ms':<10} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name in METRICS:
+        row = summary[f"{name}_ms"]
+        print(f"{name:<10} " + " ".join(f"{row[p] if row[p] is not None else '-':>8}" for p in ("p50", "p95", "p99")))
+    rates = summary["tokens_per_second"]
+    print(f"tokens/s   p50 {rates['p50']}  p5 {rates['p5']}")
+    if summary["errors"]:
+        print(f"❌ Errors: {summary['errors']}")
+
+
+def compare(summary: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Latency percentiles more than ``tolerance`` (fraction) above the baseline."""
+    regressions = []
+    for name in METRICS:
+        for p in ("p50", "p95", "p99"):
+            now, before = summary[f"{name}_ms"][p], baseline.get(f"{name}_ms", {}).get(p)
+            if now is not None and before and now > before * (1 + tolerance):
+                regressions.append(f"{name} {p}: {before} → {now} ms")
+    if summary["ok"] < summary["requests"] and baseline.get("ok") == baseline.get("requests"):
+        regressions.append(f"errors: {summary['errors']}")
+    return regressions
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.asynccontextmanager
+async def local_stack(args):
+    """Fake OpenAI server + ingested temporary corpus + the app under uvicorn."""
+    fake = FakeOpenAIServer(
+        dim=args.dim,
+        ttft=args.ttft,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+    )
+    async with fake, contextlib.AsyncExitStack() as stack:
+        tmp = stack.enter_context(tempfile.TemporaryDirectory())
+        env = {
+            "RATE_LIMIT_PER_MINUTE": "0",
+            "ANSWER_CACHE_SIZE": "0",
+            **os.environ,
+            "OPENAI_BASE_URL": fake.base_url,
+            "CHROMA_PATH": os.path.join(tmp, "chroma_db"),
+            "EMBEDDING_CACHE_PATH": os.path.join(tmp, "embeddings.sqlite3"),
+            "EXTRACT_CACHE_PATH": os.path.join(tmp, "extract_cache"),
+            "VECTOR_SNAPSHOT_PATH": os.path.join(tmp, "vector_snapshot"),
+            "LEXICAL_INDEX_PATH": os.path.join(tmp, "lexical_index.npz"),
+            "RATE_LIMIT_STORE_PATH": os.path.join(tmp, "rate_limits.sqlite3"),
+        }
+
+        print("📚 Ingesting docs/ with the fake embeddings...")
+        ingest = await asyncio.create_subprocess_exec(
+            sys.executable, "scripts/ingest.py", cwd=ROOT, env=env,
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+        )
+        _, stderr = await ingest.communicate()
+        if ingest.returncode != 0:
+            raise RuntimeError(f"Ingestion failed: {stderr.decode()[-2000:]}")
+
+        port = free_port()
+        server = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+            "--log-level", "warning", cwd=ROOT, env=env,
+        )
+        url = f"http://127.0.0.1:{port}"
+        try:
+            await wait_ready(url, server)
+            yield url, fake
+        finally:
+            if server.returncode is None:
+                server.terminate()
+                await server.wait()
+
+
+async def wait_ready(url: str, server, timeout: float = 60):
+    """Poll /ready until the app has finished its warm-up."""
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            if server.returncode is not None:
+                raise RuntimeError(f"Server exited with code {server.returncode}")
+            with contextlib.suppress(aiohttp.ClientError):
+                async with session.get(f"{url}/ready") as response:
+                    if response.status == 200:
+                        return
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {url} was not ready after {timeout:.0f}s")
+
+
+async def main(args):
+    questions = load_warmup_questions(args.questions)
+    if not questions:
+        raise SystemExit(f"No questions found in {args.questions}")
+
+    async with contextlib.AsyncExitStack() as stack:
+        url, fake = args.url, None
+        if not url:
+            url, fake = await stack.enter_async_context(local_stack(args))
+        print(f"🚀 {args.requests} requests, concurrency {args.concurrency} → {url}/ask")
+        if args.warmup:
+            await run_load(url, questions, args.warmup, min(args.warmup, args.concurrency), args.timeout)
+        results, wall = await run_load(url, questions, args.requests, args.concurrency, args.timeout)
+        summary = summarize(results, wall)
+        if fake is not None:
+            summary["upstream"] = {"chat_requests": fake.chat_requests, "chat_aborted": fake.chat_aborted}
+
+    print_report(summary)
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {
+            "url": args.url or "local",
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "ttft": args.ttft,
+            "tokens_per_second": args.tokens_per_second,
+            "completion_tokens": args.completion_tokens,
+        },
+        **summary,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(summary, json.load(f), args.tolerance)
+        if regressions:
+            print("📉 Regressions against the baseline:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"✅ Within {args.tolerance:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--url", help="load an already running service instead of the local stack")
+    parser.add_argument("--questions", default=str(FAQ_PATH), help="FAQ markdown or one question per line")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=8, help="requests sent before measuring")
+    parser.add_argument("--timeout", type=float, default=60, help="per-request timeout in seconds")
+    parser.add_argument("--ttft", type=float, default=0.3, help="fake LLM time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=60, help="fake LLM token rate")
+    parser.add_argument("--completion-tokens", type=int, default=80, help="fake LLM answer length")
+    parser.add_argument("--dim", type=int, default=64, help="fake embedding dimension")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare with the results of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline")
+    asyncio.run(main(parser.parse_args()))
@@ -1,12 +1,23 @@
 #!/usr/bin/env python3
 """
 CLI chat interface for testing the RAG system.
+
+Usage:
+    python cli_chat.py                                   # interactive chat
+    python cli_chat.py --batch questions.txt -c 8 -o results.jsonl
+    cat traffic.jsonl | python cli_chat.py --batch - --url https://staging.example.com
+
+Batch mode reads one question per line (or JSONL lines with a "question"
+field), asks them concurrently over one connection pool and writes one
+JSON result per question with its TTFT and total latency.
 """
 
+import argparse
 import asyncio
 import json
 import sys
-from typing import List, Tuple
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, TextIO, Tuple
 import aiohttp
 import os
 from dotenv import load_dotenv
@@ -14,13 +25,64 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+
+async def iter_sse(content: aiohttp.StreamReader) -> AsyncIterator[Tuple[str, Any]]:
+    """Yield (event, data) for each complete SSE frame, decoding the JSON once."""
+    buffer = b""
+    async for data in content.iter_any():
+        buffer += data
+        while b"\n\n" in buffer:
+            frame, buffer = buffer.split(b"\n\n", 1)
+            event, lines = "message", []
+            for line in frame.decode("utf-8").splitlines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                elif line.startswith("data:"):
+                    lines.append(line[5:].lstrip())
+            if not lines:
+                continue
+            try:
+                yield event, json.loads("\n".join(lines))
+            except json.JSONDecodeError:
+                continue
+
+
+def read_questions(source: TextIO) -> List[str]:
+    """Questions from plain lines or JSONL records with a ``question`` field."""
+    questions = []
+    for line in source:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("{"):
+            question = json.loads(line).get("question")
+            if question:
+                questions.append(question)
+        else:
+            questions.append(line)
+    return questions
+
+
+def _percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(p / 100 * len(ordered) + 0.5) - 1))]
+
+
 class RAGCLI:
-    def __init__(self, base_url: str = "http://localhost:8000"):
+    def __init__(self, base_url: str = "http://localhost:8000", concurrency: int = 4, timeout: float = 120):
         self.base_url = base_url
+        self.concurrency = concurrency
+        self.timeout = timeout
         self.session = None
     
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        # One pooled session shared by every request, capped at ``concurrency`` connections
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -40,48 +102,87 @@ class RAGCLI:
                     error_text = await response.text()
                     return f"Error {response.status}: {error_text}"
                 
-                full_response = ""
-                contexts = []
+                tokens = []
                 
-                async for line in response.content:
-                    line = line.decode('utf-8').strip()
-                    if not line:
-                        continue
+                # Handle Server-Sent Events, dispatching on the event name
+                async for event, data in iter_sse(response.content):
+                    if event == "context":
+                        contexts = data["snippets"]
+                        print(f"\n🔍 Found {len(contexts)} relevant context sources:")
+                        for i, (ctx, score) in enumerate(contexts):
+                            print(f"  {i+1}. Score: {score:.3f} | {ctx[:80]}...")
+                        print()
                     
-                    # Handle Server-Sent Events format
-                    if line.startswith('event: '):
-                        event_type = line[7:]  # Extract event type
-                        continue
+                    elif event == "token":
+                        print(data["token"], end='', flush=True)
+                        tokens.append(data["token"])
                     
-                    if line.startswith('data: '):
-                        try:
-                            data = json.loads(line[6:])
-                            
-                            if 'snippets' in data:
-                                contexts = data['snippets']
-                                print(f"\n🔍 Found {len(contexts)} relevant context sources:")
-                                for i, (ctx, score) in enumerate(contexts):
-                                    print(f"  {i+1}. Score: {score:.3f} | {ctx[:80]}...")
-                                print()
-                            
-                            elif 'token' in data:
-                                token = data['token']
-                                print(token, end='', flush=True)
-                                full_response += token
-                            
-                            elif 'text' in data:
-                                # Final response
-                                print("\n")
-                                return full_response
-                                
-                        except json.JSONDecodeError:
-                            continue
+                    elif event == "done":
+                        # Final response
+                        print("\n")
+                        break
                 
-                return full_response
+                return "".join(tokens)
                 
         except Exception as e:
             return f"Connection error: {e}"
     
+    async def ask_timed(self, question: str) -> Dict[str, Any]:
+        """Ask a question without printing; return the answer and its latencies."""
+        result: Dict[str, Any] = {
+            "question": question, "status": None, "error": None,
+            "context_ms": None, "ttft_ms": None, "total_ms": None, "tokens": 0, "answer": "",
+        }
+        tokens = []
+        done = False
+        start = time.perf_counter()
+        
+        def elapsed_ms() -> float:
+            return round((time.perf_counter() - start) * 1000, 1)
+        
+        try:
+            async with self.session.post(f"{self.base_url}/ask", json={"question": question}) as response:
+                result["status"] = response.status
+                if response.status != 200:
+                    result["error"] = f"HTTP {response.status}: {(await response.text())[:200]}"
+                    return result
+                async for event, data in iter_sse(response.content):
+                    if event == "context":
+                        result["context_ms"] = elapsed_ms()
+                    elif event == "token":
+                        if result["ttft_ms"] is None:
+                            result["ttft_ms"] = elapsed_ms()
+                        tokens.append(data["token"])
+                    elif event == "done":
+                        done = True
+                        break
+            if not done:
+                result["error"] = "stream ended before the done event"
+        except asyncio.TimeoutError:
+            result["error"] = f"timeout after {self.timeout:.0f}s"
+        except aiohttp.ClientError as e:
+            result["error"] = f"connection error: {e}"
+        finally:
+            result["total_ms"] = elapsed_ms()
+            result["tokens"] = len(tokens)
+            result["answer"] = "".join(tokens)
+        return result
+    
+    async def run_batch(self, questions: List[str], output: TextIO) -> List[Dict[str, Any]]:
+        """Ask ``questions`` concurrently, writing one JSON line per result as it completes."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        results: List[Dict[str, Any]] = []
+        
+        async def one(index: int, question: str):
+            async with semaphore:
+                result = {"index": index, **await self.ask_timed(question)}
+            results.append(result)
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+        
+        await asyncio.gather(*(one(i, q) for i, q in enumerate(questions)))
+        return sorted(results, key=lambda r: r["index"])
+    
     async def health_check(self) -> bool:
         """Check if the RAG service is healthy."""
         try:
@@ -97,13 +198,50 @@ class RAGCLI:
             print(f"❌ Cannot connect to service: {e}")
             return False
 
-async def main():
+def print_batch_summary(results: List[Dict[str, Any]], wall: float, out: TextIO = sys.stderr):
+    ok = [r for r in results if not r["error"]]
+    print(f"📊 {len(ok)}/{len(results)} ok in {wall:.1f}s", file=out)
+    for field in ("ttft_ms", "total_ms"):
+        values = [r[field] for r in ok if r[field] is not None]
+        p50, p95 = _percentile(values, 50), _percentile(values, 95)
+        if p50 is not None:
+            print(f"   {field}: p50 {p50:.0f} | p95 {p95:.0f}", file=out)
+    for r in results:
+        if r["error"]:
+            print(f"❌ #{r['index']} {r['question'][:60]!r}: {r['error']}", file=out)
+
+
+async def batch_main(args) -> int:
+    """Non-interactive mode: ask every question in ``args.batch``."""
+    if args.batch == "-":
+        questions = read_questions(sys.stdin)
+    else:
+        with open(args.batch, "r", encoding="utf-8") as f:
+            questions = read_questions(f)
+    if not questions:
+        print("⚠️  No questions to ask", file=sys.stderr)
+        return 1
+    
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        async with RAGCLI(args.url, concurrency=args.concurrency, timeout=args.timeout) as rag:
+            print(f"🚀 Asking {len(questions)} questions, {args.concurrency} at a time", file=sys.stderr)
+            start = time.perf_counter()
+            results = await rag.run_batch(questions, output)
+            print_batch_summary(results, time.perf_counter() - start)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0 if all(not r["error"] for r in results) else 1
+
+
+async def main(url: str = "http://localhost:8000"):
     """Main CLI function."""
     print("🤖 Miguel's RAG Assistant - CLI Interface")
     print("=" * 50)
     
     # Check if service is running
-    async with RAGCLI() as rag:
+    async with RAGCLI(url) as rag:
         if not await rag.health_check():
             print("\n❌ Please start the RAG service first:")
             print("   cd backend/fastapi-rag")
@@ -159,8 +297,19 @@ async def main():
                 print(f"\n❌ Error: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CLI chat interface for testing the RAG system")
+    parser.add_argument("--url", default="http://localhost:8000", help="base URL of the RAG service")
+    parser.add_argument("--batch", metavar="FILE", help="ask the questions in FILE ('-' for stdin) and exit")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="questions in flight in batch mode")
+    parser.add_argument("-o", "--output", help="JSONL results file for batch mode (default: stdout)")
+    parser.add_argument("--timeout", type=float, default=120, help="per-question timeout in seconds")
+    args = parser.parse_args()
+    
+    if args.batch:
+        sys.exit(asyncio.run(batch_main(args)))
+    
     try:
-        asyncio.run(main())
+        asyncio.run(main(args.url))
     except KeyboardInterrupt:
         print("\n👋 Goodbye!")
     except Exception as e:
@@ -1,73 +1,61 @@
 #!/usr/bin/env python3
 """
 Document ingestion script for the RAG system.
-Loads markdown files from docs/ directory and creates embeddings.
+Loads the documents in docs/ (markdown, text and PDF) and creates embeddings.
+
+Usage:
+    python scripts/ingest.py                # re-chunk and upsert every file
+    python scripts/ingest.py --incremental  # only embed new/changed chunks
 """
 
-import os
-import glob
+import argparse
 import asyncio
 import sys
 from pathlib import Path
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
-import sys
 
 # Add parent directory to path to import app modules
 sys.path.append(str(Path(__file__).parent.parent))
 
-from app.rag import chunk_markdown
 from app.chroma_db import chroma_manager
+from app.embedding_store import embedding_store
+from app.ingestion import DOCS_PATH, ingest_documents
+from app.lexical import LEXICAL_INDEX_PATH, export_lexical_index
+from app.loaders import supported_files
+from app.vector_index import VECTOR_SNAPSHOT_PATH, export_snapshot
 
 # Load environment variables
 load_dotenv()
 
-# Configuration
-client = AsyncOpenAI()
-EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
-
-async def main():
+async def main(incremental: bool = False):
     """Main ingestion function."""
-    print("🚀 Starting document ingestion with ChromaDB...")
+    mode = "incremental" if incremental else "full"
+    print(f"🚀 Starting {mode} document ingestion with ChromaDB...")
     
     try:
-        # Process markdown files
-        docs_path = Path(__file__).parent.parent / "docs"
-        markdown_files = list(docs_path.glob("*.md"))
-        
-        if not markdown_files:
-            print(f"⚠️  No markdown files found in {docs_path}")
+        # Process every document type with a registered loader
+        if not supported_files(DOCS_PATH):
+            print(f"⚠️  No supported documents found in {DOCS_PATH}")
             return
         
-        print(f"📁 Found {len(markdown_files)} markdown files")
+        report = await ingest_documents(DOCS_PATH, incremental=incremental)
         
-        total_chunks = 0
-        for file_path in markdown_files:
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    raw_content = f.read()
-                
-                # Chunk the content
-                chunks = chunk_markdown(raw_content)
-                doc_id = file_path.stem
-                meta = {
-                    "filename": file_path.name,
-                    "file_size": len(raw_content),
-                    "chunk_count": len(chunks)
-                }
-                
-                # Upsert chunks to ChromaDB
-                await chroma_manager.upsert_documents(doc_id, chunks, meta)
-                total_chunks += len(chunks)
-                
-            except Exception as e:
-                print(f"❌ Error processing {file_path}: {e}")
-        
-        print(f"🎉 Ingestion complete! Total chunks: {total_chunks}")
+        print(f"🎉 Ingestion complete! Total chunks: {report.total_chunks}")
+        print(f"📝 Diff: {report.summary()}")
+        print(f"⏱️  Embedding throughput: {report.pipeline.summary()}")
         
         # Show collection info
         info = await chroma_manager.get_collection_info()
         print(f"📊 ChromaDB collection: {info}")
+        print(f"🧠 Embedding cache: {embedding_store.stats()}")
+
+        # Export the collection for the in-process NumPy backend
+        exported = await export_snapshot(chroma_manager)
+        print(f"💾 Vector snapshot: {exported} chunks written to {VECTOR_SNAPSHOT_PATH}")
+
+        # Build the BM25 index used by RETRIEVAL_MODE=hybrid
+        indexed = await export_lexical_index(chroma_manager)
+        print(f"🔤 Lexical index: {indexed} chunks written to {LEXICAL_INDEX_PATH}")
         
     except Exception as e:
         print(f"❌ Error during ingestion: {e}")
@@ -75,4 +63,11 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Ingest docs/ into ChromaDB")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only embed new or changed chunks, using the ingest manifest",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(incremental=args.incremental))
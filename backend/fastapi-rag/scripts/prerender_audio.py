@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Pre-render spoken answers to the FAQ for /ws/voice.
+Generates and synthesizes answers to the warm-up questions into the audio cache.
+
+Usage:
+    python scripts/prerender_audio.py            # first AUDIO_PRERENDER_LIMIT questions
+    python scripts/prerender_audio.py --limit 5
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+
+# Add parent directory to path to import app modules
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Load environment variables before the app reads them
+load_dotenv()
+
+from app.audio_cache import audio_cache
+from app.openai_client import shared_client
+from app.tts import tts_pool
+from app.voice import AUDIO_PRERENDER_LIMIT, prerender_answers, prerendered_path
+from app.warmup import load_warmup_questions
+
+
+async def main(limit: int):
+    if shared_client is None or not tts_pool.configured:
+        print("❌ OPENAI_API_KEY, ELEVENLABS_API_KEY and ELEVENLABS_VOICE_ID are required")
+        sys.exit(1)
+    questions = load_warmup_questions()[:limit]
+    if not questions:
+        print("⚠️  No warm-up questions found; set WARMUP_QUESTIONS_PATH")
+        return
+
+    print(f"🔊 Pre-rendering {len(questions)} answers...")
+    try:
+        await prerender_answers(questions, shared_client, tts_pool)
+    except Exception as e:
+        print(f"❌ Error during pre-rendering: {e}")
+        sys.exit(1)
+    finally:
+        await tts_pool.close()
+        await shared_client.close()
+
+    print(f"🎉 Answers written to {prerendered_path()}")
+    print(f"💾 Audio cache: {audio_cache.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--limit", type=int, default=AUDIO_PRERENDER_LIMIT, help="max questions to pre-render")
+    args = parser.parse_args()
+    asyncio.run(main(args.limit))
@@ -5,15 +5,17 @@ Script to reset the ChromaDB collection and re-ingest documents.
 
 import asyncio
 import sys
-from pathlib import Path
 import os
 
 # Add the parent directory to Python path to find app modules
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from app.chroma_db import chroma_manager
-from app.rag import chunk_markdown
-from openai import AsyncOpenAI
+from app.embedding_store import embedding_store
+from app.ingestion import DOCS_PATH, ingest_documents
+from app.lexical import LEXICAL_INDEX_PATH, export_lexical_index
+from app.loaders import supported_files
+from app.vector_index import VECTOR_SNAPSHOT_PATH, export_snapshot
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -29,42 +31,27 @@ async def reset_and_reingest():
     # Re-ingest documents
     print("📚 Re-ingesting documents...")
     
-    docs_path = Path(__file__).parent.parent / "docs"
-    markdown_files = list(docs_path.glob("*.md"))
-    
-    if not markdown_files:
-        print(f"⚠️  No markdown files found in {docs_path}")
+    # Process every document type with a registered loader
+    if not supported_files(DOCS_PATH):
+        print(f"⚠️  No supported documents found in {DOCS_PATH}")
         return
     
-    print(f"📁 Found {len(markdown_files)} markdown files")
-    
-    total_chunks = 0
-    for file_path in markdown_files:
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                raw_content = f.read()
-            
-            # Chunk the content
-            chunks = chunk_markdown(raw_content)
-            doc_id = file_path.stem
-            meta = {
-                "filename": file_path.name,
-                "file_size": len(raw_content),
-                "chunk_count": len(chunks)
-            }
-            
-            # Upsert chunks to ChromaDB
-            await chroma_manager.upsert_documents(doc_id, chunks, meta)
-            total_chunks += len(chunks)
-            
-        except Exception as e:
-            print(f"❌ Error processing {file_path}: {e}")
+    report = await ingest_documents(DOCS_PATH, incremental=False)
     
-    print(f"🎉 Re-ingestion complete! Total chunks: {total_chunks}")
+    print(f"🎉 Re-ingestion complete! Total chunks: {report.total_chunks}")
     
     # Show collection info
     info = await chroma_manager.get_collection_info()
     print(f"📊 ChromaDB collection: {info}")
+    print(f"🧠 Embedding cache: {embedding_store.stats()}")
+
+    # Export the collection for the in-process NumPy backend
+    exported = await export_snapshot(chroma_manager)
+    print(f"💾 Vector snapshot: {exported} chunks written to {VECTOR_SNAPSHOT_PATH}")
+
+    # Build the BM25 index used by RETRIEVAL_MODE=hybrid
+    indexed = await export_lexical_index(chroma_manager)
+    print(f"🔤 Lexical index: {indexed} chunks written to {LEXICAL_INDEX_PATH}")
 
 if __name__ == "__main__":
     asyncio.run(reset_and_reingest())
@@ -6,5 +6,5 @@ curl -LsSf https://astral.sh/uv/install.sh | sh
 # install dependencies
 uv sync
 
-# run the app
-uv run python scripts/reset_collection.py
\ No newline at end of file
+# run the app (incremental ingest: only new or changed chunks are embedded)
+uv run python scripts/ingest.py --incremental
@@ -0,0 +1,137 @@
+import pytest
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.admission import (
+    AdmissionController,
+    MemoryRateLimitStore,
+    Rejected,
+    SQLiteRateLimitStore,
+)
+from app.metrics import ADMISSION_REJECTED
+
+
+def test_token_bucket_allows_burst_then_refills():
+    """Test that a client gets ``burst`` requests, then one per 1/rate seconds."""
+    store = MemoryRateLimitStore()
+    assert [store.take("1.2.3.4", rate=0.5, burst=2, now=0.0) for _ in range(2)] == [0.0, 0.0]
+    assert store.take("1.2.3.4", rate=0.5, burst=2, now=0.0) == pytest.approx(2.0)
+    assert store.take("5.6.7.8", rate=0.5, burst=2, now=0.0) == 0.0
+    assert store.take("1.2.3.4", rate=0.5, burst=2, now=2.0) == 0.0
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    """Test that two SQLite stores on one file (two workers) share a bucket."""
+    path = str(tmp_path / "rate_limits.sqlite3")
+    first, second = SQLiteRateLimitStore(path), SQLiteRateLimitStore(path)
+    assert first.take("client", rate=1.0, burst=1, now=100.0) == 0.0
+    assert second.take("client", rate=1.0, burst=1, now=100.5) == pytest.approx(0.5)
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+async def test_rate_limit_rejects_with_retry_after(kind, tmp_path):
+    """Test that an exhausted bucket raises Rejected with a Retry-After."""
+    store = MemoryRateLimitStore() if kind == "memory" else SQLiteRateLimitStore(str(tmp_path / "r.sqlite3"))
+    controller = AdmissionController(rate_per_minute=6, burst=1, store=store)
+    await controller.check_rate("client")
+    with pytest.raises(Rejected) as e:
+        await controller.check_rate("client")
+    assert e.value.reason == "rate_limited"
+    assert e.value.retry_after_header == "10"
+
+
+
+def test_client_key_uses_the_address_added_by_the_proxy(monkeypatch):
+    """Test that visitors behind a trusted proxy get their own bucket, which a forged header can't change."""
+    from app import admission
+
+    def request(forwarded):
+        return SimpleNamespace(headers={"x-forwarded-for": forwarded}, client=SimpleNamespace(host="10.0.0.1"))
+
+    monkeypatch.setattr(admission, "TRUST_FORWARDED_FOR", False)
+    assert admission.client_key(request("203.0.113.7")) == "10.0.0.1"
+    monkeypatch.setattr(admission, "TRUST_FORWARDED_FOR", True)
+    assert admission.client_key(request("203.0.113.7")) == "203.0.113.7"
+    # The client sent the leftmost entries; the proxy appended the real address
+    assert admission.client_key(request("198.51.100.1, 203.0.113.7")) == "203.0.113.7"
+    assert admission.client_key(request("198.51.100.2, 203.0.113.7")) == "203.0.113.7"
+
+    monkeypatch.setattr(admission, "FORWARDED_TRUSTED_HOPS", 2)
+    assert admission.client_key(request("198.51.100.1, 203.0.113.7, 10.0.0.2")) == "203.0.113.7"
+
+
+async def test_queue_is_fifo_and_bounded():
+    """Test that waiters get slots in order and a full queue is rejected at once."""
+    controller = AdmissionController(max_concurrent=1, max_queue=2, queue_timeout=1, rate_per_minute=0)
+    first = await controller.acquire()
+    order = []
+
+    async def wait(name):
+        ticket = await controller.acquire()
+        order.append(name)
+        ticket.release()
+
+    waiters = [asyncio.create_task(wait("a")), asyncio.create_task(wait("b"))]
+    await asyncio.sleep(0)
+    assert controller.queued == 2
+
+    rejected_before = ADMISSION_REJECTED.value("queue_full")
+    with pytest.raises(Rejected) as e:
+        await controller.acquire()
+    assert e.value.reason == "queue_full"
+    assert ADMISSION_REJECTED.value("queue_full") == rejected_before + 1
+
+    first.release()
+    first.release()  # idempotent
+    await asyncio.gather(*waiters)
+    assert order == ["a", "b"]
+    assert controller.active == 0 and controller.queued == 0
+
+
+async def test_queue_timeout_and_cancellation_free_their_place():
+    """Test that timed-out and cancelled waiters leave the queue and leak no slot."""
+    controller = AdmissionController(max_concurrent=1, max_queue=4, queue_timeout=0.01, rate_per_minute=0)
+    held = await controller.acquire()
+    with pytest.raises(Rejected) as e:
+        await controller.acquire()
+    assert e.value.reason == "queue_timeout"
+
+    controller.queue_timeout = 5
+    waiter = asyncio.create_task(controller.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert controller.queued == 0
+
+    held.release()
+    assert controller.active == 0
+    (await controller.acquire()).release()
+
+
+def test_ask_returns_429_when_rate_limited(monkeypatch):
+    """Test that /ask answers 429 with Retry-After once the client's bucket is empty."""
+    async def fake_embed_query(question):
+        raise RuntimeError("embedding failed")
+
+    controller = AdmissionController(max_concurrent=2, rate_per_minute=60, burst=1, store=MemoryRateLimitStore())
+    monkeypatch.setattr(main, "admission", controller)
+    monkeypatch.setattr(main, "embed_query", fake_embed_query)
+    monkeypatch.setattr(main, "oclient", SimpleNamespace())
+
+    client = TestClient(main.app)
+    first = client.post("/ask", json={"question": "Hello?"})
+    assert first.status_code == 500
+    assert controller.active == 0  # the failed request gave its slot back
+
+    second = client.post("/ask", json={"question": "Hello?"})
+    assert second.status_code == 429
+    assert second.headers["retry-after"] == "1"
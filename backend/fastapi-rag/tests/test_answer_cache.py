@@ -0,0 +1,61 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.answer_cache import AnswerCache
+
+
+CONTEXTS = [("Notice period is one month.", 0.82)]
+
+
+def test_answer_cache_near_duplicate_hit():
+    """Test that a near-duplicate question replays the stored answer."""
+    cache = AnswerCache(max_entries=4, ttl=60, threshold=0.95)
+    cache.store([1.0, 0.0, 0.0], 1, CONTEXTS, ["One ", "month."])
+
+    hit = cache.lookup([0.99, 0.05, 0.0], 1)
+    assert hit is not None
+    assert hit.contexts == CONTEXTS
+    assert hit.text == "One month."
+
+    assert cache.lookup([0.0, 1.0, 0.0], 1) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_answer_cache_lru_eviction():
+    """Test that the least recently used entry is evicted when full."""
+    cache = AnswerCache(max_entries=2, ttl=60, threshold=0.99)
+    cache.store([1.0, 0.0, 0.0], 1, CONTEXTS, ["a"])
+    cache.store([0.0, 1.0, 0.0], 1, CONTEXTS, ["b"])
+    assert cache.lookup([1.0, 0.0, 0.0], 1) is not None  # "a" is now most recent
+
+    cache.store([0.0, 0.0, 1.0], 1, CONTEXTS, ["c"])
+
+    assert cache.lookup([0.0, 1.0, 0.0], 1) is None
+    assert cache.lookup([1.0, 0.0, 0.0], 1).text == "a"
+    assert cache.lookup([0.0, 0.0, 1.0], 1).text == "c"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_answer_cache_ttl_expiry():
+    """Test that expired entries are not served."""
+    cache = AnswerCache(max_entries=2, ttl=0, threshold=0.99)
+    cache.store([1.0, 0.0], 1, CONTEXTS, ["a"])
+
+    assert cache.lookup([1.0, 0.0], 1) is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_answer_cache_invalidated_on_new_collection_version():
+    """Test that a re-ingest (new collection version) drops all entries."""
+    cache = AnswerCache(max_entries=2, ttl=60, threshold=0.99)
+    cache.store([1.0, 0.0], 1, CONTEXTS, ["a"])
+
+    assert cache.lookup([1.0, 0.0], 2) is None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,114 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.testclient import TestClient
+
+from app import main
+from app.audio_cache import AudioCache, parse_range
+
+
+def test_keys_ignore_whitespace_but_not_voice():
+    """Test that the key normalizes answer whitespace and includes the voice."""
+    key = AudioCache.key("Hello  there.\n", "voice", "model", "pcm_22050")
+    assert key == AudioCache.key("Hello there.", "voice", "model", "pcm_22050")
+    assert key != AudioCache.key("Hello there.", "other", "model", "pcm_22050")
+
+
+def test_lru_eviction_by_size_survives_restart(tmp_path):
+    """Test size-bounded LRU eviction and that recency is kept on disk."""
+    cache = AudioCache(str(tmp_path), max_bytes=250, chunk_bytes=16)
+    cache.put("a", [b"a" * 100])
+    cache.put("b", [b"b" * 100], {"text": "b"})
+    assert cache.get("a") == 100  # a is now the most recently used
+    cache.put("c", [b"c" * 100])
+
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+    assert not os.path.exists(tmp_path / "b.json")
+
+    reopened = AudioCache(str(tmp_path), max_bytes=250)
+    assert reopened.stats()["bytes"] == 200
+    assert b"".join(reopened.read_range("a", 10, 19)) == b"a" * 10
+
+
+def test_parse_range():
+    """Test single byte ranges, suffix ranges and unsatisfiable ones."""
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    for header in ("bytes=100-", "bytes=0-1,5-6", "items=0-1"):
+        with pytest.raises(ValueError):
+            parse_range(header, 100)
+
+
+def test_audio_endpoint_serves_ranges(tmp_path, monkeypatch):
+    """Test full and partial reads of cached audio over HTTP."""
+    cache = AudioCache(str(tmp_path), chunk_bytes=7)
+    data = bytes(range(256)) * 4
+    key = AudioCache.key("Hi.", "voice", "model", "pcm_22050")
+    cache.put(key, [data], {"sample_rate": 22050})
+    monkeypatch.setattr(main, "audio_cache", cache)
+    client = TestClient(main.app)
+
+    full = client.get(f"/audio/{key}")
+    assert full.status_code == 200 and full.content == data
+    assert full.headers["content-type"] == "audio/L16;rate=22050;channels=1"
+
+    part = client.get(f"/audio/{key}", headers={"Range": "bytes=100-199"})
+    assert part.status_code == 206 and part.content == data[100:200]
+    assert part.headers["content-range"] == f"bytes 100-199/{len(data)}"
+
+    assert client.get(f"/audio/{key}", headers={"Range": "bytes=5000-"}).status_code == 416
+    assert client.get("/audio/" + "0" * 64).status_code == 404
+
+
+async def test_prerendered_answers_seed_the_answer_cache(tmp_path, monkeypatch):
+    """Test that pre-rendered answers are cached as audio and reloaded for the same version."""
+    from types import SimpleNamespace
+    from app import voice
+    from app.answer_cache import AnswerCache
+    from app.tts import TTSPool
+    from benchmarks.fake_tts import FakeTTSServer
+
+    async def fake_embed_query(question):
+        return [1.0, 0.0]
+
+    async def fake_prepare_messages(question, qvec, trace):
+        return [("Seven years.", 0.9)], [{"role": "user", "content": question}]
+
+    async def create(**kwargs):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Seven years, mostly data."))])
+
+    backend = SimpleNamespace(version=3)
+    monkeypatch.setattr(voice, "embed_query", fake_embed_query)
+    monkeypatch.setattr(voice, "prepare_messages", fake_prepare_messages)
+    monkeypatch.setattr(voice, "get_backend", lambda: backend)
+    monkeypatch.setattr(voice, "answer_cache", AnswerCache(max_entries=4))
+    monkeypatch.setattr(voice, "prerendered_answers", voice.PrerenderedAnswers())
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    audio = AudioCache(str(tmp_path))
+
+    async with FakeTTSServer() as server:
+        pool = TTSPool(api_key="key", voice_id="voice", base_url=server.base_url)
+        answers = await voice.prerender_answers(["Experience?"], client, tts=pool, audio=audio)
+        await pool.close()
+
+    assert "".join(answers[0]["tokens"]) == "Seven years, mostly data."
+    assert audio.get(voice.audio_key("Seven years, mostly data.", pool, audio)) is not None
+    assert await voice.load_prerendered_answers(audio) == 1
+    assert voice.answer_cache.lookup([1.0, 0.0], 3).text == "Seven years, mostly data."
+
+    # Pinned for the voice path even once the answer cache has let them go
+    voice.answer_cache.clear()
+    assert voice.prerendered_answers.lookup([0.99, 0.01], 3).text == "Seven years, mostly data."
+    assert voice.prerendered_answers.lookup([0.0, 1.0], 3) is None
+
+    backend.version = 4  # re-ingested: stale answers are not loaded
+    assert voice.prerendered_answers.lookup([1.0, 0.0], 4) is None
+    assert await voice.load_prerendered_answers(audio) == 0
@@ -0,0 +1,96 @@
+import pytest
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import rag
+from app.batching import MicroBatcher
+from app.chroma_db import ChromaDBManager
+from app.embedding_store import EmbeddingStore
+
+
+async def test_micro_batcher_coalesces_concurrent_calls():
+    """Test that concurrent submits become one call with per-caller results."""
+    calls = []
+
+    async def double(items):
+        calls.append(list(items))
+        return [i * 2 for i in items]
+
+    batcher = MicroBatcher(double, max_wait=0.01, max_batch=100)
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+    assert results == [0, 2, 4, 6, 8]
+    assert calls == [[0, 1, 2, 3, 4]]
+
+
+async def test_micro_batcher_flushes_at_max_batch_and_propagates_errors():
+    """Test the batch size cap and that a failed batch fails every caller."""
+    calls = []
+
+    async def fail(items):
+        calls.append(list(items))
+        raise RuntimeError("upstream down")
+
+    batcher = MicroBatcher(fail, max_wait=10, max_batch=2)
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(4)), return_exceptions=True)
+
+    assert calls == [[0, 1], [2, 3]]
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+async def test_micro_batcher_fails_callers_when_results_are_missing():
+    """Test that a batched call returning too few results fails every caller instead of hanging."""
+
+    async def truncate(items):
+        return [i * 2 for i in items][:-1]
+
+    batcher = MicroBatcher(truncate, max_wait=0.01, max_batch=100)
+    results = await asyncio.wait_for(
+        asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True), timeout=1
+    )
+
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+async def test_concurrent_searches_share_one_chroma_query(tmp_path):
+    """Test that concurrent search_similar calls are answered by one query."""
+    manager = ChromaDBManager(str(tmp_path / "chroma"), threads=2)
+    await manager.upsert_chunks(
+        ["a", "b"],
+        ["alpha doc", "beta doc"],
+        [[1.0, 0.0], [0.0, 1.0]],
+        [{"doc_id": "a"}, {"doc_id": "b"}],
+    )
+
+    results = await asyncio.gather(
+        manager.search_similar([1.0, 0.0], top_k=1),
+        manager.search_similar([0.0, 1.0], top_k=1),
+    )
+
+    assert [r[0][0] for r in results] == ["alpha doc", "beta doc"]
+    stats = manager.pool_stats()
+    assert stats["search_batches"][1]["batches"] == 1
+    assert stats["search_batches"][1]["max_batch_size"] == 2
+    assert stats["queued"] == stats["active"] == 0
+
+
+async def test_concurrent_query_embeddings_share_one_upstream_call(tmp_path, monkeypatch):
+    """Test that concurrent embed_query calls are fanned out from one request."""
+    calls = []
+
+    async def create(model, input):
+        calls.append(list(input))
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(t))]) for t in input])
+
+    monkeypatch.setattr(rag, "client", SimpleNamespace(embeddings=SimpleNamespace(create=create)))
+    monkeypatch.setattr(rag, "embedding_store", EmbeddingStore(str(tmp_path / "e.sqlite3")))
+
+    vectors = await asyncio.gather(*(rag.embed_query("q" * n) for n in range(1, 6)))
+
+    assert vectors == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    assert len(calls) == 1
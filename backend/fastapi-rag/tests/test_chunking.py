@@ -0,0 +1,96 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.chunking import chunk_markdown_stream, iter_blocks
+
+DOC = """# Profile
+
+## Experience
+
+### Acme | 2024
+Built the data platform. Led a team of five engineers.
+
+- **Spark:** batch pipelines
+- **Kafka:** streaming
+
+## Skills
+
+```python
+import torch
+model = torch.nn.Linear(4, 2)
+```
+
+| Skill | Level |
+|-------|-------|
+| Python | Advanced |
+| SQL | Advanced |
+"""
+
+
+def test_blocks_follow_markdown_structure():
+    """Test that headings, paragraphs, lists, code and tables become blocks."""
+    blocks = [(b.kind, b.headings) for b in iter_blocks(DOC.splitlines(True))]
+    assert [kind for kind, _ in blocks] == [
+        "heading", "heading", "heading", "paragraph", "list", "heading", "code", "table"
+    ]
+    assert blocks[3][1] == ["Profile", "Experience", "Acme | 2024"]
+    assert blocks[6][1] == ["Profile", "Skills"]
+
+
+def test_chunks_never_straddle_sections():
+    """Test that each section gets its own chunks, headed by the heading path."""
+    chunks = list(chunk_markdown_stream(DOC, max_tokens=1000, overlap_tokens=0, length=len))
+    assert [c.section for c in chunks] == ["Profile > Experience > Acme | 2024", "Profile > Skills"]
+    assert chunks[0].text.startswith("Profile > Experience > Acme | 2024\n\nBuilt the data platform.")
+    assert "- **Kafka:** streaming" in chunks[0].text
+    assert "```python\nimport torch" in chunks[1].text and chunks[1].text.endswith("| SQL | Advanced |")
+
+
+def test_split_blocks_respect_size_and_keep_fences_and_headers():
+    """Test that oversized code and tables are split with fences and header rows repeated."""
+    code = "```\n" + "\n".join(f"line_{i} = {i}" for i in range(40)) + "\n```\n"
+    table = "| k | v |\n|---|---|\n" + "\n".join(f"| {i} | {i * i} |" for i in range(40)) + "\n"
+    chunks = list(chunk_markdown_stream(code + "\n" + table, max_tokens=120, overlap_tokens=0, length=len))
+
+    assert len(chunks) > 4
+    assert all(len(c.text) <= 120 for c in chunks)
+    for c in chunks:
+        assert c.text.count("```") % 2 == 0
+        if "| 1" in c.text or "| 3" in c.text:
+            assert "| k | v |\n|---|---|" in c.text
+    rows = [line for c in chunks for line in c.text.splitlines() if line.startswith("| ") and "k | v" not in line]
+    assert len(rows) == 40
+
+
+def test_overlap_repeats_trailing_sentences():
+    """Test that consecutive chunks of a section share up to the overlap."""
+    text = " ".join(f"Sentence number {i} is here." for i in range(30))
+    chunks = list(chunk_markdown_stream(text, max_tokens=100, overlap_tokens=30, length=len))
+    assert all(len(c.text) <= 100 for c in chunks)
+    for previous, current in zip(chunks, chunks[1:]):
+        last_sentence = previous.text.rsplit(". ", 1)[-1]
+        assert current.text.startswith(last_sentence)
+    assert [c.index for c in chunks] == list(range(len(chunks)))
+
+
+def test_streams_from_a_file(tmp_path):
+    """Test that a file object is chunked lazily, line by line."""
+    path = tmp_path / "doc.md"
+    path.write_text(DOC * 50)
+    read = []
+    with open(path, "r", encoding="utf-8") as f:
+        def lines():
+            for line in f:
+                read.append(line)
+                yield line
+
+        chunks = chunk_markdown_stream(lines(), max_tokens=200, overlap_tokens=20)
+        first = next(chunks)
+        assert len(read) < 20
+        rest = list(chunks)
+    assert first.section == "Profile > Experience > Acme | 2024"
+    assert all(c.tokens <= 200 for c in rest)
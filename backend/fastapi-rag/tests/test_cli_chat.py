@@ -0,0 +1,76 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+import io
+import json
+
+from aiohttp import web
+
+from app.sse import sse_event
+from cli_chat import RAGCLI, read_questions
+
+
+@pytest.fixture
+async def fake_ask():
+    """A fake /ask that streams an answer in small, split writes."""
+    state = {"in_flight": 0, "max_in_flight": 0}
+
+    async def ask(request):
+        question = (await request.json())["question"]
+        if question == "fail":
+            return web.Response(status=429, text="Too many requests")
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        frames = sse_event("context", {"snippets": [["ctx", 0.9]]})
+        for token in question.split():
+            frames += sse_event("token", {"token": token + " "})
+        frames += sse_event("done", {"text": question})
+        # Split frames across writes to exercise the SSE buffering
+        for i in range(0, len(frames), 7):
+            await response.write(frames[i:i + 7])
+            await asyncio.sleep(0.001)
+        state["in_flight"] -= 1
+        return response
+
+    app = web.Application()
+    app.router.add_post("/ask", ask)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    state["url"] = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+    yield state
+    await runner.cleanup()
+
+
+def test_read_questions_accepts_lines_and_jsonl():
+    """Test that plain lines and JSONL traffic records are both read."""
+    source = io.StringIO('# nightly\nWhat do you do?\n\n{"question": "Where?", "ip": "1.2.3.4"}\n{"other": 1}\n')
+    assert read_questions(source) == ["What do you do?", "Where?"]
+
+
+async def test_batch_mode_writes_timed_jsonl(fake_ask):
+    """Test concurrency cap, per-question latencies and error reporting."""
+    questions = [f"question number {i}" for i in range(8)] + ["fail"]
+    output = io.StringIO()
+
+    async with RAGCLI(fake_ask["url"], concurrency=3) as rag:
+        results = await rag.run_batch(questions, output)
+
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert sorted(r["index"] for r in lines) == list(range(9))
+    assert fake_ask["max_in_flight"] <= 3
+    assert [r["question"] for r in results] == questions
+
+    answered = results[:8]
+    assert all(r["error"] is None and r["tokens"] == 3 for r in answered)
+    assert answered[0]["answer"] == "question number 0 "
+    assert all(r["context_ms"] <= r["ttft_ms"] <= r["total_ms"] for r in answered)
+    assert results[8]["status"] == 429 and results[8]["error"].startswith("HTTP 429")
@@ -0,0 +1,52 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.context_packing import estimated_jaccard, minhash, pack_contexts
+from app.tokens import count_tokens
+
+EXPERIENCE = "I have five years of experience building ML platforms on AWS with Python, Kubernetes and Airflow."
+SALARY = "My expected salary is £95,000 to £120,000 depending on the role and the location."
+NOTICE = "My notice period is one month and I can start interviews straight away."
+
+
+def test_minhash_detects_near_duplicates():
+    """Test that MinHash similarity separates near-duplicates from distinct chunks."""
+    edited = EXPERIENCE.replace("AWS", "GCP")
+    assert estimated_jaccard(minhash(EXPERIENCE), minhash(EXPERIENCE)) == 1.0
+    assert estimated_jaccard(minhash(EXPERIENCE), minhash(edited)) > 0.5
+    assert estimated_jaccard(minhash(EXPERIENCE), minhash(SALARY)) < 0.2
+
+
+def test_pack_contexts_drops_low_scores_and_duplicates():
+    """Test the similarity floor and near-duplicate removal."""
+    contexts = [
+        (SALARY, 0.7),
+        (EXPERIENCE, 0.8),
+        (EXPERIENCE + " ", 0.75),
+        (NOTICE, 0.1),
+    ]
+
+    packed, stats = pack_contexts(contexts, budget=1000, min_score=0.2, dedup_threshold=0.8)
+
+    assert packed == [(EXPERIENCE, 0.8), (SALARY, 0.7)]
+    assert stats["dropped_low_score"] == 1
+    assert stats["dropped_duplicate"] == 1
+    assert stats["tokens_out"] == count_tokens(EXPERIENCE) + count_tokens(SALARY)
+    assert stats["tokens_out"] < stats["tokens_in"]
+
+
+def test_pack_contexts_respects_token_budget():
+    """Test that packing prefers relevance per token within the budget."""
+    long_chunk = " ".join([EXPERIENCE] * 5)
+    contexts = [(long_chunk, 0.9), (SALARY, 0.8), (NOTICE, 0.7)]
+    budget = count_tokens(SALARY) + count_tokens(NOTICE)
+
+    packed, stats = pack_contexts(contexts, budget=budget, min_score=0.0)
+
+    assert [text for text, _ in packed] == [SALARY, NOTICE]
+    assert stats["dropped_budget"] == 1
+    assert stats["tokens_out"] <= budget
@@ -0,0 +1,75 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import openai
+from openai import AsyncOpenAI
+
+from app import embedding_pipeline, rag
+from app.embedding_pipeline import ChunkJob, pack_batches, run_embedding_pipeline
+from app.embedding_store import EmbeddingStore
+from app.openai_client import RetryBudget
+from benchmarks.fake_openai import FakeOpenAIServer, fake_embedding
+
+
+def make_jobs(n, size=40):
+    return [ChunkJob(f"doc_{i}", f"chunk {i} " + "x" * size, {"chunk_id": i}) for i in range(n)]
+
+
+def test_pack_batches_respects_token_and_item_budget():
+    """Test that batches never exceed the token budget or item cap."""
+    jobs = make_jobs(25, size=36)  # 10 estimated tokens each
+    batches = pack_batches(jobs, max_tokens=45, max_items=3)
+
+    assert [job for batch in batches for job in batch] == jobs
+    assert all(len(batch) <= 3 for batch in batches)
+    assert all(sum(job.tokens for job in batch) <= 45 for batch in batches)
+
+    oversized = [ChunkJob("big", "y" * 1000, {})]
+    assert pack_batches(oversized, max_tokens=45) == [oversized]
+
+
+async def test_pipeline_against_fake_server(tmp_path, monkeypatch):
+    """Test concurrency, 429 backoff and streamed upserts against a local server."""
+    monkeypatch.setattr(rag, "embedding_store", EmbeddingStore(str(tmp_path / "e.sqlite3")))
+    monkeypatch.setattr(embedding_pipeline, "EMBED_BACKOFF_BASE", 0.01)
+    jobs = make_jobs(40)
+    upserted = {}
+
+    async def sink(batch, vectors):
+        for job, vector in zip(batch, vectors):
+            upserted[job.id] = vector
+
+    async with FakeOpenAIServer(latency=0.02, rate_limit_first=2) as server:
+        client = AsyncOpenAI(api_key="test", base_url=server.base_url, max_retries=0)
+        stats = await run_embedding_pipeline(
+            jobs, sink, client, concurrency=3, max_tokens=50, max_items=4
+        )
+
+    assert stats.chunks == 40
+    assert stats.batches == 10
+    assert stats.retries == 2
+    assert stats.chunks_per_sec > 0 and stats.tokens_per_sec > 0
+    assert server.max_in_flight <= 3
+    assert len(server.embedding_requests) == 10
+    assert upserted == {job.id: pytest.approx(fake_embedding(job.text)) for job in jobs}
+
+
+async def test_pipeline_retries_come_from_the_retry_budget(tmp_path, monkeypatch):
+    """Test that 429 retries stop once the shared retry budget is spent."""
+    monkeypatch.setattr(rag, "embedding_store", EmbeddingStore(str(tmp_path / "e.sqlite3")))
+    monkeypatch.setattr(embedding_pipeline, "EMBED_BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(embedding_pipeline, "retry_budget", RetryBudget(ratio=0, min_per_sec=0))
+
+    async def sink(batch, vectors):
+        pass
+
+    async with FakeOpenAIServer(rate_limit_first=2) as server:
+        client = AsyncOpenAI(api_key="test", base_url=server.base_url, max_retries=0)
+        with pytest.raises(openai.RateLimitError):
+            await run_embedding_pipeline(make_jobs(2), sink, client, concurrency=1)
+
+    assert server.rate_limited == 2  # one budgeted retry, then give up
@@ -0,0 +1,73 @@
+import pytest
+import sys
+import os
+from types import SimpleNamespace
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import rag
+from app.embedding_store import EmbeddingStore
+
+
+class CountingEmbeddings:
+    """Fake embeddings client that records every upstream call."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, model, input):
+        self.calls.append(list(input))
+        data = [SimpleNamespace(embedding=[float(len(t)), 1.0, 0.5]) for t in input]
+        return SimpleNamespace(data=data)
+
+
+def test_embedding_store_persists_across_instances(tmp_path):
+    """Test that vectors written by one store are read back by another."""
+    path = str(tmp_path / "embeddings.sqlite3")
+    EmbeddingStore(path).put_many("model-a", ["hello"], [[0.25, 0.5]])
+
+    store = EmbeddingStore(path)
+    found = store.get_many("model-a", ["hello", "unknown"])
+
+    assert list(found.values()) == [[0.25, 0.5]]
+    assert store.get_many("model-b", ["hello"]) == {}
+    assert store.stats()["disk_hits"] == 1
+    assert store.stats()["misses"] == 2
+
+
+async def test_embed_only_calls_api_for_new_texts(tmp_path, monkeypatch):
+    """Test that embed() skips the network for previously embedded texts."""
+    fake = CountingEmbeddings()
+    monkeypatch.setattr(rag, "client", SimpleNamespace(embeddings=fake))
+    monkeypatch.setattr(rag, "embedding_store", EmbeddingStore(str(tmp_path / "e.sqlite3")))
+
+    first = await rag.embed(["a", "bb", "a"])
+    second = await rag.embed(["bb", "ccc"])
+
+    assert fake.calls == [["a", "bb"], ["ccc"]]
+    assert first == [[1.0, 1.0, 0.5], [2.0, 1.0, 0.5], [1.0, 1.0, 0.5]]
+    assert second == [[2.0, 1.0, 0.5], [3.0, 1.0, 0.5]]
+
+
+async def test_embed_reads_and_writes_the_store_off_the_event_loop(tmp_path, monkeypatch):
+    """Test that SQLite lookups and inserts do not run on the event loop thread."""
+    import threading
+
+    threads = []
+
+    class RecordingStore(EmbeddingStore):
+        def get_many(self, model, texts):
+            threads.append(threading.get_ident())
+            return super().get_many(model, texts)
+
+        def put_many(self, model, texts, vectors):
+            threads.append(threading.get_ident())
+            super().put_many(model, texts, vectors)
+
+    monkeypatch.setattr(rag, "client", SimpleNamespace(embeddings=CountingEmbeddings()))
+    monkeypatch.setattr(rag, "embedding_store", RecordingStore(str(tmp_path / "e.sqlite3")))
+
+    await rag.embed(["a"])
+
+    assert len(threads) == 2 and threading.get_ident() not in threads
@@ -0,0 +1,104 @@
+import pytest
+import sys
+import os
+from functools import partial
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import embedding_pipeline, ingestion, rag
+from app.chroma_db import ChromaDBManager
+from app.ingestion import ingest_documents
+
+
+@pytest.fixture
+def embedded(monkeypatch):
+    """Replace the embedding call with a deterministic fake that records inputs."""
+    calls = []
+
+    async def fake_embed(texts, openai_client=None):
+        calls.append(list(texts))
+        return [[float(len(t)), 1.0, 0.0] for t in texts]
+
+    monkeypatch.setattr(rag, "embed", fake_embed)
+    return calls
+
+
+async def test_incremental_ingest_only_embeds_changed_chunks(tmp_path, embedded):
+    """Test that unchanged files are skipped and shrunk documents lose orphans."""
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "faq.md").write_text("First answer. " * 100 + "\n\nSecond part. " * 100)
+    (docs / "cv.md").write_text("Worked on ML systems.")
+    manager = ChromaDBManager(str(tmp_path / "chroma"))
+    manifest = str(tmp_path / "manifest.json")
+
+    first = await ingest_documents(docs, incremental=True, manager=manager, manifest_path=manifest)
+    assert sorted(first.files_added) == ["cv.md", "faq.md"]
+    assert manager.collection.count() == first.total_chunks > 2
+
+    embedded.clear()
+    second = await ingest_documents(docs, incremental=True, manager=manager, manifest_path=manifest)
+    assert embedded == []
+    assert sorted(second.files_unchanged) == ["cv.md", "faq.md"]
+
+    (docs / "faq.md").write_text("First answer. " * 100)
+    (docs / "cv.md").unlink()
+    third = await ingest_documents(docs, incremental=True, manager=manager, manifest_path=manifest)
+
+    assert third.files_changed == ["faq.md"]
+    assert third.files_removed == ["cv.md"]
+    assert third.chunks_deleted > 0
+    assert manager.collection.count() == third.total_chunks
+    assert manager.collection.get(where={"doc_id": "cv"})["ids"] == []
+
+
+async def test_ingest_streams_pdf_and_text_documents(tmp_path, embedded, monkeypatch):
+    """Test that PDF and text documents are ingested with page sections."""
+    pytest.importorskip("pypdf")
+    from app import loaders
+    from tests.test_loaders import write_pdf
+
+    monkeypatch.setattr(loaders.get_loader(tmp_path / "x.pdf"), "cache_path", str(tmp_path / "cache"))
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    write_pdf(docs / "cv.pdf", ["Tech Lead at Acme", "Built RAG systems"])
+    (docs / "notes.txt").write_text("Plain text notes.")
+    manager = ChromaDBManager(str(tmp_path / "chroma"))
+
+    report = await ingest_documents(docs, incremental=True, manager=manager, manifest_path=str(tmp_path / "m.json"))
+    assert report.files_added == ["cv.pdf", "notes.txt"]
+    stored = manager.collection.get(where={"doc_id": "cv.pdf"})
+    assert sorted(m["section"] for m in stored["metadatas"]) == ["cv > Page 1", "cv > Page 2"]
+    assert {m["chunk_count"] for m in stored["metadatas"]} == {2}
+    assert os.listdir(tmp_path / "cache")
+
+
+async def test_a_document_that_fails_to_embed_does_not_stop_the_others(tmp_path, monkeypatch):
+    """Test that a failed batch skips only its document, which the next run retries."""
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "cv.md").write_text("Worked on ML systems.")
+    (docs / "faq.md").write_text("Broken answer.")
+    manager = ChromaDBManager(str(tmp_path / "chroma"))
+    manifest = str(tmp_path / "manifest.json")
+    broken = {"on": True}
+
+    async def flaky_embed(texts, openai_client=None):
+        if broken["on"] and any("Broken" in t for t in texts):
+            raise RuntimeError("upstream down")
+        return [[float(len(t)), 1.0, 0.0] for t in texts]
+
+    monkeypatch.setattr(rag, "embed", flaky_embed)
+    # One chunk per batch, so the documents never share one
+    monkeypatch.setattr(ingestion, "run_embedding_pipeline", partial(embedding_pipeline.run_embedding_pipeline, max_items=1))
+
+    first = await ingest_documents(docs, incremental=True, manager=manager, manifest_path=manifest)
+    assert first.files_added == ["cv.md"] and first.files_failed == ["faq.md"]
+    assert first.pipeline.failed_chunks == 1
+    assert manager.collection.get(where={"doc_id": "faq"})["ids"] == []
+
+    broken["on"] = False
+    second = await ingest_documents(docs, incremental=True, manager=manager, manifest_path=manifest)
+    assert second.files_added == ["faq.md"] and second.files_unchanged == ["cv.md"]
+    assert manager.collection.count() == 2
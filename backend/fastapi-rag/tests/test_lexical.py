@@ -0,0 +1,65 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import lexical, rag
+from app.lexical import BM25Index, reciprocal_rank_fusion, tokenize
+
+CHUNKS = [
+    "I have five years of experience building ML platforms.",
+    "My expected salary is £95,000 to £120,000 depending on the role.",
+    "I trained image captioning models with PyTorch and transformers.",
+    "My notice period is one month.",
+]
+
+
+def test_tokenize_normalizes_numbers_and_drops_stopwords():
+    """Test tokenization of salary figures and framework names."""
+    assert tokenize("What's the expected salary? £95,000") == ["expected", "salary", "95000"]
+    assert tokenize("PyTorch, C++, C# and scikit-learn") == ["pytorch", "c++", "c#", "scikit-learn"]
+
+
+def test_bm25_ranks_exact_terms_and_round_trips(tmp_path):
+    """Test BM25 ranking and the on-disk format."""
+    index = BM25Index.build(CHUNKS)
+    assert index.search("PyTorch", top_k=3) == [(CHUNKS[2], pytest.approx(index.search("pytorch")[0][1]))]
+    assert index.search("salary 95,000")[0][0] == CHUNKS[1]
+    assert index.search("kubernetes") == []
+
+    path = str(tmp_path / "lexical_index.npz")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert loaded.search("notice period") == index.search("notice period")
+    assert [loaded.text(i) for i in range(len(loaded))] == CHUNKS
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    """Test that chunks ranked well by both searches come first."""
+    vector = [("a", 0.9), ("b", 0.8), ("c", 0.7)]
+    lexical_hits = [("c", 12.0), ("a", 3.0)]
+
+    fused = reciprocal_rank_fusion([vector, lexical_hits], top_k=3, k=60)
+
+    assert [doc for doc, _ in fused] == ["a", "c", "b"]
+    assert reciprocal_rank_fusion([[("a", 1.0)], [("a", 2.0)]], top_k=1)[0][1] == pytest.approx(1.0)
+
+
+async def test_hybrid_retrieve_fuses_vector_and_lexical(tmp_path, monkeypatch):
+    """Test that hybrid mode surfaces exact-term matches missed by vectors."""
+    path = str(tmp_path / "lexical_index.npz")
+    BM25Index.build(CHUNKS).save(path)
+    monkeypatch.setattr(rag, "get_lexical_index", lambda: lexical.get_lexical_index(path))
+    monkeypatch.setattr(rag, "RETRIEVAL_MODE", "hybrid")
+
+    class VectorOnly:
+        async def search_similar(self, qvec, top_k, query_text=None):
+            return [(CHUNKS[0], 0.8), (CHUNKS[3], 0.7)]
+
+    monkeypatch.setattr(rag, "get_backend", lambda: VectorOnly())
+
+    results = await rag.retrieve("Do you use PyTorch?", top_k=2, qvec=[1.0])
+
+    assert [doc for doc, _ in results] == [CHUNKS[0], CHUNKS[2]]
@@ -0,0 +1,83 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import asyncio
+
+from aiohttp import web
+from openai import AsyncOpenAI
+
+from app.sse import sse_event
+from benchmarks.fake_openai import FakeOpenAIServer, fake_completion
+from benchmarks.load_ask import SSEParser, compare, run_load, summarize
+
+
+async def test_fake_server_streams_chat_completions():
+    """Test that the fake server streams deterministic tokens the SDK can parse."""
+    async with FakeOpenAIServer(ttft=0.01, tokens_per_second=500, completion_tokens=5) as server:
+        client = AsyncOpenAI(api_key="test", base_url=server.base_url, max_retries=0)
+        stream = await client.chat.completions.create(
+            model="fake", messages=[{"role": "user", "content": "Where?"}], stream=True
+        )
+        tokens = [c.choices[0].delta.content async for c in stream if c.choices[0].delta.content]
+        await client.close()
+
+    assert tokens == fake_completion("Where?", 5)
+    assert server.chat_requests == 1
+
+
+def test_sse_parser_handles_frames_split_across_reads():
+    """Test that frames are only returned once complete."""
+    parser = SSEParser()
+    first = sse_event("context", {"snippets": []})
+    data = first + sse_event("token", {"token": "Hi"})
+
+    assert parser.feed(data[:10]) == []
+    assert parser.feed(data[10:len(first) + 5]) == [("context", '{"snippets": []}')]
+    assert parser.feed(data[len(first) + 5:]) == [("token", '{"token": "Hi"}')]
+
+
+async def test_run_load_reports_latencies_and_errors():
+    """Test timings, token rates and error counts against a fake /ask."""
+    calls = 0
+
+    async def ask(request):
+        nonlocal calls
+        calls += 1
+        if calls == 3:
+            return web.Response(status=429)
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await response.write(sse_event("context", {"snippets": []}))
+        for token in ("a", "b", "c"):
+            await asyncio.sleep(0.01)
+            await response.write(sse_event("token", {"token": token}))
+        await response.write(sse_event("done", {"text": "abc"}))
+        return response
+
+    app = web.Application()
+    app.router.add_post("/ask", ask)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        results, wall = await run_load(f"http://127.0.0.1:{port}", ["Q?"], requests=6, concurrency=2)
+    finally:
+        await runner.cleanup()
+
+    summary = summarize(results, wall)
+    assert summary["requests"] == 6
+    assert summary["ok"] == 5
+    assert summary["errors"] == {"http_429": 1}
+    assert summary["context_ms"]["p50"] <= summary["ttft_ms"]["p50"] <= summary["total_ms"]["p50"]
+    assert all(r.tokens == 3 for r in results if r.ok)
+    assert summary["tokens_per_second"]["p50"] > 0
+
+    slower = {**summary, "ttft_ms": {p: v * 2 for p, v in summary["ttft_ms"].items()}}
+    assert compare(summary, summary, tolerance=0.2) == []
+    assert any(line.startswith("ttft p95") for line in compare(slower, summary, tolerance=0.2))
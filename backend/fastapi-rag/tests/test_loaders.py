@@ -0,0 +1,74 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app import loaders
+from app.loaders import PdfLoader, file_sha256, get_loader, supported_files
+
+pytest.importorskip("pypdf")
+
+
+def write_pdf(path, pages):
+    """Write a minimal PDF with one line of Helvetica text per page."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in pages:
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(out)
+
+
+def test_registry_picks_loaders_by_extension(tmp_path):
+    """Test that md, txt and pdf files are supported and others are ignored."""
+    for name in ("a.md", "b.txt", "c.pdf", "d.docx"):
+        (tmp_path / name).write_bytes(b"")
+    assert [p.name for p in supported_files(tmp_path)] == ["a.md", "b.txt", "c.pdf"]
+    assert isinstance(get_loader(tmp_path / "C.PDF"), PdfLoader)
+    assert get_loader(tmp_path / "d.docx") is None
+
+
+def test_pdf_pages_are_streamed_and_cached(tmp_path, monkeypatch):
+    """Test that PDF text is extracted page by page and only parsed once per file hash."""
+    pdf = tmp_path / "cv.pdf"
+    write_pdf(pdf, ["Tech Lead at Acme", "Built RAG systems"])
+    loader = PdfLoader(str(tmp_path / "cache"))
+    file_hash = file_sha256(pdf)
+
+    lines = list(loader.lines(pdf, file_hash))
+    text = "".join(lines)
+    assert text.startswith("# cv\n\n## Page 1\n\nTech Lead at Acme\n")
+    assert "## Page 2\n\nBuilt RAG systems\n" in text
+    assert os.listdir(tmp_path / "cache") == [f"{file_hash}.md"]
+
+    monkeypatch.setattr(loaders, "PdfReader", None)
+    assert "".join(loader.lines(pdf, file_hash)) == text
+
+
+def test_interrupted_extraction_is_not_cached(tmp_path):
+    """Test that a partially read PDF leaves no cache entry behind."""
+    pdf = tmp_path / "cv.pdf"
+    write_pdf(pdf, ["One", "Two"])
+    loader = PdfLoader(str(tmp_path / "cache"))
+    lines = loader.lines(pdf, file_sha256(pdf))
+    next(lines)
+    lines.close()
+    assert os.listdir(tmp_path / "cache") == []
@@ -0,0 +1,87 @@
+import pytest
+import sys
+import os
+from types import SimpleNamespace
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.testclient import TestClient
+
+from app import main, rag
+from app.answer_cache import AnswerCache
+from app.metrics import ASK_STAGE_SECONDS, Counter, Histogram, Registry, RequestTrace
+
+
+def test_histogram_exposition_format():
+    """Test cumulative buckets, sum and count in the text format."""
+    registry = Registry()
+    latency = registry.register(Histogram("test_seconds", "Test latency", ["stage"], buckets=(0.1, 1.0)))
+    requests = registry.register(Counter("test_total", "Test requests"))
+    latency.observe(0.05, "embed")
+    latency.observe(0.1, "embed")
+    latency.observe(3.0, "embed")
+    requests.inc()
+
+    text = registry.render()
+
+    assert "# TYPE test_seconds histogram" in text
+    assert 'test_seconds_bucket{stage="embed",le="0.1"} 2' in text
+    assert 'test_seconds_bucket{stage="embed",le="1.0"} 2' in text
+    assert 'test_seconds_bucket{stage="embed",le="+Inf"} 3' in text
+    assert 'test_seconds_count{stage="embed"} 3' in text
+    assert "test_total 1.0" in text
+
+
+def test_request_trace_records_stages():
+    """Test that stage timings land in the stage histogram."""
+    before = ASK_STAGE_SECONDS.count("retrieve")
+    trace = RequestTrace("test")
+    with trace.stage("retrieve"):
+        pass
+    trace.record("llm_ttft", 0.2)
+    trace.finish("answered")
+
+    assert set(trace.timings) == {"retrieve", "llm_ttft", "total"}
+    assert ASK_STAGE_SECONDS.count("retrieve") == before + 1
+
+
+def test_ask_exposes_stage_latencies(monkeypatch):
+    """Test that /ask records every pipeline stage in /metrics."""
+    async def fake_embed_query(question):
+        return [1.0, 0.0, 0.0]
+
+    async def fake_retrieve(question, qvec=None):
+        return [("I have five years of ML experience.", 0.8)]
+
+    class Stream:
+        def __init__(self):
+            self.tokens = ["Five ", "years."]
+
+        def __aiter__(self):
+            return self
+
+        async def __anext__(self):
+            if not self.tokens:
+                raise StopAsyncIteration
+            return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=self.tokens.pop(0)))])
+
+    async def create(**kwargs):
+        return Stream()
+
+    monkeypatch.setattr(main, "embed_query", fake_embed_query)
+    monkeypatch.setattr(rag, "retrieve", fake_retrieve)
+    monkeypatch.setattr(main, "get_backend", lambda: SimpleNamespace(version=0))
+    monkeypatch.setattr(main, "answer_cache", AnswerCache(max_entries=4))
+    monkeypatch.setattr(main, "oclient", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+
+    client = TestClient(main.app)
+    response = client.post("/ask", json={"question": "How much experience do you have?"})
+    assert "event: done" in response.text
+
+    metrics = client.get("/metrics").text
+    for stage in ("embed", "retrieve", "prompt_build", "llm_ttft", "llm_stream", "total"):
+        assert f'rag_ask_stage_seconds_count{{stage="{stage}"}}' in metrics
+    assert 'rag_ask_requests_total{outcome="answered"}' in metrics
+    assert "rag_llm_tokens_per_second_count" in metrics
+    assert 'rag_prompt_tokens_count{stage="packed"}' in metrics
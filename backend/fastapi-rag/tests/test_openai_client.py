@@ -0,0 +1,76 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import httpx
+import openai
+
+from app import openai_client
+from app.openai_client import RetryBudget, RetryingTransport, create_openai_client
+from benchmarks.fake_openai import FakeOpenAIServer
+
+
+async def test_shared_client_reuses_connections():
+    """Test that sequential requests share one keep-alive connection."""
+    async with FakeOpenAIServer() as server:
+        client = create_openai_client(api_key="test", base_url=server.base_url, http2=False)
+        for i in range(5):
+            await client.embeddings.create(model="test", input=[f"question {i}"])
+        await client.close()
+
+    assert len(server.embedding_requests) == 5
+    assert len(server.connections) == 1
+
+
+async def test_retries_are_budgeted(monkeypatch):
+    """Test that 429s are retried until the shared retry budget runs out."""
+    monkeypatch.setattr(openai_client, "OPENAI_BACKOFF_BASE", 0.001)
+    budget = RetryBudget(ratio=0.0, min_per_sec=0.0)
+    budget.capacity = budget.tokens = 2
+
+    async with FakeOpenAIServer(rate_limit_first=3) as server:
+        client = create_openai_client(
+            api_key="test", base_url=server.base_url, http2=False, max_retries=5, budget=budget
+        )
+        with pytest.raises(openai.RateLimitError):
+            await client.embeddings.create(model="test", input=["first"])
+        assert server.rate_limited == 3
+
+        budget.tokens = 1
+        response = await client.embeddings.create(model="test", input=["second"])
+        await client.close()
+
+    assert len(response.data) == 1
+    assert server.embedding_requests == [["second"]]
+
+
+class DroppingTransport(httpx.AsyncBaseTransport):
+    """Drops the connection on the first request, then answers."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def handle_async_request(self, request):
+        self.calls += 1
+        if self.calls == 1:
+            raise httpx.RemoteProtocolError("Server disconnected without sending a response.")
+        return httpx.Response(200, json={})
+
+
+@pytest.mark.parametrize("path,retried", [("/v1/embeddings", True), ("/v1/chat/completions", False)])
+async def test_dropped_connections_are_only_retried_when_idempotent(monkeypatch, path, retried):
+    """Test that a request that may have been processed is not sent twice unless it is an embedding."""
+    monkeypatch.setattr(openai_client, "OPENAI_BACKOFF_BASE", 0.001)
+    inner = DroppingTransport()
+    transport = RetryingTransport(inner, RetryBudget(), max_retries=2)
+    request = httpx.Request("POST", f"https://api.openai.com{path}", json={})
+
+    if retried:
+        assert (await transport.handle_async_request(request)).status_code == 200
+    else:
+        with pytest.raises(httpx.RemoteProtocolError):
+            await transport.handle_async_request(request)
+    assert inner.calls == (2 if retried else 1)
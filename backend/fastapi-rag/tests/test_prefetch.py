@@ -0,0 +1,149 @@
+import pytest
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import httpx
+
+from app import prefetch
+from app.prefetch import PrefetchCache
+
+VECTORS = {
+    "what did you build at acme": [1.0, 0.0, 0.0],
+    "what did you build at acme corp": [0.98, 0.2, 0.0],
+    "how do you like to work": [0.0, 1.0, 0.0],
+}
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Fake embedding and retrieval that record the texts they were called with."""
+    calls = {"embed": [], "retrieve": []}
+    backend = SimpleNamespace(version=0)
+
+    async def fake_embed_query(text):
+        calls["embed"].append(text)
+        await asyncio.sleep(0.01)
+        return VECTORS[prefetch.normalize_query(text)]
+
+    async def fake_retrieve(text, qvec=None):
+        calls["retrieve"].append(text)
+        return [(f"context for {text}", 0.9)]
+
+    monkeypatch.setattr(prefetch, "embed_query", fake_embed_query)
+    monkeypatch.setattr(prefetch, "retrieve", fake_retrieve)
+    monkeypatch.setattr(prefetch, "get_backend", lambda: backend)
+    calls["backend"] = backend
+    return calls
+
+
+async def test_same_or_similar_question_reuses_prefetch(calls):
+    """Test exact reuse of embedding and contexts, and context reuse for a close question."""
+    cache = PrefetchCache(min_chars=5)
+    assert cache.start("s1", "What did you build at Acme") == "started"
+    assert cache.start("s1", "what did you build at acme?") == "duplicate"
+
+    qvec, contexts = await cache.claim("s1", "What did you build at Acme?")
+    assert qvec == [1.0, 0.0, 0.0]
+    assert contexts == [("context for What did you build at Acme", 0.9)]
+    assert calls["embed"] == ["What did you build at Acme"]
+
+    cache.start("s1", "What did you build at Acme")
+    qvec, contexts = await cache.claim("s1", "What did you build at Acme Corp?")
+    assert qvec == [0.98, 0.2, 0.0]
+    assert contexts[0][0] == "context for What did you build at Acme"
+    assert calls["retrieve"] == ["What did you build at Acme"] * 2
+
+    stats = cache.stats()
+    assert stats["lookups"]["exact"] == 1 and stats["lookups"]["similar"] == 1
+    assert stats["hit_rate"] == 1.0 and stats["sessions"] == 0
+
+
+async def test_unused_prefetches_are_counted_as_waste(calls):
+    """Test superseded, mismatched, stale and expired prefetches."""
+    cache = PrefetchCache(min_chars=5, ttl=60)
+    assert cache.start("s1", "hi") == "too_short"
+
+    cache.start("s1", "What did you build at Acme")
+    cache.start("s1", "How do you like to work")  # replaces the first one
+    _, contexts = await cache.claim("s1", "What did you build at Acme?")
+    assert contexts is None
+
+    cache.start("s1", "What did you build at Acme")
+    calls["backend"].version = 1  # re-ingested while the user was typing
+    _, contexts = await cache.claim("s1", "What did you build at Acme")
+    assert contexts is None
+
+    _, contexts = await cache.claim("s2", "How do you like to work")
+    assert contexts is None
+
+    cache.ttl = 0
+    cache.start("s3", "How do you like to work")
+    await asyncio.sleep(0.02)
+    cache.start("s4", "How do you like to work")
+    await asyncio.sleep(0.02)
+
+    stats = cache.stats()
+    assert stats["wasted"]["superseded"] == 1
+    assert stats["wasted"]["mismatch"] == 1
+    assert stats["wasted"]["stale"] == 1
+    assert stats["wasted"]["expired"] == 2
+    assert stats["lookups"] == {"exact": 0, "similar": 0, "miss": 2, "none": 1}
+    assert stats["wasted_seconds"] > 0
+
+
+async def test_prefetch_is_skipped_when_too_many_are_running(calls):
+    """Test that prefetches beyond max_inflight are refused."""
+    cache = PrefetchCache(min_chars=5, max_inflight=1)
+    assert cache.start("s1", "What did you build at Acme") == "started"
+    assert cache.start("s2", "How do you like to work") == "busy"
+    await cache.claim("s1", "What did you build at Acme")
+    assert cache.start("s2", "How do you like to work") == "started"
+
+
+async def test_ask_uses_contexts_prefetched_for_the_session(calls, monkeypatch):
+    """Test that /ask with a session_id answers from the prefetched contexts."""
+    from app import main, rag
+    from app.admission import AdmissionController, MemoryRateLimitStore
+    from app.answer_cache import AnswerCache
+    from tests.test_sse import FakeCompletionStream
+
+    prompts = []
+
+    async def create(**kwargs):
+        prompts.append(kwargs["messages"][-1]["content"])
+        return FakeCompletionStream(["Widgets."])
+
+    async def no_retrieve(*args, **kwargs):
+        raise AssertionError("retrieval should come from the prefetch")
+
+    cache = PrefetchCache(min_chars=5)
+    monkeypatch.setattr(main, "prefetch_cache", cache)
+    monkeypatch.setattr(main, "admission", AdmissionController(
+        rate_per_minute=0, prefetch_rate_per_minute=60, prefetch_burst=2, store=MemoryRateLimitStore()
+    ))
+    monkeypatch.setattr(rag, "retrieve", no_retrieve)
+    monkeypatch.setattr(main, "get_backend", lambda: calls["backend"])
+    monkeypatch.setattr(main, "answer_cache", AnswerCache(max_entries=4))
+    monkeypatch.setattr(main, "oclient", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+        response = await client.post("/prefetch", json={"session_id": "s1", "text": "What did you build at Acme"})
+        assert response.status_code == 202 and response.json() == {"status": "started"}
+        assert (await client.post("/prefetch", json={"text": "What"})).status_code == 400
+        # The second prefetch empties the bucket; the next one is refused before any embedding
+        await client.post("/prefetch", json={"session_id": "s2", "text": "How do you like to work"})
+        limited = await client.post("/prefetch", json={"session_id": "s3", "text": "How do you like to work"})
+        assert limited.status_code == 429 and "prefetch_rate_limited" in limited.text
+        assert limited.headers["retry-after"] == "1"
+
+        response = await client.post("/ask", json={"question": "What did you build at Acme Corp?", "session_id": "s1"})
+
+    assert response.status_code == 200 and "Widgets." in response.text
+    assert "context for What did you build at Acme" in prompts[0]
+    assert "Question: What did you build at Acme Corp?" in prompts[0]
+    assert cache.stats()["lookups"]["similar"] == 1
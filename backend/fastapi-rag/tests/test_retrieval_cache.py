@@ -0,0 +1,77 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np
+
+from app.chroma_db import ChromaDBManager
+from app.retrieval_cache import RetrievalCache, normalize_query
+
+
+def test_exact_and_near_duplicate_queries_hit():
+    """Test hits by normalized text and by LSH bucket plus cosine check."""
+    cache = RetrievalCache(max_entries=8, lsh_bits=8, threshold=0.98)
+    rng = np.random.default_rng(1)
+    vec = rng.standard_normal(64)
+    results = [("doc a", 0.9), ("doc b", 0.7)]
+    cache.store(vec.tolist(), 2, version=1, results=results, query_text="What do you do?")
+
+    assert normalize_query("  what DO you do") == "what do you do"
+    assert cache.lookup(rng.standard_normal(64).tolist(), 2, 1, "what do you do") == results
+    assert cache.lookup((vec * 3).tolist(), 2, 1) == results  # same direction
+    assert cache.lookup(vec.tolist(), 3, 1) is None  # other top_k
+    assert cache.lookup(rng.standard_normal(64).tolist(), 2, 1, "Something else?") is None
+
+    stats = cache.stats()
+    assert (stats["hits_exact"], stats["hits_similar"], stats["misses"]) == (1, 1, 2)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_version_change_and_lru_eviction():
+    """Test that a new collection version empties the cache and size is bounded."""
+    cache = RetrievalCache(max_entries=2)
+    for i in range(3):
+        cache.store([float(i), 1.0], 1, version=1, results=[(f"d{i}", 1.0)], query_text=f"q{i}")
+
+    assert cache.lookup([0.0, 1.0], 1, 1, "q0") is None  # evicted
+    assert cache.lookup([9.0, 9.0], 1, 1, "q2") == [("d2", 1.0)]
+    assert cache.stats()["evictions"] == 1
+
+    assert cache.lookup([9.0, 9.0], 1, 2, "q2") is None
+    assert cache.stats()["size"] == 0
+    assert cache.stats()["invalidations"] == 1
+
+
+async def test_chroma_searches_are_cached_until_upsert(tmp_path):
+    """Test that repeat searches skip Chroma and upserts invalidate them."""
+    manager = ChromaDBManager(str(tmp_path / "chroma"), threads=1)
+    await manager.upsert_chunks(["a"], ["alpha doc"], [[1.0, 0.0]], [{"doc_id": "a"}])
+
+    first = await manager.search_similar([1.0, 0.0], top_k=1, query_text="Alpha?")
+    again = await manager.search_similar([0.0, 1.0], top_k=1, query_text="alpha")
+    assert again == first
+    assert manager.pool_stats()["completed"] == 2  # upsert + one query
+
+    await manager.upsert_chunks(["b"], ["beta doc"], [[0.0, 1.0]], [{"doc_id": "b"}])
+    fresh = await manager.search_similar([0.0, 1.0], top_k=1, query_text="alpha")
+    assert fresh[0][0] == "beta doc"
+    assert manager.stats()["retrieval_cache"]["invalidations"] == 1
+
+
+async def test_chroma_version_file_is_checked_at_most_once_per_interval(tmp_path, monkeypatch):
+    """Test that another process's re-ingest is picked up after the check interval."""
+    from app import chroma_db
+
+    manager = ChromaDBManager(str(tmp_path / "chroma"), threads=1)
+    await manager.upsert_chunks(["a"], ["alpha doc"], [[1.0, 0.0]], [{"doc_id": "a"}])
+    assert manager.version == 1  # own writes are visible at once
+
+    other = ChromaDBManager(str(tmp_path / "chroma"), threads=1)
+    await other.upsert_chunks(["b"], ["beta doc"], [[0.0, 1.0]], [{"doc_id": "b"}])
+    assert manager.version == 1
+
+    monkeypatch.setattr(chroma_db, "CHROMA_VERSION_CHECK_SECONDS", 0)
+    assert manager.version == 2
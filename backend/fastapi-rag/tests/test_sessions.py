@@ -0,0 +1,205 @@
+import pytest
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import httpx
+
+from app.sessions import Conversations, MemorySessionStore, Session, SQLiteSessionStore
+
+LONG_ANSWER = "At Acme I built the streaming data platform and led a team of six engineers. " * 4
+
+
+class FakeChat:
+    """Non-streaming chat completions that answer from a queue and record prompts."""
+
+    def __init__(self, *replies, delay=0.0):
+        self.replies = list(replies)
+        self.delay = delay
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        await asyncio.sleep(self.delay)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=reply))])
+
+    @property
+    def client(self):
+        return SimpleNamespace(chat=SimpleNamespace(completions=self))
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+def test_session_stores_round_trip_and_expire(kind, tmp_path):
+    """Test storing, loading, expiring and deleting sessions."""
+    store = MemorySessionStore(ttl=60) if kind == "memory" else SQLiteSessionStore(str(tmp_path / "s.sqlite3"), ttl=60)
+    store.put(Session("a", "Asked about Acme.", [("Where?", "Lisbon.")]))
+    loaded = store.get("a")
+    assert (loaded.summary, loaded.turns) == ("Asked about Acme.", [("Where?", "Lisbon.")])
+    assert store.get("b") is None and len(store) == 1
+
+    store.ttl = 0
+    assert store.get("a") is None
+    store.ttl = 60
+    store.put(Session("c"))
+    store.delete("c")
+    assert store.get("c") is None
+
+
+@pytest.mark.parametrize("kind", ["memory", "sqlite"])
+async def test_concurrent_turns_from_several_workers_are_all_kept(kind, tmp_path):
+    """Test that turns recorded at the same time, through separate store handles, are not lost."""
+    if kind == "memory":
+        stores = [MemorySessionStore()] * 2
+    else:
+        stores = [SQLiteSessionStore(str(tmp_path / "s.sqlite3")) for _ in range(2)]
+    workers = [Conversations(store) for store in stores]
+    session = Session("s")  # every request loaded it before any turn was stored
+
+    await asyncio.gather(*(
+        workers[i % 2].record_turn(session, f"Question {i}?", "Answer.", None, started=0.0) for i in range(10)
+    ))
+
+    stored = stores[0].get("s")
+    assert sorted(q for q, _ in stored.turns) == sorted(f"Question {i}?" for i in range(10))
+    assert (await workers[1].stats())["sessions"] == 1
+
+
+def test_memory_store_forgets_least_recent_sessions():
+    """Test the session count bound."""
+    store = MemorySessionStore(max_sessions=2)
+    for session_id in "abc":
+        store.put(Session(session_id))
+    assert store.get("a") is None and store.get("c") is not None
+
+
+def test_prompt_history_stays_within_budget():
+    """Test that only the most recent turns that fit are sent, after the summary."""
+    conversations = Conversations(MemorySessionStore(), history_tokens=120)
+    session = Session("s", "Discussed Acme.", [(f"Question {i}?", LONG_ANSWER) for i in range(10)])
+
+    messages = conversations.history_messages(session)
+
+    assert messages[0] == {"role": "system", "content": "Conversation so far: Discussed Acme."}
+    assert 1 <= len(messages[1:]) // 2 < 10
+    assert messages[-2]["content"] == "Question 9?" and messages[-1]["role"] == "assistant"
+
+
+async def test_follow_up_questions_are_rewritten():
+    """Test LLM rewriting, the concat fallback on errors and timeouts, and first turns."""
+    session = Session("s", "", [("Where did you work before?", "At Acme."), ("What did you build?", "A platform.")])
+    chat = FakeChat("Team size of Miguel's platform team at Acme", RuntimeError("boom"))
+    conversations = Conversations(MemorySessionStore(), rewrite="llm", rewrite_turns=1)
+
+    assert await conversations.rewrite_query("How big was the team?", Session("new"), chat.client) == "How big was the team?"
+    assert await conversations.rewrite_query("How big was the team?", session, chat.client) == (
+        "Team size of Miguel's platform team at Acme"
+    )
+    assert "What did you build?" in chat.calls[0]["messages"][1]["content"]
+    assert await conversations.rewrite_query("How big was the team?", session, chat.client) == (
+        "What did you build? How big was the team?"
+    )
+
+    conversations.rewrite_timeout = 0.01
+    slow = FakeChat("too late", delay=0.1)
+    assert await conversations.rewrite_query("How big?", session, slow.client) == "What did you build? How big?"
+    assert (await conversations.stats())["rewrite_fallbacks"] == 2
+
+
+async def test_old_turns_are_folded_into_the_summary():
+    """Test background summarization once stored turns exceed the history budget."""
+    store = MemorySessionStore()
+    conversations = Conversations(store, history_tokens=120)
+    chat = FakeChat("Miguel led a six-person data platform team at Acme.")
+    session = await conversations.load("s")
+
+    for i in range(3):
+        await conversations.record_turn(session, f"Question {i}?", LONG_ANSWER, chat.client, started=0.0)
+    await asyncio.gather(*conversations._tasks)
+
+    stored = store.get("s")
+    assert stored.summary == "Miguel led a six-person data platform team at Acme."
+    assert stored.turns == [("Question 2?", LONG_ANSWER)]
+    assert "Question 0?" in chat.calls[0]["messages"][1]["content"]
+    assert len(chat.calls) == 1  # one summarization at a time per session
+
+
+async def test_turn_recorded_after_a_summary_keeps_it():
+    """Test that a request that loaded its session before summarization does not undo it."""
+    store = MemorySessionStore()
+    conversations = Conversations(store, history_tokens=120)
+    chat = FakeChat("Miguel led a six-person data platform team at Acme.", "Later summary.")
+    session = await conversations.load("s")
+    for i in range(2):
+        await conversations.record_turn(session, f"Question {i}?", LONG_ANSWER, chat.client, started=0.0)
+    stale = await conversations.load("s")  # a concurrent request starts here
+
+    await conversations.record_turn(session, "Question 2?", LONG_ANSWER, chat.client, started=0.0)
+    await asyncio.gather(*conversations._tasks)
+    await conversations.record_turn(stale, "Question 3?", "Six.", chat.client, started=0.0)
+
+    stored = store.get("s")
+    assert stored.summary == "Miguel led a six-person data platform team at Acme."
+    assert stored.turns == [("Question 2?", LONG_ANSWER), ("Question 3?", "Six.")]
+
+
+async def test_ask_continues_a_conversation(monkeypatch):
+    """Test that a follow-up /ask retrieves with the rewritten query and sends the history."""
+    from app import main, prefetch, rag
+    from app.answer_cache import AnswerCache
+    from app.prefetch import PrefetchCache
+    from tests.test_sse import FakeCompletionStream
+
+    retrieved = []
+    prompts = []
+
+    async def fake_embed_query(text):
+        return [1.0, 0.0]
+
+    async def fake_retrieve(text, qvec=None):
+        retrieved.append(text)
+        return [("I worked at Acme on data platforms.", 0.8)]
+
+    async def create(**kwargs):
+        if kwargs.get("stream"):
+            prompts.append(kwargs["messages"])
+            return FakeCompletionStream(["At Acme, ", "six engineers."])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Miguel's team size at Acme"))])
+
+    conversations = Conversations(MemorySessionStore(), rewrite="llm")
+    monkeypatch.setattr(main, "conversations", conversations)
+    monkeypatch.setattr(main, "prefetch_cache", PrefetchCache())
+    monkeypatch.setattr(prefetch, "embed_query", fake_embed_query)
+    monkeypatch.setattr(rag, "retrieve", fake_retrieve)
+    monkeypatch.setattr(main, "get_backend", lambda: SimpleNamespace(version=0))
+    monkeypatch.setattr(main, "answer_cache", AnswerCache(max_entries=4))
+    monkeypatch.setattr(main, "oclient", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+        first = await client.post("/ask", json={"question": "Where did you work?", "session_id": "s1", "conversation": True})
+        second = await client.post(
+            "/ask", json={"question": "How big was the team there?", "session_id": "s1", "conversation": True}
+        )
+        # Without the flag the session_id only keys prefetching: no rewrite, no history
+        single = await client.post("/ask", json={"question": "How big was the team there?", "session_id": "s1"})
+        turns = len(conversations.store.get("s1").turns)
+        bad = await client.post("/ask", json={"question": "Hi?", "session_id": 5})
+        no_session = await client.post("/ask", json={"question": "Hi?", "conversation": True})
+        deleted = await client.delete("/sessions/s1")
+
+    assert first.status_code == second.status_code == single.status_code == 200
+    assert bad.status_code == no_session.status_code == 400
+    assert retrieved == ["Where did you work?", "Miguel's team size at Acme"]
+    # Same embedding: the follow-up is answered with its history, the single-turn question from the answer cache
+    assert len(prompts) == 2 and turns == 2
+    assert (await conversations.stats())["rewrites"] == 1
+    assert [m["role"] for m in prompts[1]] == ["system", "user", "assistant", "user"]
+    assert prompts[1][2]["content"] == "At Acme, six engineers."
+    assert "Question: How big was the team there?" in prompts[1][-1]["content"]
+    assert deleted.status_code == 204 and conversations.store.get("s1") is None
@@ -0,0 +1,154 @@
+import pytest
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.sse import AnswerStream, coalesce, sse_event
+
+
+class FakeCompletionStream:
+    """OpenAI-style chunk stream with a delay per token."""
+
+    def __init__(self, tokens, delay=0.0):
+        self.tokens = list(tokens)
+        self.delay = delay
+        self.sent = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.closed or self.sent == len(self.tokens):
+            raise StopAsyncIteration
+        await asyncio.sleep(self.delay)
+        self.sent += 1
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=self.tokens[self.sent - 1]))])
+
+    async def close(self):
+        # Like an HTTP response, closing awaits before the connection is released
+        await asyncio.sleep(0)
+        self.closed = True
+
+
+async def collect(iterator):
+    return [item async for item in iterator]
+
+
+def test_sse_event_is_one_frame():
+    """Test that an event and its data are encoded as one frame."""
+    assert sse_event("token", {"token": 'say "hi"\n'}) == b'event: token\ndata: {"token": "say \\"hi\\"\\n"}\n\n'
+
+
+async def test_coalesce_flushes_on_bytes_and_time():
+    """Test size- and time-based flushing, and passthrough when disabled."""
+    async def tokens(items, delay=0.0):
+        for item in items:
+            await asyncio.sleep(delay)
+            yield item
+
+    assert await collect(coalesce(tokens("abcdef"), 0, 0)) == list("abcdef")
+    assert await collect(coalesce(tokens("abcdefg"), 0, 3)) == ["abc", "def", "g"]
+    chunks = await collect(coalesce(tokens("abcdef", delay=0.01), 0.035, 0))
+    assert "".join(chunks) == "abcdef"
+    assert 1 < len(chunks) < 6
+
+
+async def test_answer_stream_collects_text_and_closes_upstream():
+    """Test token frames, the joined answer and closing the upstream stream."""
+    upstream = FakeCompletionStream(["Hel", "lo", "!"])
+    answer = AnswerStream(upstream)
+
+    frames = await collect(answer.frames())
+
+    assert frames == [sse_event("token", {"token": t}) for t in ["Hel", "lo", "!"]]
+    assert answer.text == "Hello!"
+    assert answer.completed and upstream.closed
+
+
+async def test_answer_stream_closes_upstream_when_consumer_stops():
+    """Test that abandoning the frames generator closes the LLM stream."""
+    upstream = FakeCompletionStream(["a"] * 100, delay=0.001)
+    frames = AnswerStream(upstream, coalesce_ms=5).frames()
+
+    await frames.__anext__()
+    await frames.aclose()
+
+    assert upstream.closed
+    assert upstream.sent < 100
+
+
+@pytest.mark.parametrize("spec_version", ["2.3", "2.4"])
+async def test_ask_closes_llm_stream_on_client_disconnect(spec_version, monkeypatch):
+    """Test that /ask stops reading the LLM within one token of a disconnect.
+
+    ASGI 2.4 servers report the disconnect when sending fails; 2.3 servers
+    (uvicorn) make Starlette cancel the response from a listener task, so
+    the upstream is closed inside a cancelled scope.
+    """
+    from app import main, rag
+    from app.answer_cache import AnswerCache
+    from app.metrics import ASK_REQUESTS
+
+    async def fake_embed_query(question):
+        return [1.0, 0.0]
+
+    async def fake_retrieve(question, qvec=None):
+        return [("I have seven years of experience.", 0.8)]
+
+    upstream = FakeCompletionStream(["word "] * 1000, delay=0.001)
+
+    async def create(**kwargs):
+        return upstream
+
+    monkeypatch.setattr(main, "embed_query", fake_embed_query)
+    monkeypatch.setattr(rag, "retrieve", fake_retrieve)
+    monkeypatch.setattr(main, "get_backend", lambda: SimpleNamespace(version=0))
+    monkeypatch.setattr(main, "answer_cache", AnswerCache(max_entries=4))
+    monkeypatch.setattr(main, "oclient", SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))))
+
+    body = b'{"question": "How much experience do you have?"}'
+    disconnected = asyncio.Event()
+    received_body = False
+    tokens_sent = 0
+
+    async def receive():
+        nonlocal received_body
+        if not received_body:
+            received_body = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal tokens_sent
+        if message["type"] == "http.response.body" and message["body"].startswith(b"event: token"):
+            tokens_sent += 1
+            if tokens_sent == 3:
+                disconnected.set()
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0", "spec_version": spec_version},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/ask",
+        "raw_path": b"/ask",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 1234),
+        "server": ("127.0.0.1", 80),
+    }
+    aborted = ASK_REQUESTS.value("aborted")
+
+    await asyncio.wait_for(main.app(scope, receive, send), timeout=5)
+
+    assert upstream.closed
+    assert upstream.sent <= tokens_sent + 1
+    assert ASK_REQUESTS.value("aborted") == aborted + 1
@@ -0,0 +1,95 @@
+import pytest
+import sys
+import os
+
+import numpy as np
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.chroma_db import ChromaDBManager
+from app.vector_index import NumpyVectorIndex, SnapshotBackend, current_snapshot, export_snapshot, write_snapshot
+
+
+def unit_vectors(rng, n, dim=16):
+    vectors = rng.normal(size=(n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+async def test_numpy_backend_matches_chroma(tmp_path):
+    """Test that the NumPy snapshot returns the same top-k as Chroma."""
+    rng = np.random.default_rng(7)
+    vectors = unit_vectors(rng, 60)
+    manager = ChromaDBManager(str(tmp_path / "chroma"))
+    await manager.upsert_chunks(
+        [f"doc_{i}" for i in range(60)],
+        [f"chunk {i} — ünïcode" for i in range(60)],
+        vectors.tolist(),
+        [{"doc_id": "doc", "chunk_id": i} for i in range(60)],
+    )
+
+    assert await export_snapshot(manager, str(tmp_path / "snapshot")) == 60
+    index = NumpyVectorIndex.load(str(tmp_path / "snapshot"))
+    assert index.version == manager.version
+
+    for query in unit_vectors(rng, 10):
+        expected = await manager.search_similar(query.tolist(), top_k=5)
+        actual = await index.search_similar(query.tolist(), top_k=5)
+        assert [doc for doc, _ in actual] == [doc for doc, _ in expected]
+        assert [s for _, s in actual] == pytest.approx([s for _, s in expected], abs=1e-4)
+
+
+async def test_numpy_backend_small_and_empty_snapshots(tmp_path):
+    """Test top_k larger than the corpus and an empty snapshot."""
+    write_snapshot(str(tmp_path / "small"), [[1.0, 0.0], [0.0, 2.0]], ["x", "y"], [{}, {}])
+    index = NumpyVectorIndex.load(str(tmp_path / "small"))
+    assert [doc for doc, _ in await index.search_similar([0.0, 1.0], top_k=6)] == ["y", "x"]
+
+    write_snapshot(str(tmp_path / "empty"), [], [], [])
+    assert await NumpyVectorIndex.load(str(tmp_path / "empty")).search_similar([1.0], top_k=3) == []
+
+
+def test_snapshot_generations_and_pointer(tmp_path):
+    """Test that each write publishes a new generation and prunes old ones."""
+    path = str(tmp_path / "snapshot")
+    for i in range(3):
+        write_snapshot(path, [[1.0, 0.0]], [f"v{i}"], [{"doc_id": f"d{i}"}], version=i, keep=2)
+
+    assert sorted(os.listdir(path)) == ["CURRENT", "snapshot-000002", "snapshot-000003"]
+    assert current_snapshot(path) == os.path.join(path, "snapshot-000003")
+    index = NumpyVectorIndex.load(path)
+    assert index.version == 2
+    assert index.text(0) == "v2"
+    assert index.metadatas[0] == {"doc_id": "d2"}
+
+
+async def test_snapshot_backend_hot_swaps(tmp_path):
+    """Test that the backend swaps to a new snapshot while old results stay readable."""
+    path = str(tmp_path / "snapshot")
+    write_snapshot(path, [[1.0, 0.0], [0.0, 1.0]], ["old x", "old y"], [{}, {}], version=1, keep=1)
+    backend = SnapshotBackend(path, poll_seconds=0)
+    old_index = backend.index
+    assert [doc for doc, _ in await backend.search_similar([1.0, 0.0], top_k=1)] == ["old x"]
+
+    write_snapshot(path, [[0.0, 1.0], [1.0, 0.0]], ["new y", "new x"], [{}, {}], version=2, keep=1)
+    assert backend.version == 2
+    assert backend.swaps == 1
+    assert [doc for doc, _ in await backend.search_similar([1.0, 0.0], top_k=1)] == ["new x"]
+    # The pruned generation is still mapped by the previous index
+    assert old_index.text(1) == "old y"
+    assert backend.refresh() is False
+
+
+def test_loads_unversioned_snapshot(tmp_path):
+    """Test that a snapshot directory from before versioning still loads."""
+    path = tmp_path / "legacy"
+    path.mkdir()
+    np.save(path / "vectors.npy", np.eye(2, dtype=np.float32))
+    np.save(path / "offsets.npy", np.array([0, 1, 2], dtype=np.int64))
+    (path / "texts.bin").write_bytes(b"ab")
+    (path / "metadata.json").write_text('{"version": 5, "metadatas": [{}, {"k": 1}]}')
+
+    index = NumpyVectorIndex.load(str(path))
+    assert (index.version, index.text(1), index.metadatas[1]) == (5, "b", {"k": 1})
+    write_snapshot(str(path), [[1.0, 0.0]], ["c"], [{}])
+    assert sorted(os.listdir(path)) == ["CURRENT", "snapshot-000001"]
@@ -0,0 +1,132 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+
+from app import main, rag, voice
+from app.answer_cache import AnswerCache
+from app.audio_cache import AudioCache
+from app.tts import TTSPool
+from app.voice import PhraseSplitter, stream_voice_answer
+from benchmarks.fake_tts import FakeTTSServer, fake_pcm
+from tests.test_sse import FakeCompletionStream
+
+ANSWER = (
+    "I have led data platform teams for seven years. At my last company, we moved "
+    "batch pipelines to streaming, cut costs by 3.5x, and shipped retrieval systems "
+    "that recruiters, engineers and product managers used daily."
+)
+
+
+def split_tokens(text):
+    words = text.split(" ")
+    return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+
+def test_phrase_splitter_cuts_at_sentences_and_clauses():
+    """Test phrase boundaries, the short first phrase and the max length cut."""
+    splitter = PhraseSplitter(first_chars=20, phrase_chars=60, max_chars=120)
+    phrases = []
+    for token in split_tokens(ANSWER):
+        phrases.extend(splitter.feed(token))
+    phrases.append(splitter.flush())
+
+    assert phrases[0] == "I have led data platform teams for seven years."
+    assert phrases[1] == "At my last company, we moved batch pipelines to streaming, cut costs by 3.5x,"
+    assert " ".join(phrases) == ANSWER
+
+    splitter = PhraseSplitter(max_chars=30)
+    long = splitter.feed("word " * 20)
+    assert long and all(len(p) <= 30 for p in long)
+
+
+async def test_tts_pool_prewarms_and_streams_audio():
+    """Test that synthesis uses a pre-warmed socket and a new one is opened after it."""
+    async with FakeTTSServer() as server:
+        pool = TTSPool(api_key="key", voice_id="voice", base_url=server.base_url, size=1)
+        await pool.warm_up()
+        assert server.connections == 1
+
+        async def phrases():
+            yield "Hello there."
+            yield "How are you?"
+
+        audio = b"".join([pcm async for pcm in pool.synthesize(phrases())])
+        await pool.warm_up()
+        stats = pool.stats()
+        await pool.close()
+
+    assert audio == fake_pcm("Hello there. ") + fake_pcm("How are you? ")
+    assert server.api_keys[0] == "key"
+    assert server.paths[0].startswith("/v1/text-to-speech/voice/stream-input?model_id=")
+    assert server.connections == 2 and stats["idle"] == 1
+
+
+async def test_voice_answer_speaks_before_generation_finishes(tmp_path, monkeypatch):
+    """Test event order, that audio starts while tokens are still streaming and
+    that a repeated answer is played from the audio cache."""
+    async def fake_embed_query(question):
+        return [1.0, 0.0]
+
+    async def fake_retrieve(question, qvec=None):
+        return [("I have seven years of experience.", 0.8)]
+
+    upstream = FakeCompletionStream(split_tokens(ANSWER), delay=0.01)
+
+    async def create(**kwargs):
+        return upstream
+
+    monkeypatch.setattr(voice, "embed_query", fake_embed_query)
+    monkeypatch.setattr(rag, "retrieve", fake_retrieve)
+    monkeypatch.setattr(voice, "get_backend", lambda: SimpleNamespace(version=0))
+    monkeypatch.setattr(voice, "answer_cache", AnswerCache(max_entries=4))
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    audio = AudioCache(str(tmp_path / "audio"))
+    events = []
+    done = []
+
+    async def send_json(data):
+        events.append(data["type"])
+        if data["type"] == "done":
+            done.append(data)
+
+    async def send_bytes(data):
+        events.append(len(data))
+
+    async with FakeTTSServer(latency=0.005) as server:
+        pool = TTSPool(api_key="key", voice_id="voice", base_url=server.base_url)
+        await pool.warm_up()
+        metrics = await stream_voice_answer("Experience?", send_json, send_bytes, client, tts=pool, audio=audio)
+        cached = await stream_voice_answer("Experience?", send_json, send_bytes, client, tts=pool, audio=audio)
+        await pool.close()
+
+    first_answer = events[:events.index("done") + 1]
+    assert first_answer[:2] == ["context", "audio_start"]
+    first_audio = next(i for i, e in enumerate(first_answer) if isinstance(e, int))
+    last_token = max(i for i, e in enumerate(first_answer) if e == "token")
+    assert first_audio < last_token
+    assert metrics["ttft_ms"] <= metrics["ttfa_ms"] < metrics["total_ms"]
+    assert metrics["audio_bytes"] == sum(len(fake_pcm(t)) for t in server.texts)
+    assert upstream.sent == len(split_tokens(ANSWER))
+
+    # The second answer comes from the answer cache and its speech from disk
+    assert (metrics["audio_source"], cached["audio_source"]) == ("tts", "cache")
+    assert cached["audio_bytes"] == metrics["audio_bytes"]
+    assert done[0]["audio_key"] == done[1]["audio_key"]
+    assert audio.stats()["hits"] == 1
+
+
+def test_voice_socket_reports_errors_and_stays_open(monkeypatch):
+    """Test that bad requests get error events without closing the socket."""
+    monkeypatch.setattr(main, "oclient", None)
+    with TestClient(main.app).websocket_connect("/ws/voice") as ws:
+        ws.send_json({})
+        assert ws.receive_json() == {"type": "error", "status": 400, "detail": "Missing question"}
+        ws.send_json({"question": "Hi?"})
+        assert ws.receive_json()["status"] == 500
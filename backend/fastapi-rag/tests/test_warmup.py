@@ -0,0 +1,85 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to the path so we can import from app
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi.testclient import TestClient
+
+from app import main, warmup
+from app.warmup import Readiness, load_warmup_questions, warm_up
+
+
+def test_load_warmup_questions_from_faq(tmp_path):
+    """Test that FAQ headings and plain-text lines become canned questions."""
+    faq = tmp_path / "faq.md"
+    faq.write_text("# FAQ\n\n## Skills\n\n### What cloud platforms do you use?\nAWS.\n\n### Notes\n")
+    assert load_warmup_questions(str(faq)) == ["What cloud platforms do you use?"]
+
+    txt = tmp_path / "questions.txt"
+    txt.write_text("# comment\nWhat is your notice period?\n\n")
+    assert load_warmup_questions(str(txt)) == ["What is your notice period?"]
+    assert load_warmup_questions(str(tmp_path / "missing.txt")) == []
+
+
+async def test_warm_up_opens_backend_and_embeds_questions(monkeypatch):
+    """Test that every warm-up step runs and optional failures do not block readiness."""
+    calls = []
+
+    class Backend:
+        async def warm_up(self):
+            calls.append("backend")
+
+    async def fake_embed(texts, openai_client=None):
+        calls.append(("embed", tuple(texts), openai_client))
+        raise RuntimeError("rate limited")
+
+    monkeypatch.setattr(warmup, "get_backend", lambda: Backend())
+    monkeypatch.setattr(warmup, "embed", fake_embed)
+    monkeypatch.setattr(warmup, "load_warmup_questions", lambda: ["Hi?"])
+
+    state = Readiness()
+    await warm_up("client", state)
+
+    assert calls == ["backend", ("embed", ("Hi?",), "client")]
+    assert state.ready
+    assert set(state.steps) >= {"backend", "tokenizer", "canned_questions"}
+    assert "canned_questions" in state.errors
+
+
+async def test_warm_up_stays_unready_without_retrieval(monkeypatch):
+    """Test that a failed backend or a missing hybrid lexical index keeps /ready at 503."""
+    class Backend:
+        async def warm_up(self):
+            pass
+
+    def missing_backend():
+        raise FileNotFoundError("no vector snapshot")
+
+    monkeypatch.setattr(warmup, "get_backend", missing_backend)
+    monkeypatch.setattr(warmup, "load_warmup_questions", lambda: [])
+    state = Readiness()
+    await warm_up(None, state)
+    assert not state.ready and "backend" in state.errors and "tokenizer" in state.steps
+
+    monkeypatch.setattr(warmup, "get_backend", lambda: Backend())
+    monkeypatch.setattr(warmup, "RETRIEVAL_MODE", "hybrid")
+    monkeypatch.setattr(warmup, "get_lexical_index", lambda: None)
+    state = Readiness()
+    await warm_up(None, state)
+    assert not state.ready and "lexical_index" in state.errors
+
+
+def test_ready_reports_warm_up_state(monkeypatch):
+    """Test that /ready is 503 until warmed up while /health stays live."""
+    state = Readiness()
+    monkeypatch.setattr(main, "readiness", state)
+    monkeypatch.setattr(main, "oclient", object())
+    client = TestClient(main.app)
+
+    assert client.get("/ready").status_code == 503
+    assert client.get("/health").json()["ready"] is False
+
+    state.ready = True
+    assert client.get("/ready").status_code == 200
@@ -8,7 +8,20 @@ document.addEventListener('DOMContentLoaded', function() {
     const modalSendButton = document.getElementById('modal-send-message');
     const modalChatMessages = document.getElementById('modal-chat-messages');
     
+    const API_BASE = 'https://mrparracho-github-io.onrender.com';
+    const PREFETCH_DEBOUNCE_MS = 300;
+    const PREFETCH_MIN_CHARS = 12;
+    // Server-side conversation history; follow-ups then cost an extra query rewrite call
+    // and skip the answer cache, so the chat keeps each question standalone for now
+    const CONVERSATION = false;
+    // Lets /ask reuse the retrieval started by /prefetch while typing
+    const sessionId = window.crypto && crypto.randomUUID
+        ? crypto.randomUUID()
+        : `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+    
     let isStreaming = false;
+    let prefetchTimer = null;
+    let lastPrefetched = '';
     
     // Open modal when Start Conversation is clicked
     if (startChatButton) {
@@ -40,6 +53,29 @@ document.addEventListener('DOMContentLoaded', function() {
     // Send message when send button is clicked
     modalSendButton.addEventListener('click', sendMessage);
     
+    // Start retrieval for the question while it is still being typed
+    modalChatInput.addEventListener('input', () => {
+        clearTimeout(prefetchTimer);
+        prefetchTimer = setTimeout(prefetch, PREFETCH_DEBOUNCE_MS);
+    });
+    
+    function prefetch() {
+        const text = modalChatInput.value.trim();
+        if (isStreaming || text.length < PREFETCH_MIN_CHARS || text === lastPrefetched) {
+            return;
+        }
+        lastPrefetched = text;
+        fetch(`${API_BASE}/prefetch`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ session_id: sessionId, text: text })
+        }).catch(() => {
+            // Prefetching is best effort
+        });
+    }
+    
     function closeModal() {
         modal.classList.remove('active');
         modalChatInput.value = '';
@@ -52,6 +88,9 @@ document.addEventListener('DOMContentLoaded', function() {
             return;
         }
         
+        clearTimeout(prefetchTimer);
+        lastPrefetched = '';
+        
         // Add user message
         addMessage(message, 'user');
         modalChatInput.value = '';
@@ -66,12 +105,12 @@ document.addEventListener('DOMContentLoaded', function() {
         
         try {
             // Connect to your local RAG API
-            const response = await fetch('https://mrparracho-github-io.onrender.com/ask', {
+            const response = await fetch(`${API_BASE}/ask`, {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
-                body: JSON.stringify({ question: message })
+                body: JSON.stringify({ question: message, session_id: sessionId, conversation: CONVERSATION })
             });
 
             if (!response.ok) {